@@ -0,0 +1,374 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from statistics import median
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+from simdata.generate_melanoma_data import write_melanoma_data
+from surgeon_rates.generate_melanoma_rates import generate_melanoma_rates
+from surgeon_rates.utils.data_loader import load_data
+from surgeon_rates.utils.imputation import MultipleImputer
+from surgeon_rates.utils.rate_generator import RateGenerator
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+SURGEONS = [7, 50, 500]
+CASES = ['generate_rate', 'generate_rate_irls', 'imputation', 'imputation_fast', 'full_run', 'full_run_irls']
+
+# Largest dataset each case runs on unless --no-limits is given, which
+# keeps the default suite to minutes rather than hours
+MAX_PATIENTS = {
+    'generate_rate': 1_000_000,
+    'generate_rate_irls': 1_000_000,
+    'imputation': 100_000,
+    'imputation_fast': 1_000_000,
+    'full_run': 10_000,
+    'full_run_irls': 10_000
+}
+
+# Full runs fit a model per distinct surgery date, so their datasets span a
+# short date range to keep the model grid a fixed size
+FULL_RUN_DAYS = 7
+
+START_DATE = '2014-01-01'
+END_DATE = '2018-12-31'
+DATA_SEED = 20230728
+VARS_TO_IMPUTE = ['age', 'female', 'bmi', 'thickness', 'ulceration']
+
+def build_dataset(
+    n_patients: int,
+    n_surgeons: int,
+    data_dir: Path,
+    days: Optional[int] = None
+) -> Path:
+    """
+    Generate a simulated dataset, or reuse one generated earlier
+
+    Args:
+        n_patients: Number of patients
+        n_surgeons: Number of surgeons
+        data_dir: Directory holding the generated CSV files
+        days: Number of days of surgery dates, the default range if None
+
+    Returns:
+        Path to the CSV file
+    """
+    suffix = f"_{days}d" if days else ''
+    path = data_dir / f"melanoma_{n_patients}_{n_surgeons}{suffix}_{DATA_SEED}.csv"
+    if path.exists():
+        return path
+
+    end_date = END_DATE
+    if days:
+        end_date = (datetime.strptime(START_DATE, '%Y-%m-%d') + timedelta(days=days)).strftime('%Y-%m-%d')
+    # Write atomically so an interrupted run never leaves a partial dataset
+    data_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    write_melanoma_data(
+        str(tmp_path),
+        n_patients=n_patients,
+        start_date=START_DATE,
+        end_date=end_date,
+        seed=DATA_SEED,
+        n_surgeons=n_surgeons,
+        file_format='csv'
+    )
+    os.replace(tmp_path, path)
+    return path
+
+def _generate_rate_case(solver: str) -> Callable[[Path, Path], Callable[[], None]]:
+    """RateGenerator.generate_rate on one outcome over every patient"""
+    def setup(path: Path, work_dir: Path) -> Callable[[], None]:
+        df = load_data(str(path))
+        rate_generator = RateGenerator(solver=solver)
+        return lambda: rate_generator.generate_rate(df, outcome='anyComp2', model_id='BENCHMARK')
+    return setup
+
+def _imputation_case(method: str) -> Callable[[Path, Path], Callable[[], None]]:
+    """MultipleImputer.generate_multiple_imputations with five imputations"""
+    def setup(path: Path, work_dir: Path) -> Callable[[], None]:
+        df = load_data(str(path))
+        imputer = MultipleImputer(n_imputations=5, random_state=0, method=method)
+        return lambda: imputer.generate_multiple_imputations(df, VARS_TO_IMPUTE, patient_id='eventId')
+    return setup
+
+def _full_run_case(solver: str) -> Callable[[Path, Path], Callable[[], None]]:
+    """The full generate_melanoma_rates run with default settings besides the solver"""
+    def setup(path: Path, work_dir: Path) -> Callable[[], None]:
+        output_path = work_dir / 'rates'
+
+        def run() -> None:
+            shutil.rmtree(output_path, ignore_errors=True)
+            with _quiet():
+                generate_melanoma_rates(str(path), str(output_path), seed=0, solver=solver)
+            # The pipeline reports errors on stdout instead of raising
+            if not (output_path / 'SurgeonRates_full.csv').exists():
+                raise RuntimeError(f"generate_melanoma_rates failed on {path}")
+        return run
+    return setup
+
+CASE_SETUPS = {
+    'generate_rate': _generate_rate_case('sklearn'),
+    'generate_rate_irls': _generate_rate_case('irls'),
+    'imputation': _imputation_case('sklearn'),
+    'imputation_fast': _imputation_case('fast'),
+    'full_run': _full_run_case('sklearn'),
+    'full_run_irls': _full_run_case('irls')
+}
+
+def run_benchmarks(
+    sizes: List[int],
+    surgeons: List[int],
+    cases: List[str],
+    repeat: int = 3,
+    data_dir: Path = BENCHMARK_DIR / 'data',
+    limits: bool = True
+) -> Dict:
+    """
+    Time every case on every dataset size and number of surgeons
+
+    Datasets are generated once and reused between runs. Setup (loading
+    the data) is excluded from the timings. Each case is timed repeat
+    times and its minimum and median are reported.
+
+    Args:
+        sizes: Numbers of patients
+        surgeons: Numbers of surgeons
+        cases: Cases to run, from CASES
+        repeat: Number of timed repetitions
+        data_dir: Directory caching the generated datasets
+        limits: Skip datasets above each case's MAX_PATIENTS
+
+    Returns:
+        Report with run metadata and one result per case and dataset
+    """
+    results = []
+    work_dir = data_dir / 'work'
+    for case in cases:
+        for n_patients in sizes:
+            if limits and n_patients > MAX_PATIENTS[case]:
+                print(f"Skipping {case} at {n_patients} patients (above {MAX_PATIENTS[case]}, use --no-limits)")
+                continue
+            for n_surgeons in surgeons:
+                days = FULL_RUN_DAYS if case.startswith('full_run') else None
+                path = build_dataset(n_patients, n_surgeons, data_dir, days)
+                run = CASE_SETUPS[case](path, work_dir)
+
+                times = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    run()
+                    times.append(time.perf_counter() - start)
+
+                result = {
+                    'case': case,
+                    'n_patients': n_patients,
+                    'n_surgeons': n_surgeons,
+                    'times': times,
+                    'min_seconds': min(times),
+                    'median_seconds': median(times)
+                }
+                results.append(result)
+                print(f"{case:<18} {n_patients:>9} patients {n_surgeons:>4} surgeons: {result['median_seconds']:.3f}s")
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return {'metadata': _metadata(repeat), 'results': results}
+
+def compare_reports(baseline: Dict, current: Dict, threshold: float = 0.1) -> List[Dict]:
+    """
+    Compare the median times of two reports
+
+    Args:
+        baseline: Report of the reference commit
+        current: Report of the commit under test
+        threshold: Relative slowdown flagged as a regression
+
+    Returns:
+        One row per case and dataset in either report, with the ratio of
+        current to baseline time and a status of ok, regression,
+        improvement, new or missing
+    """
+    def key(result: Dict) -> tuple:
+        return result['case'], result['n_patients'], result['n_surgeons']
+
+    baseline_results = {key(result): result for result in baseline['results']}
+    current_results = {key(result): result for result in current['results']}
+
+    rows = []
+    for result_key in list(baseline_results) + [k for k in current_results if k not in baseline_results]:
+        before = baseline_results.get(result_key)
+        after = current_results.get(result_key)
+        row = {
+            'case': result_key[0],
+            'n_patients': result_key[1],
+            'n_surgeons': result_key[2],
+            'baseline_seconds': before['median_seconds'] if before else None,
+            'current_seconds': after['median_seconds'] if after else None,
+            'ratio': None
+        }
+        if before is None:
+            row['status'] = 'new'
+        elif after is None:
+            row['status'] = 'missing'
+        else:
+            row['ratio'] = after['median_seconds'] / before['median_seconds']
+            if row['ratio'] > 1 + threshold:
+                row['status'] = 'regression'
+            elif row['ratio'] < 1 / (1 + threshold):
+                row['status'] = 'improvement'
+            else:
+                row['status'] = 'ok'
+        rows.append(row)
+    return rows
+
+def solver_speedups(report: Dict) -> List[Dict]:
+    """
+    Compare the irls solver with scikit-learn within one report
+
+    Args:
+        report: Report of run_benchmarks
+
+    Returns:
+        One row per case and dataset timed with both solvers, with the
+        sklearn and irls median times and the sklearn / irls speedup
+    """
+    medians = {
+        (result['case'], result['n_patients'], result['n_surgeons']): result['median_seconds']
+        for result in report['results']
+    }
+    rows = []
+    for (case, n_patients, n_surgeons), irls_seconds in medians.items():
+        if not case.endswith('_irls'):
+            continue
+        sklearn_seconds = medians.get((case[:-len('_irls')], n_patients, n_surgeons))
+        if sklearn_seconds is None:
+            continue
+        rows.append({
+            'case': case[:-len('_irls')],
+            'n_patients': n_patients,
+            'n_surgeons': n_surgeons,
+            'sklearn_seconds': sklearn_seconds,
+            'irls_seconds': irls_seconds,
+            'speedup': sklearn_seconds / irls_seconds
+        })
+    return rows
+
+@contextlib.contextmanager
+def _quiet():
+    """Silence the pipeline's progress output"""
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        yield
+
+def _git_commit() -> Optional[str]:
+    """Short hash of the checked-out commit, marked dirty if modified"""
+    try:
+        return subprocess.run(
+            ['git', 'describe', '--always', '--dirty'],
+            cwd=BENCHMARK_DIR,
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _metadata(repeat: int) -> Dict:
+    """Describe the commit and environment a report was produced on"""
+    return {
+        'commit': _git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'repeat': repeat,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'scikit-learn': sklearn.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+def _print_solver_speedups(rows: List[Dict]) -> None:
+    """Print the irls solver's speedup over scikit-learn"""
+    print(f"{'Case':<18} {'Patients':>9} {'Surgeons':>8} {'sklearn':>10} {'irls':>10} {'Speedup':>8}")
+    for row in rows:
+        print(
+            f"{row['case']:<18} {row['n_patients']:>9} {row['n_surgeons']:>8} "
+            f"{row['sklearn_seconds']:>10.3f} {row['irls_seconds']:>10.3f} {row['speedup']:>8.2f}"
+        )
+
+def _print_comparison(rows: List[Dict]) -> None:
+    """Print a comparison table"""
+    print(f"{'Case':<18} {'Patients':>9} {'Surgeons':>8} {'Baseline':>10} {'Current':>10} {'Ratio':>7}  Status")
+    for row in rows:
+        baseline = f"{row['baseline_seconds']:.3f}" if row['baseline_seconds'] is not None else '-'
+        current = f"{row['current_seconds']:.3f}" if row['current_seconds'] is not None else '-'
+        ratio = f"{row['ratio']:.2f}" if row['ratio'] is not None else '-'
+        print(
+            f"{row['case']:<18} {row['n_patients']:>9} {row['n_surgeons']:>8} "
+            f"{baseline:>10} {current:>10} {ratio:>7}  {row['status']}"
+        )
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the surgeon rates pipeline')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Run the benchmarks and write a JSON report')
+    run_parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='Numbers of patients')
+    run_parser.add_argument('--surgeons', type=int, nargs='+', default=SURGEONS, help='Numbers of surgeons')
+    run_parser.add_argument('--cases', nargs='+', choices=CASES, default=CASES, help='Cases to run')
+    run_parser.add_argument('--repeat', type=int, default=3, help='Timed repetitions per case (default: 3)')
+    run_parser.add_argument('--data-dir', default=str(BENCHMARK_DIR / 'data'), help='Directory caching generated datasets')
+    run_parser.add_argument('--no-limits', action='store_true', help='Run every case on every size')
+    run_parser.add_argument('--output', help='Report path (default: benchmarks/results/<commit>.json)')
+
+    compare_parser = subparsers.add_parser('compare', help='Compare two reports and flag slowdowns')
+    compare_parser.add_argument('baseline', help='Report of the reference commit')
+    compare_parser.add_argument('current', help='Report of the commit under test')
+    compare_parser.add_argument('--threshold', type=float, default=0.1, help='Relative slowdown flagged as a regression (default: 0.1)')
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        if args.repeat < 1:
+            parser.error('--repeat must be at least 1')
+        report = run_benchmarks(
+            args.sizes,
+            args.surgeons,
+            args.cases,
+            repeat=args.repeat,
+            data_dir=Path(args.data_dir),
+            limits=not args.no_limits
+        )
+        name = report['metadata']['commit'] or datetime.now().strftime('%Y%m%d%H%M%S')
+        output = Path(args.output) if args.output else BENCHMARK_DIR / 'results' / f"{name}.json"
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {output}")
+        speedups = solver_speedups(report)
+        if speedups:
+            print()
+            _print_solver_speedups(speedups)
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        rows = compare_reports(baseline, current, args.threshold)
+        _print_comparison(rows)
+        if any(row['status'] == 'regression' for row in rows):
+            print(f"\nSlowdowns above {args.threshold:.0%} found")
+            sys.exit(1)
@@ -1,20 +1,46 @@
+import argparse
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-import random
-import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import glob
 import os
 
 # Configuration parameters - Change these values as needed
 N_PATIENTS = 1000
+N_SURGEONS = 7
 START_DATE = "2014-01-01"
 END_DATE = "2018-12-31"
 OUTPUT_DIR = "."  # Save in current directory (simdata)
 OUTPUT_FILE = "df_main"
 RANDOM_SEED = 20230728
+CHUNK_SIZE = 1_000_000  # Patients generated and written at a time
 GENERATE_RDS = False  # Set to True if you want to generate RDS file for R
 
-def generate_melanoma_data(n_patients=1000, start_date="2014-01-01", end_date="2018-12-31", seed=20230728):
+SURGEON_NAMES = ["ARIYAN", "BRADY", "COIT", "SMITH", "JONES", "PATEL", "WONG"]
+SITE_OPTIONS = [
+    "TRUNK", "ARM", "LEG", "SCALP", "NECK", "HAND", "FOOT",
+    "FACE", "EAR", "OCULAR", "EYELID", "LIP", "MUCOSAL"
+]
+SITE_PROBS = [0.25, 0.15, 0.15, 0.08, 0.08, 0.05, 0.05, 0.08, 0.04, 0.02, 0.02, 0.02, 0.01]
+# Complication types and the probability of each given a complication
+# (a patient can have multiple)
+COMP_TYPES = ["woundInf", "cellulitis", "seroma", "graftComp"]
+COMP_PROBS = [0.4, 0.3, 0.2, 0.1]
+
+# Odd multiplier scrambling row numbers into 8-digit hex patient IDs; any odd
+# number is a bijection modulo 2**32, so IDs never collide
+EVENT_ID_MULTIPLIER = 0x9E3779B1
+HEX_DIGITS = np.array(list("0123456789abcdef"))
+
+def surgeon_ids(n_surgeons=N_SURGEONS):
+    """
+    Surgeon identifiers: the first 7 have names, further surgeons get IDs
+    such as SURG008
+    """
+    return SURGEON_NAMES[:n_surgeons] + [f"SURG{i:03d}" for i in range(len(SURGEON_NAMES) + 1, n_surgeons + 1)]
+
+def generate_melanoma_data(n_patients=1000, start_date="2014-01-01", end_date="2018-12-31", seed=20230728, n_surgeons=7):
     """
     Generate simulated data for melanoma surgeries.
 
@@ -28,166 +54,264 @@ def generate_melanoma_data(n_patients=1000, start_date="2014-01-01", end_date="2
         End date for surgeries (YYYY-MM-DD)
     seed : int
         Random seed for reproducibility
+    n_surgeons : int
+        Number of surgeons. The first 7 have names, further surgeons get
+        IDs such as SURG008
 
     Returns:
     --------
     DataFrame with simulated melanoma surgery data
     """
-    # Set random seed for reproducibility
-    np.random.seed(seed)
-    random.seed(seed)
+    id_key, chunks = _chunk_seeds(seed, n_patients, max(n_patients, 1))
+    first_row, n_rows, chunk_seed = chunks[0] if chunks else (0, 0, seed)
+    return _generate_chunk(chunk_seed, n_rows, start_date, end_date, surgeon_ids(n_surgeons), first_row, id_key)
+
+def iter_melanoma_data(n_patients=1000, start_date="2014-01-01", end_date="2018-12-31", seed=20230728,
+                       n_surgeons=7, chunk_size=CHUNK_SIZE):
+    """
+    Generate simulated data for melanoma surgeries in chunks.
+
+    Each chunk has its own seed, spawned from the root seed, and only one
+    chunk is held in memory at a time. The result depends on the seed and
+    the chunk size; with a chunk size of at least n_patients it is
+    identical to generate_melanoma_data, and it matches the partitions of
+    write_melanoma_shards with the same shard size.
+
+    Parameters:
+    -----------
+    n_patients, start_date, end_date, seed, n_surgeons :
+        As for generate_melanoma_data
+    chunk_size : int
+        Maximum number of patients per chunk
+
+    Yields:
+    -------
+    DataFrames of at most chunk_size patients
+    """
+    id_key, chunks = _chunk_seeds(seed, n_patients, chunk_size)
+    surgeons = surgeon_ids(n_surgeons)
+    for first_row, n_rows, chunk_seed in chunks:
+        yield _generate_chunk(chunk_seed, n_rows, start_date, end_date, surgeons, first_row, id_key)
+
+def write_melanoma_data(path, n_patients=1000, start_date="2014-01-01", end_date="2018-12-31", seed=20230728,
+                        n_surgeons=7, chunk_size=CHUNK_SIZE, file_format=None):
+    """
+    Generate simulated data for melanoma surgeries and write it chunk by chunk.
+
+    Memory use is bounded by chunk_size rather than n_patients. CSV chunks
+    are appended to one file; Parquet chunks become row groups of one file
+    and require pyarrow.
+
+    Parameters:
+    -----------
+    path : str
+        Output file
+    n_patients, start_date, end_date, seed, n_surgeons, chunk_size :
+        As for iter_melanoma_data
+    file_format : str
+        'csv' or 'parquet', taken from the file extension if None
+
+    Returns:
+    --------
+    Number of patients written
+    """
+    if file_format is None:
+        file_format = "parquet" if str(path).endswith((".parquet", ".pq")) else "csv"
+    if file_format not in ("csv", "parquet"):
+        raise ValueError(f"Unknown file format: {file_format}")
+
+    chunks = iter_melanoma_data(n_patients, start_date, end_date, seed, n_surgeons, chunk_size)
+    n_written = 0
+    if file_format == "csv":
+        for chunk in chunks:
+            chunk.to_csv(path, mode="w" if n_written == 0 else "a", header=n_written == 0, index=False)
+            n_written += len(chunk)
+        return n_written
+
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("pyarrow is required for Parquet output: pip install pyarrow")
+
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+            n_written += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return n_written
+
+def write_melanoma_shards(output_dir, n_patients=1000, start_date="2014-01-01", end_date="2018-12-31", seed=20230728,
+                          n_surgeons=7, shard_size=CHUNK_SIZE, n_workers=1):
+    """
+    Generate simulated data for melanoma surgeries as Parquet partitions,
+    shards generated in parallel.
+
+    Every shard gets its own seed, spawned from one root SeedSequence, and
+    is written as part-NNNNN.parquet in output_dir. A shard depends only on
+    the seed, the shard size and its position, so the data is identical
+    whatever the number of workers. Partitions left by an earlier run in
+    output_dir are removed first. Requires pyarrow.
+
+    Parameters:
+    -----------
+    output_dir : str
+        Directory for the partitions, read back with pd.read_parquet(output_dir)
+    n_patients, start_date, end_date, seed, n_surgeons :
+        As for generate_melanoma_data
+    shard_size : int
+        Number of patients per shard
+    n_workers : int
+        Number of worker processes
+
+    Returns:
+    --------
+    Paths of the partitions, in row order
+    """
+    id_key, chunks = _chunk_seeds(seed, n_patients, shard_size)
+    surgeons = surgeon_ids(n_surgeons)
 
-    # Convert dates to datetime
-    start_date = datetime.strptime(start_date, "%Y-%m-%d")
-    end_date = datetime.strptime(end_date, "%Y-%m-%d")
+    os.makedirs(output_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(output_dir, "part-*.parquet")):
+        os.remove(path)
+
+    tasks = [
+        (os.path.join(output_dir, f"part-{shard:05d}.parquet"), chunk_seed, n_rows, start_date, end_date,
+         surgeons, first_row, id_key)
+        for shard, (first_row, n_rows, chunk_seed) in enumerate(chunks)
+    ]
+    if n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            return list(executor.map(_write_shard, tasks))
+    return list(map(_write_shard, tasks))
+
+def _write_shard(task):
+    """Generate one shard and write it as a Parquet partition"""
+    path, chunk_seed, n_rows, start_date, end_date, surgeons, first_row, id_key = task
+    chunk = _generate_chunk(chunk_seed, n_rows, start_date, end_date, surgeons, first_row, id_key)
+
+    # Write under a temporary name so a partition is either complete or absent
+    tmp_path = path + ".tmp"
+    chunk.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+def _chunk_seeds(seed, n_patients, chunk_size):
+    """
+    Split the patients into chunks with independent seeds
+
+    Returns the patient ID key and, per chunk, its first row, number of
+    rows and SeedSequence spawned from the root seed.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+
+    root = np.random.SeedSequence(seed)
+    id_key = int(root.generate_state(1)[0])
+    starts = range(0, n_patients, chunk_size)
+    return id_key, [
+        (first_row, min(chunk_size, n_patients - first_row), chunk_seed)
+        for first_row, chunk_seed in zip(starts, root.spawn(len(starts)))
+    ]
+
+def _generate_chunk(chunk_seed, n_patients, start_date, end_date, surgeons, first_row, id_key):
+    """
+    Generate one chunk of patients, every column drawn with vectorized
+    calls on a generator seeded with chunk_seed.
+
+    first_row is the position of the chunk's first patient in the whole
+    dataset and id_key the dataset's patient ID key, which together keep
+    patient IDs unique across chunks.
+    """
+    rng = np.random.default_rng(chunk_seed)
 
     # Generate random surgery dates
-    days_range = (end_date - start_date).days
-    random_days = np.random.randint(0, days_range, n_patients)
-    # Convert numpy.int64 to regular Python int to avoid TypeError with timedelta
-    surgery_dates = [start_date + timedelta(days=int(days)) for days in random_days]
+    start = np.datetime64(datetime.strptime(start_date, "%Y-%m-%d").date(), "D")
+    days_range = (np.datetime64(datetime.strptime(end_date, "%Y-%m-%d").date(), "D") - start).astype(int)
+    surgery_days = start + rng.integers(0, days_range, n_patients)
+    surgery_dates = surgery_days.astype("datetime64[ns]")
 
     # Generate patient IDs
-    event_ids = [str(uuid.uuid4())[:8] for _ in range(n_patients)]
+    rows = np.arange(first_row, first_row + n_patients, dtype=np.uint64)
+    codes = (rows * np.uint64(EVENT_ID_MULTIPLIER) + np.uint64(id_key)) & np.uint64(0xFFFFFFFF)
+    nibbles = (codes[:, None] >> np.arange(28, -4, -4, dtype=np.uint64)) & np.uint64(0xF)
+    event_ids = HEX_DIGITS[nibbles].view("<U8").ravel()
 
-    # Generate surgeon IDs (using a small set of surgeons)
-    surgeon_names = ["ARIYAN", "BRADY", "COIT", "SMITH", "JONES", "PATEL", "WONG"]
-    user_ids = np.random.choice(surgeon_names, n_patients)
+    # Generate surgeon IDs
+    user_ids = np.asarray(surgeons)[rng.integers(0, len(surgeons), n_patients)]
 
     # Year of surgery
-    yos = [date.year for date in surgery_dates]
+    yos = surgery_days.astype("datetime64[Y]").astype(int) + 1970
 
     # Patient demographics and tumor characteristics
-    ages = np.random.normal(60, 15, n_patients)  # Age centered around 60 with SD of 15
+    ages = rng.normal(60, 15, n_patients)  # Age centered around 60 with SD of 15
     ages = np.clip(ages, 18, 100).astype(int)  # Constrain to reasonable age range
 
-    female = np.random.binomial(1, 0.45, n_patients)  # 45% female
+    female = rng.binomial(1, 0.45, n_patients)  # 45% female
 
     # BMI with some missing values (about 5%)
-    bmi = np.random.normal(27, 5, n_patients)  # BMI centered around 27 with SD of 5
+    bmi = rng.normal(27, 5, n_patients)  # BMI centered around 27 with SD of 5
     bmi = np.clip(bmi, 16, 50, out=bmi)  # Constrain to reasonable BMI range
-    bmi_missing_idx = np.random.choice(n_patients, int(n_patients * 0.05), replace=False)
-    bmi[bmi_missing_idx] = np.nan
+    bmi[_missing(rng, n_patients, 0.05)] = np.nan
 
     # Tumor thickness in mm (log-normal distribution to skew toward thinner tumors)
-    thickness = np.exp(np.random.normal(0, 1, n_patients))
+    thickness = np.exp(rng.normal(0, 1, n_patients))
     thickness = np.clip(thickness, 0.1, 15, out=thickness)  # Constrain to reasonable range
-    thickness_missing_idx = np.random.choice(n_patients, int(n_patients * 0.1), replace=False)
-    thickness[thickness_missing_idx] = np.nan
+    thickness[_missing(rng, n_patients, 0.1)] = np.nan
+    thickness_missing = np.isnan(thickness)
 
     # Ulceration (more likely in thicker tumors)
     ulceration_prob = 1 / (1 + np.exp(-(thickness - 2)))  # Logistic function centered at 2mm
-    ulceration = [np.random.binomial(1, prob) if not np.isnan(thick) else np.nan
-                 for prob, thick in zip(ulceration_prob, thickness)]
+    ulceration = _bernoulli(rng, ulceration_prob, thickness_missing)
 
     # Mitotic index (0-10+, related to thickness)
-    mitotic_index = np.round(thickness * 0.8 + np.random.normal(0, 1, n_patients))
+    mitotic_index = np.round(thickness * 0.8 + rng.normal(0, 1, n_patients))
     mitotic_index = np.clip(mitotic_index, 0, 10, out=mitotic_index)
-    mitotic_missing_idx = np.random.choice(n_patients, int(n_patients * 0.15), replace=False)
-    mitotic_index[mitotic_missing_idx] = np.nan
+    mitotic_index[_missing(rng, n_patients, 0.15)] = np.nan
 
     # Generate sites for melanoma
-    site_options = [
-        "TRUNK", "ARM", "LEG", "SCALP", "NECK", "HAND", "FOOT",
-        "FACE", "EAR", "OCULAR", "EYELID", "LIP", "MUCOSAL"
-    ]
-    site_probs = [0.25, 0.15, 0.15, 0.08, 0.08, 0.05, 0.05, 0.08, 0.04, 0.02, 0.02, 0.02, 0.01]
-    sites = np.random.choice(site_options, n_patients, p=site_probs)
+    sites = np.asarray(SITE_OPTIONS)[rng.choice(len(SITE_OPTIONS), n_patients, p=SITE_PROBS)]
 
     # Generate sentinel lymph node dissection information
     # SLND more likely for thicker tumors
     slnd_prob = 1 / (1 + np.exp(-(thickness - 0.8) * 2))  # Logistic function centered at 0.8mm
-    slnd = [np.random.binomial(1, prob) if not np.isnan(thick) else np.nan
-           for prob, thick in zip(slnd_prob, thickness)]
+    slnd = _bernoulli(rng, slnd_prob, thickness_missing)
 
     # About 30% of SLND are missing in the data (per the comments in the R code)
-    slnd_missing_idx = np.random.choice(n_patients, int(n_patients * 0.3), replace=False)
-    for idx in slnd_missing_idx:
-        slnd[idx] = np.nan
+    slnd[_missing(rng, n_patients, 0.3)] = np.nan
 
     # Generate positive SLND results (only for those who got SLND)
-    pos_slnd = [np.random.binomial(1, 0.2) if s == 1 else (np.nan if np.isnan(s) else 0)
-               for s in slnd]
+    pos_slnd = np.where(slnd == 1, _bernoulli(rng, np.full(n_patients, 0.2), np.isnan(slnd)), 0.0)
+    pos_slnd[np.isnan(slnd)] = np.nan
 
     # Complete lymph node dissection after positive SLND
-    pos_slnd_clnd = [np.random.binomial(1, 0.7) if p == 1 else (np.nan if np.isnan(p) else 0)
-                    for p in pos_slnd]
+    pos_slnd_clnd = np.where(pos_slnd == 1, _bernoulli(rng, np.full(n_patients, 0.7), np.isnan(pos_slnd)), 0.0)
+    pos_slnd_clnd[np.isnan(pos_slnd)] = np.nan
 
     # Generate complications (more likely with increased age, BMI, thickness)
     # Base complication probability factors
     age_factor = (ages - 50) / 50  # Centered at age 50
+    bmi_factor = np.where(np.isnan(bmi), 0, (bmi - 25) / 10)  # Centered at BMI 25
+    thickness_factor = np.where(thickness_missing, 0, thickness / 3)  # Normalized by 3mm
 
-    # Handle NaN values for BMI
-    bmi_factor = np.zeros(n_patients)
-    mask_bmi_valid = ~np.isnan(bmi)
-    bmi_factor[mask_bmi_valid] = (bmi[mask_bmi_valid] - 25) / 10   # Centered at BMI 25
-
-    # Handle NaN values for thickness
-    thickness_factor = np.zeros(n_patients)
-    mask_thickness_valid = ~np.isnan(thickness)
-    thickness_factor[mask_thickness_valid] = thickness[mask_thickness_valid] / 3  # Normalized by 3mm
-
-    # Compute base probability for any complication - handling NaNs
+    # Compute base probability for any complication
     base_comp_prob = 0.08 + 0.02 * age_factor + 0.03 * bmi_factor + 0.03 * thickness_factor
-    base_comp_prob = np.clip(base_comp_prob, 0.01, 0.5)
 
     # For patients with missing BMI or thickness, use a base probability based on age only
-    mask_any_missing = np.isnan(bmi) | np.isnan(thickness)
+    mask_any_missing = np.isnan(bmi) | thickness_missing
     base_comp_prob[mask_any_missing] = 0.08 + 0.02 * age_factor[mask_any_missing]
     base_comp_prob = np.clip(base_comp_prob, 0.01, 0.5)
 
-    # Initialize complication arrays
-    anyComp2 = np.zeros(n_patients, dtype=int)
-    anyComp3 = np.zeros(n_patients, dtype=int)
-    woundInf2 = np.zeros(n_patients, dtype=int)
-    woundInf3 = np.zeros(n_patients, dtype=int)
-    cellulitis2 = np.zeros(n_patients, dtype=int)
-    cellulitis3 = np.zeros(n_patients, dtype=int)
-    seroma2 = np.zeros(n_patients, dtype=int)
-    seroma3 = np.zeros(n_patients, dtype=int)
-    graftComp2 = np.zeros(n_patients, dtype=int)
-    graftComp3 = np.zeros(n_patients, dtype=int)
-
-    # Generate complications for each patient
-    for i in range(n_patients):
-        # Any complication
-        if np.random.random() < base_comp_prob[i]:
-            # Determine grade (2 or 3)
-            if np.random.random() < 0.2:  # 20% chance of grade 3
-                anyComp3[i] = 1
-                grade = 3
-            else:
-                anyComp2[i] = 1
-                grade = 2
-
-            # Assign specific complication types (a patient can have multiple)
-            comp_types = ["woundInf", "cellulitis", "seroma", "graftComp"]
-            comp_probs = [0.4, 0.3, 0.2, 0.1]  # Probabilities for each complication type
-
-            for comp_type, prob in zip(comp_types, comp_probs):
-                if np.random.random() < prob:
-                    if comp_type == "woundInf":
-                        if grade == 2:
-                            woundInf2[i] = 1
-                        else:
-                            woundInf3[i] = 1
-                    elif comp_type == "cellulitis":
-                        if grade == 2:
-                            cellulitis2[i] = 1
-                        else:
-                            cellulitis3[i] = 1
-                    elif comp_type == "seroma":
-                        if grade == 2:
-                            seroma2[i] = 1
-                        else:
-                            seroma3[i] = 1
-                    elif comp_type == "graftComp":
-                        if grade == 2:
-                            graftComp2[i] = 1
-                        else:
-                            graftComp3[i] = 1
-
-    # Create DataFrame
+    # Any complication, 20% of them grade 3
+    any_comp = rng.random(n_patients) < base_comp_prob
+    grade3 = rng.random(n_patients) < 0.2
+
     data = {
         "eventId": event_ids,
         "userId": user_ids,
@@ -203,58 +327,100 @@ def generate_melanoma_data(n_patients=1000, start_date="2014-01-01", end_date="2
         "slnd": slnd,
         "posSlnd": pos_slnd,
         "posSlndClnd": pos_slnd_clnd,
-        "anyComp2": anyComp2,
-        "anyComp3": anyComp3,
-        "woundInf2": woundInf2,
-        "woundInf3": woundInf3,
-        "cellulitis2": cellulitis2,
-        "cellulitis3": cellulitis3,
-        "seroma2": seroma2,
-        "seroma3": seroma3,
-        "graftComp2": graftComp2,
-        "graftComp3": graftComp3
+        "anyComp2": (any_comp & ~grade3).astype(int),
+        "anyComp3": (any_comp & grade3).astype(int)
     }
 
-    # Create DataFrame
-    df = pd.DataFrame(data)
+    # Specific complication types of the patient's grade
+    for comp_type, prob in zip(COMP_TYPES, COMP_PROBS):
+        has_comp = any_comp & (rng.random(n_patients) < prob)
+        data[f"{comp_type}2"] = (has_comp & ~grade3).astype(int)
+        data[f"{comp_type}3"] = (has_comp & grade3).astype(int)
+
+    return pd.DataFrame(data)
+
+def _missing(rng, n_patients, fraction):
+    """Indices of a random fraction of patients to set missing"""
+    return rng.choice(n_patients, int(n_patients * fraction), replace=False)
 
-    return df
+def _bernoulli(rng, prob, missing):
+    """0/1 draws with the given probabilities, NaN where missing"""
+    draws = (rng.random(len(prob)) < np.where(missing, 0, prob)).astype(float)
+    draws[missing] = np.nan
+    return draws
 
 if __name__ == "__main__":
-    # Create output directory if it doesn't exist
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-    print(f"Generating melanoma surgery data for {N_PATIENTS} patients...")
-    print(f"Date range: {START_DATE} to {END_DATE}")
-
-    # Generate the data
-    df = generate_melanoma_data(
-        n_patients=N_PATIENTS,
-        start_date=START_DATE,
-        end_date=END_DATE,
-        seed=RANDOM_SEED
-    )
-
-    # Save as CSV
-    csv_path = os.path.join(OUTPUT_DIR, f"{OUTPUT_FILE}.csv")
-    df.to_csv(csv_path, index=False)
-    print(f"Data saved to {csv_path}")
-
-    # Save as RDS if configured
-    if GENERATE_RDS:
-        try:
-            import pyreadr
-            rds_path = os.path.join(OUTPUT_DIR, f"{OUTPUT_FILE}.Rds")
-
-            # Convert datetime to string for easier R compatibility
-            df_for_r = df.copy()
-            df_for_r['surgDate'] = df_for_r['surgDate'].astype(str)
-
-            # Save as RDS
-            pyreadr.write_rds(rds_path, df_for_r)
-            print(f"RDS file saved to {rds_path}")
-        except ImportError:
-            print("WARNING: pyreadr not installed. RDS file not created.")
-            print("To create an RDS file, install pyreadr: pip install pyreadr")
-
-    print(f"Successfully generated data for {len(df)} patients")
+    parser = argparse.ArgumentParser(description="Generate simulated melanoma surgery data")
+    parser.add_argument("--n-patients", type=int, default=N_PATIENTS, help=f"Number of patients (default: {N_PATIENTS})")
+    parser.add_argument("--surgeons", type=int, default=N_SURGEONS, help=f"Number of surgeons (default: {N_SURGEONS})")
+    parser.add_argument("--seed", type=int, default=RANDOM_SEED, help=f"Random seed (default: {RANDOM_SEED})")
+    parser.add_argument("--start-date", default=START_DATE, help=f"First surgery date (default: {START_DATE})")
+    parser.add_argument("--end-date", default=END_DATE, help=f"Surgery dates end before this date (default: {END_DATE})")
+    parser.add_argument("--output", help=f"Output file (default: {OUTPUT_DIR}/{OUTPUT_FILE}.csv)")
+    parser.add_argument("--format", choices=["csv", "parquet"], help="Output format (default: from the file extension)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help=f"Patients generated at a time, or per shard (default: {CHUNK_SIZE})")
+    parser.add_argument("--shard-dir", help="Write Parquet partitions to this directory instead of one file")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes generating shards (default: 1)")
+    parser.add_argument("--rds", action="store_true", default=GENERATE_RDS, help="Also write an RDS file for R")
+    args = parser.parse_args()
+
+    if args.n_patients < 1 or args.surgeons < 1 or args.chunk_size < 1 or args.workers < 1:
+        parser.error("--n-patients, --surgeons, --chunk-size and --workers must be at least 1")
+    if args.shard_dir and (args.output or args.format or args.rds):
+        parser.error("--shard-dir cannot be combined with --output, --format or --rds")
+
+    if args.shard_dir:
+        print(f"Generating melanoma surgery data for {args.n_patients} patients and {args.surgeons} surgeons "
+              f"in shards of {args.chunk_size} with {args.workers} workers...")
+        paths = write_melanoma_shards(
+            args.shard_dir,
+            n_patients=args.n_patients,
+            start_date=args.start_date,
+            end_date=args.end_date,
+            seed=args.seed,
+            n_surgeons=args.surgeons,
+            shard_size=args.chunk_size,
+            n_workers=args.workers
+        )
+        print(f"Successfully generated {len(paths)} partitions in {args.shard_dir}")
+    else:
+        output_path = args.output or os.path.join(OUTPUT_DIR, f"{OUTPUT_FILE}.csv")
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+        print(f"Generating melanoma surgery data for {args.n_patients} patients and {args.surgeons} surgeons...")
+        print(f"Date range: {args.start_date} to {args.end_date}")
+
+        # Generate and save the data
+        n_written = write_melanoma_data(
+            output_path,
+            n_patients=args.n_patients,
+            start_date=args.start_date,
+            end_date=args.end_date,
+            seed=args.seed,
+            n_surgeons=args.surgeons,
+            chunk_size=args.chunk_size,
+            file_format=args.format
+        )
+        print(f"Data saved to {output_path}")
+
+        # Save as RDS if configured
+        if args.rds:
+            try:
+                import pyreadr
+                rds_path = os.path.splitext(output_path)[0] + ".Rds"
+
+                # Read back the saved data; dates stay strings for easier R compatibility
+                if output_path.endswith((".parquet", ".pq")) or args.format == "parquet":
+                    df_for_r = pd.read_parquet(output_path)
+                    df_for_r['surgDate'] = df_for_r['surgDate'].astype(str)
+                else:
+                    df_for_r = pd.read_csv(output_path)
+
+                # Save as RDS
+                pyreadr.write_rds(rds_path, df_for_r)
+                print(f"RDS file saved to {rds_path}")
+            except ImportError:
+                print("WARNING: pyreadr not installed. RDS file not created.")
+                print("To create an RDS file, install pyreadr: pip install pyreadr")
+
+        print(f"Successfully generated data for {n_written} patients")
@@ -2,18 +2,71 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
+import time
 import traceback
 from tqdm import tqdm
 
 from surgeon_rates.utils.rate_generator import RateGenerator
 from surgeon_rates.utils.imputation import MultipleImputer
+from surgeon_rates.utils.imputation_cache import ImputationCache
+from surgeon_rates.utils.imputation_store import ImputationStore
+from surgeon_rates.utils.bootstrap import BootstrapEngine
+from surgeon_rates.utils.checkpoint import CheckpointStore
+from surgeon_rates.utils.fit_cache import FitCache
+from surgeon_rates.utils.pooling import ImputationPooler
+from surgeon_rates.utils.profiler import RunProfiler
+from surgeon_rates.utils.data_loader import detect_format, load_data
+from surgeon_rates.utils.design_matrix import SharedDesignMatrices
+from surgeon_rates.utils.chunked_loader import ChunkSummary, load_chunked
+from surgeon_rates.utils.window_index import THICKNESS_CATEGORIES, WindowIndex
+
+COMP_TYPES = ['ANY', 'WOUND', 'CELLULITIS', 'SEROMA', 'GRAFT']
+COMP_GRADES = ['COMPGRADE2', 'COMPGRADE3']
+MANIFEST_FILE = 'SurgeonRates_manifest.json'
+PROFILE_FILE = 'SurgeonRates_profile.json'
+CHECKPOINT_DIR = 'SurgeonRates_checkpoint'
+IMPUTATION_STORE_FILE = 'SurgeonRates_imputations.npz'
+
+# Number of finished models written to the checkpoint at a time
+CHECKPOINT_BATCH = 100
+
+# Maximum number of consecutive windows fitted as one warm-start chain
+WARM_START_BLOCK = 64
+
+# Keys of the two row hashes combined into model fingerprints
+FINGERPRINT_HASH_KEYS = ['0123456789123456', 'climetrics-rows2']
+
+# Per-process state used by model grid workers
+_worker_state: Dict = {}
 
 def generate_melanoma_rates(
     data_path: str,
     output_path: str,
-    last_surgery_date: datetime = None
-) -> None:
+    last_surgery_date: datetime = None,
+    workers: int = 1,
+    fit_cache_size: int = 0,
+    fit_cache_dir: Optional[str] = None,
+    incremental: bool = False,
+    warm_start: bool = False,
+    batch_outcomes: bool = False,
+    solver: str = 'sklearn',
+    bootstrap_replicates: int = 0,
+    bootstrap_weights: str = 'poisson',
+    bootstrap_jobs: int = 1,
+    chunk_size: Optional[int] = None,
+    seed: Optional[int] = None,
+    imputation_cache_dir: Optional[str] = None,
+    imputation_cache_mb: int = 1024,
+    imputation_method: str = 'sklearn',
+    adjustment: str = 'average',
+    profile: bool = False,
+    profile_top: int = 10,
+    resume: bool = False
+) -> Optional[pd.DataFrame]:
     """
     Generate surgeon rates for melanoma procedures
 
@@ -21,186 +74,712 @@ def generate_melanoma_rates(
         data_path: Path to the input data file
         output_path: Path to save the results
         last_surgery_date: Last date to include in the analysis
+        workers: Number of worker processes used for the imputations and
+            to fit the model grid
+        fit_cache_size: Number of fits each process keeps in its in-memory
+            cache, 0 to disable it. Fits only repeat when a model's rows are
+            unchanged, so the cache is off by default
+        fit_cache_dir: Optional directory used to persist fits between runs,
+            which enables the cache even if fit_cache_size is 0
+        incremental: Only refit models whose inputs changed since the last run
+            and merge them into the existing results in output_path. Rows
+            unchanged since the last run keep their imputations
+        warm_start: Seed each logistic fit with the previous window's
+            coefficients for the same outcome and imputation
+        batch_outcomes: Fit all outcomes that share rows and a date window
+            together with the batched logistic engine
+        solver: Logistic solver, 'sklearn' or 'irls'. The irls solver adds
+            lowerCI and upperCI columns to the results
+        bootstrap_replicates: If positive, write percentile bootstrap
+            intervals with this many replicates to lowerCI and upperCI
+        bootstrap_weights: Bootstrap replicate weights, 'poisson' or 'multinomial'
+        bootstrap_jobs: Number of threads each process uses for bootstrap chunks
+        chunk_size: If set, parse the input in chunks of this many rows,
+            printing a summary of the data and keeping a compact copy of
+            every row's model columns, instead of parsing the whole file
+            at once
+        seed: Seed of the imputations, random if None
+        imputation_cache_dir: Optional directory caching completed
+            imputations between runs, used when a seed is set
+        imputation_cache_mb: Maximum size of the imputation cache in MB
+        imputation_method: 'sklearn' for IterativeImputer, or 'fast' for
+            chained equations drawn in batched NumPy regressions
+        adjustment: 'average' for rates predicted at average covariates,
+            or 'indirect' for indirectly standardized rates from every
+            patient's expected risk, adding expected and oe_ratio columns
+        profile: Record wall time, CPU time and peak memory per stage and
+            time per model, and write them to SurgeonRates_profile.json
+        profile_top: Number of slowest models listed in the profile summary
+        resume: Keep the models finished by an interrupted run with the same
+            inputs and settings, and only fit the rest. Finished models are
+            always checkpointed to SurgeonRates_checkpoint until the results
+            are saved
+
+    Returns:
+        The saved results, or None if the run failed
     """
+    profiler = RunProfiler(enabled=profile)
+    checkpoint = None
     try:
-        print(f"Loading data from {data_path}")
-        all_data = pd.read_csv(data_path, dtype={
-            'eventId': str,
-            'userId': str,
-            'surgDate': str,
-            'yos': float,
-            'age': float,
-            'female': float,
-            'bmi': float,
-            'thickness': float,
-            'ulceration': float,
-            'mitoticIndex': float,
-            'site': str,
-            'slnd': float,
-            'posSlnd': float,
-            'posSlndClnd': float,
-            'anyComp2': float,
-            'anyComp3': float,
-            'woundInf2': float,
-            'woundInf3': float,
-            'cellulitis2': float,
-            'cellulitis3': float,
-            'seroma2': float,
-            'seroma3': float,
-            'graftComp2': float,
-            'graftComp3': float
-        })
-
-        print(f"Successfully loaded data with {len(all_data)} rows")
-        print("Columns found:", all_data.columns.tolist())
-        print("\nSample of data:")
-        print(all_data.head())
-        print("\nData types:")
-        print(all_data.dtypes)
-
-        # Convert surgDate to datetime
-        all_data['surgDate'] = pd.to_datetime(all_data['surgDate'])
-
-        # Initialize tools
-        rate_generator = RateGenerator()
-        imputer = MultipleImputer(n_imputations=5)
-
         # Variables to impute
         vars_to_impute = ['age', 'female', 'bmi', 'thickness', 'ulceration']
 
-        print("\nGenerating imputations for variables:", vars_to_impute)
-        imputed_values = imputer.generate_multiple_imputations(
-            df=all_data,
-            vars_to_impute=vars_to_impute,
-            patient_id='eventId'
-        )
-        print(f"Successfully generated {len(imputed_values)} imputations")
-
-        # Generate date IDs for analysis windows
-        date_ids = _generate_date_ids(all_data, 'surgDate')
-        print("\nGenerated date IDs:", date_ids[:5], "...")
-
-        # Calculate total iterations for progress tracking
-        comp_types = ['ANY', 'WOUND', 'CELLULITIS', 'SEROMA', 'GRAFT']
-        comp_grades = ['COMPGRADE2', 'COMPGRADE3']
+        with profiler.stage('load'):
+            # Only read the columns the model grid needs
+            print(f"Loading data from {data_path} ({detect_format(data_path)})")
+            summary = None
+            if chunk_size:
+                summary = ChunkSummary(_outcome_columns(), vars_to_impute)
+                all_data = load_chunked(
+                    data_path, _required_columns(vars_to_impute), summary, chunk_size
+                )
+            else:
+                all_data = load_data(data_path, columns=_required_columns(vars_to_impute))
+
+            print(f"Successfully loaded data with {len(all_data)} rows")
+            print("Columns found:", all_data.columns.tolist())
+            if summary is not None:
+                print("\nCovariates:")
+                print(summary.covariate_moments())
+                print("\nOutcomes:")
+                print(summary.summary())
+            else:
+                print("\nSample of data:")
+                print(all_data.head())
+                print("\nData types:")
+                print(all_data.dtypes)
 
-        total_iterations = (
-            len(comp_types) * len(comp_grades) * len(date_ids) +  # Complications
-            len(date_ids) +  # SLND
-            len(date_ids) +  # Positive SLND
-            len(date_ids)    # Complete node dissection
+        # Initialize tools
+        bootstrap = None
+        if bootstrap_replicates > 0:
+            bootstrap = BootstrapEngine(
+                n_replicates=bootstrap_replicates,
+                weights=bootstrap_weights,
+                n_jobs=bootstrap_jobs
+            )
+        rate_generator = RateGenerator(solver=solver, bootstrap=bootstrap, adjustment=adjustment)
+        imputation_cache = None
+        if imputation_cache_dir:
+            if seed is None:
+                print("Imputation cache disabled: imputations are only cached with --seed")
+            else:
+                imputation_cache = ImputationCache(imputation_cache_dir, imputation_cache_mb << 20)
+        imputer = MultipleImputer(
+            n_imputations=5,
+            random_state=seed,
+            n_jobs=workers,
+            cache=imputation_cache,
+            method=imputation_method
         )
 
-        print(f"\nTotal models to process: {total_iterations}")
-
-        # Initialize results DataFrame
-        user_results = pd.DataFrame()
-
-        # Use tqdm for the main loop
-        pbar = tqdm(total=total_iterations, desc="Processing models")
-
-        # Generate complication rates
-        comp_types = ['ANY', 'WOUND', 'CELLULITIS', 'SEROMA', 'GRAFT']
-        comp_grades = ['COMPGRADE2', 'COMPGRADE3']
-
-        for comp_type in comp_types:
-            for grade in comp_grades:
-                for date_id in date_ids:
-                    model_id = f"COMP.{comp_type}.{grade}.{date_id}"
-                    outcome = _map_complication_outcome(comp_type, grade)
-
-                    results = rate_generator.generate_rate(
-                        df=all_data,
-                        outcome=outcome,
-                        model_id=model_id,
-                        model_type='LOGISTIC',
-                        date_var='surgDate',
-                        user_id_var='userId',
-                        patient_id_var='eventId',
-                        weight_var='yos',
-                        imputed_values=imputed_values,
-                        date=last_surgery_date
-                    )
-
-                    user_results = pd.concat([user_results, results])
-                    pbar.update(1)
-                    pbar.set_postfix({'Current': f"{comp_type}-{grade}"})
-
-        # Generate SLND rates
-        slnd_model_ids = [f"SLND.{date_id}" for date_id in date_ids]
-        for model_id in slnd_model_ids:
-            results = rate_generator.generate_rate(
-                df=all_data,
-                outcome='slnd',
-                model_id=model_id,
-                model_type='LOGISTIC',
-                date_var='surgDate',
-                user_id_var='userId',
-                patient_id_var='eventId',
-                weight_var='yos',
-                imputed_values=imputed_values,
-                date=last_surgery_date
+        with profiler.stage('impute'):
+            # Incremental and resumed runs keep the imputations of unchanged
+            # rows, so new rows only change the models of their own windows
+            store = ImputationStore(
+                Path(output_path) / IMPUTATION_STORE_FILE,
+                (vars_to_impute, imputer.n_imputations, imputation_method, seed)
             )
-            user_results = pd.concat([user_results, results])
-            pbar.update(1)
-            pbar.set_postfix({'Current': 'SLND'})
-
-        # Generate positive SLND rates
-        pos_slnd_model_ids = [f"POSSLND.{date_id}" for date_id in date_ids]
-        for model_id in pos_slnd_model_ids:
-            results = rate_generator.generate_rate(
-                df=all_data[all_data['slnd'] == 1],
-                outcome='posSlnd',
-                model_id=model_id,
-                model_type='LOGISTIC',
-                date_var='surgDate',
-                user_id_var='userId',
-                patient_id_var='eventId',
-                weight_var='yos',
-                imputed_values=imputed_values,
-                date=last_surgery_date
-            )
-            user_results = pd.concat([user_results, results])
-            pbar.update(1)
-            pbar.set_postfix({'Current': 'POS-SLND'})
-
-        # Generate complete node dissection rates
-        clnd_model_ids = [f"CLND.{date_id}" for date_id in date_ids]
-        for model_id in clnd_model_ids:
-            results = rate_generator.generate_rate(
-                df=all_data[all_data['posSlnd'] == 1],
-                outcome='complete_node_dissection',
-                model_id=model_id,
-                model_type='LOGISTIC',
-                date_var='surgDate',
-                user_id_var='userId',
-                patient_id_var='eventId',
-                weight_var='yos',
-                imputed_values=imputed_values,
-                date=last_surgery_date
+            row_keys = ImputationStore.row_keys(all_data, ['eventId'] + vars_to_impute)
+            imputations = None
+            frozen = np.zeros(len(all_data), dtype=bool)
+            if incremental or resume:
+                imputations, frozen = store.freeze(row_keys)
+            if imputations is None:
+                print("\nGenerating imputations for variables:", vars_to_impute)
+                imputed_values = imputer.generate_multiple_imputations(
+                    df=all_data,
+                    vars_to_impute=vars_to_impute,
+                    patient_id='eventId'
+                )
+                print(f"Successfully generated {len(imputed_values)} imputations")
+                if imputation_cache is not None:
+                    print(f"Imputation cache: {'hit' if imputation_cache.hits else 'miss'}")
+                imputations = np.stack([
+                    imp_df[vars_to_impute].to_numpy(dtype=np.float64) for imp_df in imputed_values
+                ])
+                del imputed_values
+                if incremental or resume:
+                    imputations, frozen = store.freeze(row_keys, imputations)
+            if frozen.any():
+                print(f"Reusing the imputations of {frozen.sum()} of {len(all_data)} unchanged rows")
+            store.save(row_keys, imputations)
+
+        with profiler.stage('window'):
+            # Generate date IDs for analysis windows
+            if summary is not None:
+                date_ids = _date_ids(summary.dates())
+            else:
+                date_ids = _generate_date_ids(all_data, 'surgDate')
+            print("\nGenerated date IDs:", date_ids[:5], "...")
+
+            # Index the rows of every window once, then fingerprint every model
+            window_index = WindowIndex(all_data, 'surgDate')
+            model_specs = _build_model_specs(date_ids)
+            fingerprints = _model_fingerprints(
+                all_data, model_specs, vars_to_impute, imputations, window_index,
+                fit_settings=(('results', RateGenerator.RESULTS_VERSION),)
+                + (('seed', seed) if seed is not None else ())
+                + (('imputation', imputation_method) if imputation_method != 'sklearn' else ())
+                + (() if solver == 'sklearn' else (solver,))
+                + (() if adjustment == 'average' else (adjustment,))
+                + (bootstrap.settings() if bootstrap is not None else ())
             )
-            user_results = pd.concat([user_results, results])
-            pbar.update(1)
-            pbar.set_postfix({'Current': 'CLND'})
 
-        pbar.close()
+            # In incremental mode only refit models whose inputs changed
+            previous_results = None
+            fit_specs = model_specs
+            if incremental:
+                previous_results, previous_fingerprints = _load_previous_run(output_path)
+                if previous_results is None:
+                    print("\nNo previous run found, regenerating all models")
+                else:
+                    fit_specs = [
+                        spec for spec in model_specs
+                        if previous_fingerprints.get(spec['model_id']) != fingerprints[spec['model_id']]
+                    ]
+                    print(f"\nIncremental run: {len(fit_specs)} of {len(model_specs)} models changed")
+
+            # Finished models are checkpointed as they arrive; resuming keeps
+            # those whose fingerprint still matches
+            checkpoint = CheckpointStore(Path(output_path) / CHECKPOINT_DIR, CHECKPOINT_BATCH)
+            completed = {}
+            if resume:
+                fit_ids = {spec['model_id'] for spec in fit_specs}
+                completed = {
+                    model_id: results
+                    for model_id, results in checkpoint.load(fingerprints).items()
+                    if model_id in fit_ids
+                }
+                print(f"\nResuming: {len(completed)} of {len(fit_specs)} models already fitted")
+            else:
+                checkpoint.clear()
+            resumed_specs = [spec for spec in fit_specs if spec['model_id'] in completed]
+            fit_specs = [spec for spec in fit_specs if spec['model_id'] not in completed]
+
+        total_iterations = len(fit_specs)
 
-        # Save results
-        print("\nSaving results...")
-        _save_results(user_results, output_path)
-        print("Successfully saved results")
+        print(f"\nTotal models to process: {total_iterations}")
+        if workers > 1:
+            print(f"Fitting with {workers} worker processes")
+
+        with profiler.stage('fit'):
+            # Write each imputed covariate matrix once so workers can share it
+            design_matrices = None
+            if fit_specs:
+                design_matrices = SharedDesignMatrices.from_imputations(
+                    all_data,
+                    [pd.DataFrame(values, columns=vars_to_impute) for values in imputations],
+                    rate_generator.covariates
+                )
+            del imputations
+
+            # Collect per-imputation results and pool the whole grid at the end
+            pooler = ImputationPooler(rate_generator.ci_level)
+            for spec in resumed_specs:
+                if any(results is not None for results in completed[spec['model_id']]):
+                    pooler.add(spec['model_id'], completed[spec['model_id']])
+
+            # Use tqdm for the main loop
+            pbar = tqdm(total=total_iterations, desc="Processing models")
+
+            run_stats = {}
+            try:
+                for spec, imputation_results in _run_model_grid(
+                    fit_specs,
+                    all_data,
+                    window_index,
+                    design_matrices.paths if design_matrices is not None else [],
+                    workers=workers,
+                    fit_cache_size=fit_cache_size,
+                    fit_cache_dir=fit_cache_dir,
+                    run_stats=run_stats,
+                    warm_start=warm_start,
+                    batch_outcomes=batch_outcomes,
+                    solver=solver,
+                    bootstrap=bootstrap,
+                    adjustment=adjustment,
+                    profiler=profiler
+                ):
+                    checkpoint.add(spec['model_id'], fingerprints[spec['model_id']], imputation_results)
+
+                    # Early windows can hold too few cases to fit at all
+                    if all(results is None for results in imputation_results):
+                        print(f"\nSkipping {spec['model_id']}: no imputation could be fitted")
+                        pbar.update(1)
+                        continue
+
+                    pooler.add(spec['model_id'], imputation_results)
+                    pbar.update(1)
+                    pbar.set_postfix({'Current': spec['label']})
+            finally:
+                # Keep every finished model, even if the grid failed
+                checkpoint.flush()
+                if design_matrices is not None:
+                    design_matrices.cleanup()
+
+            pbar.close()
+
+        with profiler.stage('pool'):
+            user_results = pooler.pool()
+            user_results['date'] = last_surgery_date or datetime.now()
+            user_results = _order_by_grid(user_results, model_specs)
+            if fit_cache_size > 0 or fit_cache_dir:
+                print(f"Fit cache: {run_stats.get('cache_hits', 0)} hits, {run_stats.get('cache_misses', 0)} misses")
+            _print_convergence(run_stats)
+
+            if previous_results is not None:
+                user_results = _merge_results(previous_results, user_results, model_specs)
+
+        with profiler.stage('save'):
+            # Save results
+            print("\nSaving results...")
+            _save_results(user_results, output_path)
+            _save_manifest(fingerprints, output_path)
+            checkpoint.clear()
+            print("Successfully saved results")
+
+        if profile:
+            profile_path = Path(output_path) / PROFILE_FILE
+            profiler.save(profile_path, profile_top)
+            print(f"\nProfile written to {profile_path}")
+            print(profiler.summary(profile_top))
+
+        return user_results
 
     except Exception as e:
         print(f"\nError occurred: {str(e)}")
         print("\nTraceback:")
         traceback.print_exc()
-        return
+        if checkpoint is not None and checkpoint.has_batches():
+            print("\nFinished models are checkpointed; rerun with --resume to continue")
+        return None
+
+def _required_columns(vars_to_impute: List[str]) -> List[str]:
+    """Columns read from the input data for the model grid"""
+    return (
+        ['eventId', 'userId', 'surgDate', 'yos']
+        + vars_to_impute
+        + _outcome_columns()
+    )
+
+def _outcome_columns() -> List[str]:
+    """Outcome columns of the model grid"""
+    return [
+        _map_complication_outcome(comp_type, grade)
+        for comp_type in COMP_TYPES
+        for grade in COMP_GRADES
+    ] + ['slnd', 'posSlnd', 'posSlndClnd']
+
+def _build_model_specs(date_ids: List[str]) -> List[Dict]:
+    """Build the ordered list of models to fit"""
+    specs = []
+
+    # Complication rates
+    for comp_type in COMP_TYPES:
+        for grade in COMP_GRADES:
+            for date_id in date_ids:
+                specs.append({
+                    'model_id': f"COMP.{comp_type}.{grade}.{date_id}",
+                    'outcome': _map_complication_outcome(comp_type, grade),
+                    'subset_var': None,
+                    'date_id': date_id,
+                    'label': f"{comp_type}-{grade}"
+                })
+
+    # SLND, positive SLND and complete node dissection rates
+    for prefix, outcome, subset_var, label in [
+        ('SLND', 'slnd', None, 'SLND'),
+        ('POSSLND', 'posSlnd', 'slnd', 'POS-SLND'),
+        ('CLND', 'posSlndClnd', 'posSlnd', 'CLND')
+    ]:
+        for date_id in date_ids:
+            specs.append({
+                'model_id': f"{prefix}.{date_id}",
+                'outcome': outcome,
+                'subset_var': subset_var,
+                'date_id': date_id,
+                'label': label
+            })
+
+    # Windows of the same model family and thickness category form a chain
+    for spec in specs:
+        spec['chain'] = spec['model_id'].rsplit('.DATE', 1)[0]
+
+    return specs
+
+def _run_model_grid(
+    model_specs: List[Dict],
+    all_data: pd.DataFrame,
+    window_index: WindowIndex,
+    design_paths: List[str],
+    workers: int = 1,
+    fit_cache_size: int = 0,
+    fit_cache_dir: Optional[str] = None,
+    run_stats: Optional[Dict[str, int]] = None,
+    warm_start: bool = False,
+    batch_outcomes: bool = False,
+    solver: str = 'sklearn',
+    bootstrap: Optional[BootstrapEngine] = None,
+    adjustment: str = 'average',
+    profiler: Optional[RunProfiler] = None
+) -> Iterator[Tuple[Dict, List[Optional[pd.DataFrame]]]]:
+    """
+    Fit every (model, imputation) task and yield per-model results
+
+    Models are grouped into fitting units: single models, or with
+    batch_outcomes all outcomes that share rows and a date window. Units
+    are grouped into batches that each run in a single process, and
+    batches are dispatched to a process pool when workers > 1. Results are
+    always gathered in submission order, so the output does not depend on
+    the number of workers. Models are yielded in grid order unless
+    batch_outcomes is set, in which case they follow the fitting units.
+    Each imputation's design matrix is passed by the path of its
+    memory-mapped file. Fit cache and convergence counters from every
+    process are added to run_stats, and the time of every task is added
+    to profiler, split evenly over the models of its unit.
+    """
+    init_args = (all_data, window_index, design_paths, fit_cache_size, fit_cache_dir, warm_start, solver, bootstrap, adjustment)
+    n_imputations = len(design_paths)
+    units = _group_model_specs(model_specs, batch_outcomes)
+    batches = [
+        [(unit, i) for unit in batch_units for i in range(n_imputations)]
+        for batch_units in _batch_units(units, warm_start)
+    ]
+
+    if workers > 1:
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=init_args
+        )
+        batch_results = executor.map(_fit_batch, batches)
+    else:
+        executor = None
+        _init_worker(*init_args)
+        batch_results = map(_fit_batch, batches)
+
+    try:
+        for batch, (task_results, batch_stats, task_times) in zip(batches, batch_results):
+            if run_stats is not None:
+                for key, value in batch_stats.items():
+                    run_stats[key] = run_stats.get(key, 0) + value
+            for start in range(0, len(batch), n_imputations):
+                unit = batch[start][0]
+                unit_results = task_results[start:start + n_imputations]
+                if profiler is not None:
+                    for times in task_times[start:start + n_imputations]:
+                        for spec in unit:
+                            profiler.record_model(spec, *(value / len(unit) for value in times))
+                for j, spec in enumerate(unit):
+                    yield spec, [results[j] for results in unit_results]
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        _worker_state.clear()
+
+def _group_model_specs(model_specs: List[Dict], batch_outcomes: bool) -> List[List[Dict]]:
+    """
+    Group the model grid into units fitted together
+
+    With batch_outcomes, models with the same row subset and date window
+    share one design matrix and form one unit, in order of first
+    appearance in the grid. Otherwise every model is its own unit.
+    """
+    if not batch_outcomes:
+        return [[spec] for spec in model_specs]
+
+    units: Dict[Tuple[Optional[str], str], List[Dict]] = {}
+    for spec in model_specs:
+        units.setdefault((spec['subset_var'], spec['date_id']), []).append(spec)
+    return list(units.values())
+
+def _batch_units(units: List[List[Dict]], warm_start: bool) -> List[List[List[Dict]]]:
+    """
+    Group fitting units into batches that are fitted in one process
+
+    Without warm starts every unit is its own batch. With warm starts a
+    batch holds up to WARM_START_BLOCK consecutive windows of the same
+    chain, and seeds are reset at the start of each batch, so the fits do
+    not depend on how batches are spread over workers.
+    """
+    if not warm_start:
+        return [[unit] for unit in units]
+
+    batches = []
+    for unit in units:
+        if (
+            batches
+            and batches[-1][-1][0]['chain'] == unit[0]['chain']
+            and len(batches[-1]) < WARM_START_BLOCK
+        ):
+            batches[-1].append(unit)
+        else:
+            batches.append([unit])
+    return batches
+
+def _init_worker(
+    all_data: pd.DataFrame,
+    window_index: WindowIndex,
+    design_paths: List[str],
+    fit_cache_size: int,
+    fit_cache_dir: Optional[str],
+    warm_start: bool,
+    solver: str,
+    bootstrap: Optional[BootstrapEngine],
+    adjustment: str
+) -> None:
+    """Store the shared inputs for model grid tasks in this process"""
+    fit_cache = FitCache(fit_cache_size, fit_cache_dir) if fit_cache_size > 0 or fit_cache_dir else None
+    _worker_state['all_data'] = all_data
+    _worker_state['window_index'] = window_index
+    _worker_state['design_matrices'] = [SharedDesignMatrices.open(path) for path in design_paths]
+    _worker_state['rate_generator'] = RateGenerator(
+        fit_cache=fit_cache,
+        warm_start=warm_start,
+        solver=solver,
+        bootstrap=bootstrap,
+        adjustment=adjustment
+    )
+    _worker_state['prepared'] = None
+
+def _fit_batch(
+    tasks: List[Tuple[List[Dict], int]]
+) -> Tuple[List[List[Optional[pd.DataFrame]]], Dict[str, int], List[Tuple[float, float, float]]]:
+    """
+    Fit a batch of (unit, imputation) tasks in order
+
+    Returns:
+        The results of each task, one entry per model of the unit (None if
+        the fit failed), the fit cache and convergence counters incurred
+        by the batch, and the row selection wall time, fit wall time and
+        CPU time of each task
+    """
+    rate_generator = _worker_state['rate_generator']
+    rate_generator.reset_warm_start()
+    before = _worker_stats(rate_generator)
+
+    results = []
+    times = []
+    for unit, imputation in tasks:
+        cpu = time.process_time()
+        results.append(_fit_unit_imputation(unit, imputation))
+        times.append((*_worker_state['task_times'], time.process_time() - cpu))
+
+    after = _worker_stats(rate_generator)
+    return results, {key: after[key] - before[key] for key in after}, times
+
+def _worker_stats(rate_generator: RateGenerator) -> Dict[str, int]:
+    """Snapshot the fit cache and convergence counters of this process"""
+    fit_cache = rate_generator.fit_cache
+    return {
+        'cache_hits': fit_cache.hits if fit_cache else 0,
+        'cache_misses': fit_cache.misses if fit_cache else 0,
+        **rate_generator.fit_stats
+    }
+
+def _fit_unit_imputation(unit: List[Dict], imputation: int) -> List[Optional[pd.DataFrame]]:
+    """
+    Fit a single imputation of every model in a unit
+
+    Single-model units are fitted with scikit-learn; larger units go to
+    the batched logistic engine. If a batched fit fails, its models are
+    refitted one at a time. Failed fits are returned as None.
+    """
+    rate_generator = _worker_state['rate_generator']
+    outcomes = [spec['outcome'] for spec in unit]
+    start = time.perf_counter()
+
+    # Consecutive tasks usually belong to the same unit, so reuse its data
+    prepared = _worker_state['prepared']
+    if prepared is None or prepared[0] != unit[0]['model_id']:
+        df = rate_generator.prepare_model_data(
+            _model_rows(_worker_state['all_data'], unit[0], _worker_state['window_index']),
+            outcome=outcomes,
+            model_type='LOGISTIC',
+            weight_var='yos'
+        )
+        prepared = (unit[0]['model_id'], df)
+        _worker_state['prepared'] = prepared
+
+    selected = time.perf_counter()
+
+    design_matrix = _worker_state['design_matrices'][imputation]
+    results = None
+    if len(unit) > 1:
+        try:
+            results = rate_generator.generate_imputation_rates(
+                prepared[1],
+                design_matrix,
+                outcomes=outcomes,
+                model_type='LOGISTIC',
+                imputation=imputation
+            )
+        except Exception as e:
+            # Refit the models one by one so only the failing ones are skipped
+            print(f"Error processing imputed dataset, fitting its {len(unit)} models separately: {str(e)}")
+
+    if results is None:
+        results = []
+        for outcome in outcomes:
+            try:
+                results.append(rate_generator.generate_imputation_rate(
+                    prepared[1],
+                    design_matrix,
+                    outcome=outcome,
+                    model_type='LOGISTIC',
+                    imputation=imputation
+                ))
+            except Exception as e:
+                print(f"Error processing imputed dataset: {str(e)}")
+                results.append(None)
+
+    _worker_state['task_times'] = (selected - start, time.perf_counter() - selected)
+    return results
+
+def _print_convergence(run_stats: Dict[str, int]) -> None:
+    """Print logistic solver iteration counts for cold and warm-started fits"""
+    for kind in ['cold', 'warm']:
+        fits = run_stats.get(f'{kind}_fits', 0)
+        if fits:
+            iterations = run_stats[f'{kind}_iterations']
+            print(
+                f"{kind.capitalize()}-started fits: {fits}, "
+                f"{iterations} solver iterations ({iterations / fits:.1f} per fit)"
+            )
+
+def _model_rows(all_data: pd.DataFrame, spec: Dict, window_index: WindowIndex) -> pd.DataFrame:
+    """Select the rows a model is fitted on: its date window, then its subset"""
+    rows = window_index.rows(spec['date_id'])
+    if spec['subset_var'] is not None:
+        rows = rows[all_data[spec['subset_var']].to_numpy()[rows] == 1]
+    return all_data.iloc[rows]
+
+def _model_fingerprints(
+    all_data: pd.DataFrame,
+    model_specs: List[Dict],
+    vars_to_impute: List[str],
+    imputations: np.ndarray,
+    window_index: WindowIndex,
+    fit_settings: Tuple = ()
+) -> Dict[str, str]:
+    """
+    Fingerprint the inputs of every model in the grid
+
+    A fingerprint covers the model's rows (surgeon, weight, outcome, the
+    raw covariates and every imputation of them), the number of
+    imputations and any non-default imputation, solver and interval
+    settings. Rows keep their imputations between incremental runs, so
+    only models whose own rows changed get new fingerprints. Rows are
+    hashed once per outcome and subset; the row hashes of a window are
+    then summed from prefix sums along the window index, so each model
+    costs O(1).
+    """
+    fingerprints = {}
+    computed = {}
+    # Every imputation of a row's covariates, side by side
+    imputed = pd.DataFrame(
+        imputations.transpose(1, 0, 2).reshape(len(all_data), -1),
+        index=all_data.index
+    ).add_prefix('imputed_')
+    for spec in model_specs:
+        rows_key = (spec['outcome'], spec['subset_var'])
+        if rows_key not in computed:
+            columns = ['userId', 'yos', spec['outcome']] + vars_to_impute
+            columns = [col for col in columns if col in all_data.columns]
+            if spec['subset_var'] is not None:
+                in_subset = (all_data[spec['subset_var']] == 1).to_numpy()
+            else:
+                in_subset = np.ones(len(all_data), dtype=bool)
+
+            # Two independently keyed row hashes, zero outside the subset
+            rows = pd.concat([all_data[columns], imputed], axis=1)
+            hash_sums = [
+                window_index.cumulative(np.where(
+                    in_subset,
+                    pd.util.hash_pandas_object(rows, index=False, hash_key=key).to_numpy(),
+                    np.uint64(0)
+                ))
+                for key in FINGERPRINT_HASH_KEYS
+            ]
+            counts = window_index.cumulative(in_subset.astype(np.int64))
+            computed[rows_key] = (columns, hash_sums, counts)
+
+        columns, hash_sums, counts = computed[rows_key]
+        category, end = window_index.window(spec['date_id'])
+        fingerprints[spec['model_id']] = hashlib.sha256(repr((
+            columns,
+            spec['outcome'],
+            vars_to_impute,
+            len(imputations),
+            fit_settings,
+            int(counts[category][end]),
+            [int(sums[category][end]) for sums in hash_sums]
+        )).encode()).hexdigest()
+
+    return fingerprints
+
+def _load_previous_run(output_path: str) -> Tuple[Optional[pd.DataFrame], Dict[str, str]]:
+    """Load the full results and model fingerprints of the previous run"""
+    output_dir = Path(output_path)
+    results_path = output_dir / 'SurgeonRates_full.csv'
+    manifest_path = output_dir / MANIFEST_FILE
+    if not results_path.exists() or not manifest_path.exists():
+        return None, {}
+
+    with open(manifest_path) as f:
+        fingerprints = json.load(f)['models']
+
+    results = pd.read_csv(
+        results_path,
+        dtype={'surgeon_id': str, 'model_id': str},
+        float_precision='round_trip'
+    )
+    results['date'] = pd.to_datetime(results['date'], format='mixed')
+    return results, fingerprints
+
+def _merge_results(
+    previous_results: pd.DataFrame,
+    new_results: pd.DataFrame,
+    model_specs: List[Dict]
+) -> pd.DataFrame:
+    """Replace refitted models in the previous results, keeping grid order"""
+    model_order = {spec['model_id']: i for i, spec in enumerate(model_specs)}
+    refitted = set(new_results['model_id']) if len(new_results) else set()
+    kept = previous_results[
+        previous_results['model_id'].isin(model_order.keys())
+        & ~previous_results['model_id'].isin(refitted)
+    ]
+
+    merged = pd.concat([kept, new_results]) if len(new_results) else kept
+    return _order_by_grid(merged, model_specs)
+
+def _order_by_grid(results: pd.DataFrame, model_specs: List[Dict]) -> pd.DataFrame:
+    """Sort results into grid order, keeping the row order within each model"""
+    if len(results) == 0:
+        return results
+
+    model_order = {spec['model_id']: i for i, spec in enumerate(model_specs)}
+    order = results['model_id'].map(model_order).to_numpy()
+    if (np.diff(order) >= 0).all():
+        return results
+    return results.iloc[np.argsort(order, kind='stable')]
+
+def _save_manifest(fingerprints: Dict[str, str], output_path: str) -> None:
+    """Save the model fingerprints used by incremental runs"""
+    output_dir = Path(output_path)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    with open(output_dir / MANIFEST_FILE, 'w') as f:
+        json.dump({'models': fingerprints}, f)
 
 def _generate_date_ids(df: pd.DataFrame, date_col: str) -> List[str]:
     """Generate date IDs for different analysis windows"""
-    thickness_categories = ['ALLLENGTH', 'LESSTHANPT8MM', 'PT8MMTO1MM', 'GRTHAN1MM']
-    dates = df[date_col].dt.strftime('%Y%m%d')
-    return [f"{cat}.DATE{date}" for cat in thickness_categories for date in dates.unique()]
+    return _date_ids(pd.DatetimeIndex(np.sort(df[date_col].dropna().unique())))
+
+def _date_ids(dates: pd.DatetimeIndex) -> List[str]:
+    """Date IDs for every thickness category and distinct date, in date order"""
+    dates = dates.strftime('%Y%m%d').unique()
+    return [f"{cat}.DATE{date}" for cat in THICKNESS_CATEGORIES for date in dates]
 
 def _map_complication_outcome(comp_type: str, grade: str) -> str:
     """Map complication type and grade to outcome variable name"""
@@ -232,12 +811,54 @@ if __name__ == '__main__':
     import argparse
 
     parser = argparse.ArgumentParser(description='Generate melanoma surgeon rates')
-    parser.add_argument('--data-path', required=True, help='Path to input data file')
+    parser.add_argument('--data-path', required=True, help='Path to input data file (CSV, Parquet or Arrow IPC)')
     parser.add_argument('--output-path', required=True, help='Path to save results')
     parser.add_argument('--last-surgery-date', help='Last surgery date to include (YYYY-MM-DD)')
+    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes (default: 1)')
+    parser.add_argument('--fit-cache-size', type=int, default=0, help='In-memory fit cache entries per process (default: 0, disabled)')
+    parser.add_argument('--fit-cache-dir', help='Directory used to persist fits between runs')
+    parser.add_argument('--incremental', action='store_true', help='Only refit models whose inputs changed since the last run')
+    parser.add_argument('--warm-start', action='store_true', help="Seed each fit with the previous window's coefficients")
+    parser.add_argument('--batch-outcomes', action='store_true', help='Fit outcomes sharing rows and a window together')
+    parser.add_argument('--solver', choices=RateGenerator.SOLVERS, default='sklearn', help='Logistic solver; irls adds confidence intervals')
+    parser.add_argument('--bootstrap', type=int, default=0, help='Number of bootstrap replicates for confidence intervals')
+    parser.add_argument('--bootstrap-weights', choices=BootstrapEngine.WEIGHT_SCHEMES, default='poisson', help='Bootstrap replicate weights')
+    parser.add_argument('--bootstrap-jobs', type=int, default=1, help='Threads per process for bootstrap chunks')
+    parser.add_argument('--chunk-size', type=int, help='Parse the input in chunks of this many rows')
+    parser.add_argument('--seed', type=int, help='Seed of the imputations')
+    parser.add_argument('--imputation-cache-dir', help='Directory caching imputations between runs (needs --seed)')
+    parser.add_argument('--imputation-cache-mb', type=int, default=1024, help='Maximum imputation cache size in MB')
+    parser.add_argument('--imputation-method', choices=MultipleImputer.METHODS, default='sklearn', help='Imputation method')
+    parser.add_argument('--profile', action='store_true', help='Write per-stage and per-model timings to SurgeonRates_profile.json')
+    parser.add_argument('--profile-top', type=int, default=10, help='Number of slowest models in the profile summary')
+    parser.add_argument('--adjustment', choices=RateGenerator.ADJUSTMENTS, default='average', help='Risk adjustment; indirect gives O/E standardized rates')
+    parser.add_argument('--resume', action='store_true', help='Continue an interrupted run, skipping checkpointed models')
 
     args = parser.parse_args()
 
     last_date = datetime.strptime(args.last_surgery_date, '%Y-%m-%d') if args.last_surgery_date else None
 
-    generate_melanoma_rates(args.data_path, args.output_path, last_date)
+    generate_melanoma_rates(
+        args.data_path,
+        args.output_path,
+        last_date,
+        workers=args.workers,
+        fit_cache_size=args.fit_cache_size,
+        fit_cache_dir=args.fit_cache_dir,
+        incremental=args.incremental,
+        warm_start=args.warm_start,
+        batch_outcomes=args.batch_outcomes,
+        solver=args.solver,
+        bootstrap_replicates=args.bootstrap,
+        bootstrap_weights=args.bootstrap_weights,
+        bootstrap_jobs=args.bootstrap_jobs,
+        chunk_size=args.chunk_size,
+        seed=args.seed,
+        imputation_cache_dir=args.imputation_cache_dir,
+        imputation_cache_mb=args.imputation_cache_mb,
+        imputation_method=args.imputation_method,
+        adjustment=args.adjustment,
+        profile=args.profile,
+        profile_top=args.profile_top,
+        resume=args.resume
+    )
@@ -5,6 +5,10 @@ from datetime import datetime
 from pathlib import Path
 
 from surgeon_rates.generate_melanoma_rates import generate_melanoma_rates
+from surgeon_rates.utils.bootstrap import BootstrapEngine
+from surgeon_rates.utils.db_loader import LOAD_BATCH_SIZE, load_rates
+from surgeon_rates.utils.imputation import MultipleImputer
+from surgeon_rates.utils.rate_generator import RateGenerator
 
 
 class Command(BaseCommand):
@@ -15,7 +19,7 @@ class Command(BaseCommand):
             '--data-file',
             type=str,
             default='df_main.csv',
-            help='Input data file (default: df_main.csv)'
+            help='Input data file in CSV, Parquet or Arrow IPC format, detected automatically (default: df_main.csv)'
         )
         parser.add_argument(
             '--output-dir',
@@ -28,6 +32,121 @@ class Command(BaseCommand):
             type=str,
             help='Last surgery date to include (format: YYYY-MM-DD)'
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of worker processes used to fit models (default: 1)'
+        )
+        parser.add_argument(
+            '--fit-cache-size',
+            type=int,
+            default=0,
+            help='In-memory fit cache entries per process (default: 0, disabled)'
+        )
+        parser.add_argument(
+            '--fit-cache-dir',
+            type=str,
+            help='Directory used to persist fits between runs'
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Only refit models whose inputs changed since the last run'
+        )
+        parser.add_argument(
+            '--warm-start',
+            action='store_true',
+            help="Seed each fit with the previous window's coefficients"
+        )
+        parser.add_argument(
+            '--batch-outcomes',
+            action='store_true',
+            help='Fit all outcomes that share rows and a date window together'
+        )
+        parser.add_argument(
+            '--solver',
+            choices=RateGenerator.SOLVERS,
+            default='sklearn',
+            help='Logistic solver; irls also writes lowerCI/upperCI confidence intervals'
+        )
+        parser.add_argument(
+            '--bootstrap',
+            type=int,
+            default=0,
+            help='Number of bootstrap replicates for lowerCI/upperCI (0 disables the bootstrap)'
+        )
+        parser.add_argument(
+            '--bootstrap-weights',
+            choices=BootstrapEngine.WEIGHT_SCHEMES,
+            default='poisson',
+            help='Bootstrap replicate weights'
+        )
+        parser.add_argument(
+            '--bootstrap-jobs',
+            type=int,
+            default=1,
+            help='Threads each worker uses for bootstrap chunks'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            help='Parse the input in chunks of this many rows instead of all at once'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Seed of the imputations (random if omitted)'
+        )
+        parser.add_argument(
+            '--imputation-cache-dir',
+            help='Directory caching completed imputations between runs (requires --seed)'
+        )
+        parser.add_argument(
+            '--imputation-cache-mb',
+            type=int,
+            default=1024,
+            help='Maximum size of the imputation cache in MB'
+        )
+        parser.add_argument(
+            '--imputation-method',
+            choices=MultipleImputer.METHODS,
+            default='sklearn',
+            help='sklearn IterativeImputer, or fast NumPy chained equations'
+        )
+        parser.add_argument(
+            '--adjustment',
+            choices=RateGenerator.ADJUSTMENTS,
+            default='average',
+            help='Rates at average covariates, or indirectly standardized (observed/expected) rates'
+        )
+        parser.add_argument(
+            '--profile',
+            action='store_true',
+            help='Record time and peak memory per stage and time per model in SurgeonRates_profile.json'
+        )
+        parser.add_argument(
+            '--profile-top',
+            type=int,
+            default=10,
+            help='Number of slowest models listed in the profile summary'
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Continue an interrupted run, skipping models already checkpointed'
+        )
+        parser.add_argument(
+            '--to-db',
+            action='store_true',
+            help='Replace the rates in the SurgeonRate tables with the generated rates'
+        )
+        parser.add_argument(
+            '--db-batch-size',
+            type=int,
+            default=LOAD_BATCH_SIZE,
+            help=f'Rows sent per COPY or bulk_create batch with --to-db (default: {LOAD_BATCH_SIZE})'
+        )
 
     def handle(self, *args, **options):
         # Get the base directory
@@ -62,6 +181,26 @@ class Command(BaseCommand):
                 self.stderr.write(self.style.ERROR('Invalid date format. Use YYYY-MM-DD'))
                 return
         
+        if options['workers'] < 1:
+            self.stderr.write(self.style.ERROR('--workers must be at least 1'))
+            return
+            
+        if options['bootstrap'] < 0 or options['bootstrap_jobs'] < 1:
+            self.stderr.write(self.style.ERROR('--bootstrap must be non-negative and --bootstrap-jobs at least 1'))
+            return
+            
+        if options['chunk_size'] is not None and options['chunk_size'] < 1:
+            self.stderr.write(self.style.ERROR('--chunk-size must be at least 1'))
+            return
+            
+        if options['profile_top'] < 0:
+            self.stderr.write(self.style.ERROR('--profile-top must be non-negative'))
+            return
+            
+        if options['db_batch_size'] < 1:
+            self.stderr.write(self.style.ERROR('--db-batch-size must be at least 1'))
+            return
+        
         # Generate the rates
         output_path = os.path.join(output_dir, 'surgeon_rates.csv')
         
@@ -70,11 +209,45 @@ class Command(BaseCommand):
         self.stdout.write(f'Output file: {output_path}')
         
         try:
-            generate_melanoma_rates(
+            results = generate_melanoma_rates(
                 data_path=data_path,
                 output_path=output_path,
-                last_surgery_date=last_date
+                last_surgery_date=last_date,
+                workers=options['workers'],
+                fit_cache_size=options['fit_cache_size'],
+                fit_cache_dir=options['fit_cache_dir'],
+                incremental=options['incremental'],
+                warm_start=options['warm_start'],
+                batch_outcomes=options['batch_outcomes'],
+                solver=options['solver'],
+                bootstrap_replicates=options['bootstrap'],
+                bootstrap_weights=options['bootstrap_weights'],
+                bootstrap_jobs=options['bootstrap_jobs'],
+                chunk_size=options['chunk_size'],
+                seed=options['seed'],
+                imputation_cache_dir=options['imputation_cache_dir'],
+                imputation_cache_mb=options['imputation_cache_mb'],
+                imputation_method=options['imputation_method'],
+                adjustment=options['adjustment'],
+                profile=options['profile'],
+                profile_top=options['profile_top'],
+                resume=options['resume']
             )
-            self.stdout.write(self.style.SUCCESS('Successfully generated surgeon rates'))
         except Exception as e:
-            self.stderr.write(self.style.ERROR(f'Error generating rates: {str(e)}')) 
\ No newline at end of file
+            self.stderr.write(self.style.ERROR(f'Error generating rates: {str(e)}'))
+            return
+            
+        if results is None:
+            self.stderr.write(self.style.ERROR('Error generating rates, see the output above'))
+            return
+        self.stdout.write(self.style.SUCCESS('Successfully generated surgeon rates'))
+        
+        if options['to_db']:
+            self.stdout.write('Loading rates into the database...')
+            try:
+                loaded = load_rates(results, options['db_batch_size'])
+            except Exception as e:
+                self.stderr.write(self.style.ERROR(f'Error loading rates: {str(e)}'))
+                return
+            for table, count in loaded.items():
+                self.stdout.write(self.style.SUCCESS(f'Loaded {count} rates into {table}')) 
\ No newline at end of file
@@ -0,0 +1,102 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Patient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('patient_id', models.CharField(max_length=100, unique=True)),
+                ('age', models.FloatField()),
+                ('female', models.BooleanField()),
+                ('bmi', models.FloatField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Surgeon',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.CharField(max_length=100, unique=True)),
+                ('name', models.CharField(max_length=100)),
+                ('years_of_service', models.FloatField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MelanomaProcedure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=100, unique=True)),
+                ('surgery_date', models.DateField()),
+                ('thickness', models.FloatField()),
+                ('ulceration', models.BooleanField()),
+                ('slnd_performed', models.BooleanField(default=False)),
+                ('slnd_positive', models.BooleanField(default=False)),
+                ('complete_node_dissection', models.BooleanField(default=False)),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='surgeon_rates.patient')),
+                ('surgeon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='surgeon_rates.surgeon')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SurgeonRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_id', models.CharField(max_length=100)),
+                ('rate', models.FloatField()),
+                ('cases', models.IntegerField()),
+                ('method', models.CharField(max_length=100)),
+                ('date', models.DateField()),
+                ('covariates', models.TextField(blank=True)),
+                ('heterotest', models.FloatField(null=True)),
+                ('routine_unadjusted', models.BooleanField(default=False)),
+                ('result_text', models.TextField()),
+                ('total_cases', models.IntegerField()),
+                ('num_users', models.IntegerField()),
+                ('min_events', models.IntegerField()),
+                ('avg_cov', models.TextField(blank=True)),
+                ('surgeon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='surgeon_rates.surgeon')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Complication',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('complication_type', models.CharField(choices=[('ANY', 'Any Complication'), ('WOUND', 'Wound Infection'), ('CELLULITIS', 'Cellulitis'), ('SEROMA', 'Seroma'), ('GRAFT', 'Graft Complication')], max_length=20)),
+                ('grade', models.IntegerField(choices=[(2, 'Grade 2'), (3, 'Grade 3')])),
+                ('date_occurred', models.DateField()),
+                ('procedure', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='surgeon_rates.melanomaprocedure')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['complication_type', 'grade'], name='surgeon_rat_complic_58cfd9_idx'), models.Index(fields=['procedure'], name='surgeon_rat_procedu_8c33ae_idx')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='melanomaprocedure',
+            index=models.Index(fields=['surgery_date'], name='surgeon_rat_surgery_0b9e22_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='melanomaprocedure',
+            index=models.Index(fields=['surgeon'], name='surgeon_rat_surgeon_c8998a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='surgeonrate',
+            index=models.Index(fields=['model_id'], name='surgeon_rat_model_i_e54a83_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='surgeonrate',
+            index=models.Index(fields=['surgeon'], name='surgeon_rat_surgeon_25440c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='surgeonrate',
+            index=models.Index(fields=['date'], name='surgeon_rat_date_13566a_idx'),
+        ),
+    ]
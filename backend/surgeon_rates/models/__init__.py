@@ -0,0 +1 @@
+from .melanoma import Complication, MelanomaProcedure, Patient, Surgeon, SurgeonRate
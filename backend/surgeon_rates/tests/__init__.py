@@ -0,0 +1,3 @@
+"""
+Surgeon rates tests
+"""
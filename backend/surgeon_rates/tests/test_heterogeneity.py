@@ -0,0 +1,100 @@
+import unittest
+
+import numpy as np
+from scipy.stats import chi2
+from sklearn.linear_model import LogisticRegression
+
+from surgeon_rates.utils.heterogeneity import heterogeneity_tests
+from surgeon_rates.utils.logistic import BatchedLogisticRegression
+from surgeon_rates.utils.rate_generator import RateGenerator
+
+def make_cases(n_rows: int = 600, n_surgeons: int = 8, n_outcomes: int = 1, effect: float = 0.0, seed: int = 0):
+    """Cases of several surgeons with outcomes from a logistic model"""
+    rng = np.random.default_rng(seed)
+    codes = rng.integers(0, n_surgeons, n_rows)
+    X = np.column_stack([rng.normal(0, 1, n_rows), rng.integers(0, 2, n_rows), rng.exponential(1, n_rows)])
+    surgeon_effect = effect * np.linspace(-1, 1, n_surgeons)[codes]
+    eta = -1.5 + 0.5 * X[:, 0] + 0.3 * X[:, 2] + surgeon_effect
+    Y = (rng.random((n_rows, n_outcomes)) < 1 / (1 + np.exp(-eta[:, None]))).astype(float)
+    weights = 1 / np.sqrt(rng.integers(1, 8, n_rows))
+    return codes, X, Y, weights
+
+def dense_statistic(codes, n_surgeons, y, X, weights):
+    """The robust score statistic computed directly, with a pseudo-inverse of V"""
+    model = BatchedLogisticRegression(tol=1e-12).fit(X, y, sample_weight=weights)
+    S, _, _ = model._outcome_weights(y[:, None], weights)
+    s = S[:, 0]
+    p = model.predict_proba(X)[:, 0]
+    design = np.hstack([np.ones((len(X), 1)), X])
+    Z = np.eye(n_surgeons)[codes]
+
+    r = s * (y - p)
+    w = s * p * (1 - p)
+    penalty = np.diag(np.r_[0.0, np.ones(X.shape[1])])
+    projection = (Z.T @ (w[:, None] * design)) @ np.linalg.inv(design.T @ (w[:, None] * design) + penalty)
+    adjusted = Z - design @ projection.T
+    V = adjusted.T @ (r[:, None] ** 2 * adjusted)
+    U = Z.T @ r
+    return U @ np.linalg.pinv(V) @ U
+
+class HeterogeneityTest(unittest.TestCase):
+    def test_matches_dense_computation(self):
+        codes, X, Y, weights = make_cases(effect=0.5)
+        model = BatchedLogisticRegression().fit(X, Y, sample_weight=weights)
+        coefs = np.column_stack([model.intercept_, model.coef_])
+        result = heterogeneity_tests(codes, 8, Y, X, coefs, weights)
+
+        self.assertAlmostEqual(result['chisq'][0], dense_statistic(codes, 8, Y[:, 0], X, weights), places=6)
+        self.assertEqual(result['df'][0], 7)
+        self.assertAlmostEqual(result['p_value'][0], chi2.sf(result['chisq'][0], 7))
+
+    def test_same_result_from_any_solver(self):
+        codes, X, Y, weights = make_cases(effect=0.3, seed=1)
+        sklearn_model = LogisticRegression(**RateGenerator.SKLEARN_SETTINGS).fit(X, Y[:, 0], sample_weight=weights)
+        irls_model = BatchedLogisticRegression().fit(X, Y, sample_weight=weights)
+        p_values = [
+            heterogeneity_tests(codes, 8, Y, X, np.r_[model.intercept_, model.coef_[0]][None, :], weights)['p_value'][0]
+            for model in [sklearn_model, irls_model]
+        ]
+        self.assertAlmostEqual(p_values[0], p_values[1], places=10)
+
+        # A loosely converged fit only moves the p-value slightly
+        loose_model = LogisticRegression(class_weight='balanced').fit(X, Y[:, 0], sample_weight=weights)
+        loose = heterogeneity_tests(codes, 8, Y, X, np.r_[loose_model.intercept_, loose_model.coef_[0]][None, :], weights)
+        self.assertAlmostEqual(loose['p_value'][0], p_values[1], places=4)
+
+    def test_batched_outcomes_match_single_fits(self):
+        codes, X, Y, weights = make_cases(n_outcomes=3, seed=2)
+        Y[::7, 1] = np.nan
+        model = BatchedLogisticRegression().fit(X, Y, sample_weight=weights)
+        batched = heterogeneity_tests(codes, 8, Y, X, np.column_stack([model.intercept_, model.coef_]), weights)
+        for k in range(3):
+            single = heterogeneity_tests(
+                codes, 8, Y[:, k], X, np.r_[model.intercept_[k], model.coef_[k]][None, :], weights
+            )
+            self.assertAlmostEqual(batched['chisq'][k], single['chisq'][0], places=8)
+        self.assertEqual(batched['total_cases'][1], np.sum(~np.isnan(Y[:, 1])))
+
+    def test_size_under_no_heterogeneity(self):
+        codes, X, Y, weights = make_cases(n_outcomes=400, seed=3)
+        model = BatchedLogisticRegression().fit(X, Y, sample_weight=weights)
+        result = heterogeneity_tests(codes, 8, Y, X, np.column_stack([model.intercept_, model.coef_]), weights)
+        rejected = np.mean(result['p_value'] < 0.05)
+        self.assertGreater(rejected, 0.02)
+        self.assertLess(rejected, 0.09)
+
+    def test_detects_surgeon_effects(self):
+        codes, X, Y, weights = make_cases(effect=1.5, seed=4)
+        model = BatchedLogisticRegression().fit(X, Y, sample_weight=weights)
+        result = heterogeneity_tests(codes, 8, Y, X, np.column_stack([model.intercept_, model.coef_]), weights)
+        self.assertLess(result['p_value'][0], 1e-4)
+
+    def test_single_surgeon_has_no_test(self):
+        codes, X, Y, weights = make_cases(seed=5)
+        model = BatchedLogisticRegression().fit(X, Y, sample_weight=weights)
+        result = heterogeneity_tests(np.zeros(len(X), dtype=int), 1, Y, X, np.column_stack([model.intercept_, model.coef_]), weights)
+        self.assertEqual(result['num_users'][0], 1)
+        self.assertTrue(np.isnan(result['p_value'][0]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import contextlib
+import io
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from simdata.generate_melanoma_data import generate_melanoma_data
+from surgeon_rates.generate_melanoma_rates import MANIFEST_FILE, generate_melanoma_rates
+
+def run_rates(data: pd.DataFrame, directory: Path, incremental: bool) -> str:
+    """Run the rates pipeline quietly on data and return what it printed"""
+    data_path = directory / 'data.csv'
+    data.to_csv(data_path, index=False)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(io.StringIO()):
+        results = generate_melanoma_rates(
+            str(data_path),
+            str(directory / 'output'),
+            incremental=incremental,
+            batch_outcomes=True,
+            solver='irls',
+            seed=1,
+            imputation_method='fast'
+        )
+    if results is None:
+        raise AssertionError(output.getvalue())
+    return output.getvalue()
+
+def load_manifest(directory: Path) -> dict:
+    with open(directory / 'output' / MANIFEST_FILE) as f:
+        return json.load(f)['models']
+
+class IncrementalRunTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.data = generate_melanoma_data(n_patients=150, start_date='2014-01-01', end_date='2014-01-06', seed=1)
+
+    def test_appended_rows_only_refit_their_windows(self):
+        run_rates(self.data, self.directory, incremental=False)
+        before = load_manifest(self.directory)
+
+        # New rows after every window, with missing covariates to impute
+        appended = self.data.sample(4, random_state=0).assign(
+            eventId=[f'NEW{i}' for i in range(4)],
+            surgDate=pd.Timestamp('2014-02-01'),
+            bmi=float('nan')
+        )
+        printed = run_rates(pd.concat([self.data, appended]), self.directory, incremental=True)
+        after = load_manifest(self.directory)
+
+        new_models = sorted(set(after) - set(before))
+        self.assertTrue(new_models)
+        self.assertTrue(all('DATE20140201' in model_id for model_id in new_models))
+        self.assertEqual({model_id: after[model_id] for model_id in before}, before)
+        self.assertIn(f"Incremental run: {len(new_models)} of {len(after)} models changed", printed)
+        self.assertIn(f"Reusing the imputations of {len(self.data)} of {len(self.data) + 4} unchanged rows", printed)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+
+from surgeon_rates.utils.logistic import BatchedLogisticRegression
+
+def make_design(n_rows: int = 500, seed: int = 0):
+    """Covariates, two outcomes with a few missing values, and sample weights"""
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([
+        rng.normal(60, 12, n_rows),
+        rng.integers(0, 2, n_rows),
+        rng.normal(27, 4, n_rows),
+        rng.exponential(1.5, n_rows),
+        rng.integers(0, 2, n_rows)
+    ]).astype(float)
+    eta = -3 + 0.03 * (X[:, 0] - 60) + 0.4 * X[:, 3] + 0.5 * X[:, 4]
+    Y = np.column_stack([
+        rng.random(n_rows) < 1 / (1 + np.exp(-eta)),
+        rng.random(n_rows) < 0.3
+    ]).astype(float)
+    Y[rng.random(n_rows) < 0.05, 1] = np.nan
+    weights = 1 / np.sqrt(rng.integers(1, 10, n_rows))
+    return X, Y, weights
+
+class SklearnParityTest(unittest.TestCase):
+    def test_coefficients_match_sklearn(self):
+        X, Y, weights = make_design()
+        model = BatchedLogisticRegression().fit(X, Y, sample_weight=weights)
+        for k in range(Y.shape[1]):
+            rows = ~np.isnan(Y[:, k])
+            reference = LogisticRegression(class_weight='balanced', tol=1e-10, max_iter=10_000)
+            reference.fit(X[rows], Y[rows, k], sample_weight=weights[rows])
+            np.testing.assert_allclose(model.intercept_[k], reference.intercept_[0], rtol=1e-5, atol=1e-6)
+            np.testing.assert_allclose(model.coef_[k], reference.coef_[0], rtol=1e-5, atol=1e-6)
+
+    def test_single_class_outcome_is_not_fitted(self):
+        X, _, weights = make_design()
+        model = BatchedLogisticRegression().fit(X, np.zeros(len(X)), sample_weight=weights)
+        self.assertFalse(model.fitted_[0])
+        self.assertTrue(np.isnan(model.covariance_[0]).all())
+
+class SandwichCovarianceTest(unittest.TestCase):
+    def test_covariance_is_sandwich(self):
+        X, Y, weights = make_design()
+        model = BatchedLogisticRegression().fit(X, Y[:, 0], sample_weight=weights)
+        y = Y[:, 0]
+
+        design = np.hstack([np.ones((len(X), 1)), X])
+        class_weight = np.where(y == 1, len(y) / (2 * y.sum()), len(y) / (2 * (1 - y).sum()))
+        s = weights * class_weight
+        p = model.predict_proba(X)[:, 0]
+        penalty = np.diag(np.r_[0.0, np.ones(X.shape[1])])
+        hessian = design.T @ (design * (s * p * (1 - p))[:, None]) + penalty
+        scores = design * (s * (p - y))[:, None]
+        bread = np.linalg.inv(hessian)
+        expected = bread @ (scores.T @ scores) @ bread
+
+        np.testing.assert_allclose(model.covariance_[0], expected, rtol=1e-8)
+
+    def test_frequency_weights_match_repeated_rows(self):
+        X, Y, weights = make_design(n_rows=200)
+        y = Y[:, 0]
+        counts = np.random.default_rng(1).integers(0, 4, len(X))
+        repeated = np.repeat(np.arange(len(X)), counts)
+
+        weighted = BatchedLogisticRegression().fit(X, y, sample_weight=weights, frequency_weight=counts)
+        expanded = BatchedLogisticRegression().fit(X[repeated], y[repeated], sample_weight=weights[repeated])
+
+        np.testing.assert_allclose(weighted.coef_, expanded.coef_, rtol=1e-8)
+        np.testing.assert_allclose(weighted.covariance_, expanded.covariance_, rtol=1e-6)
+
+if __name__ == '__main__':
+    unittest.main()
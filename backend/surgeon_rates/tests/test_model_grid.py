@@ -0,0 +1,31 @@
+import unittest
+
+from simdata.generate_melanoma_data import generate_melanoma_data
+from surgeon_rates.generate_melanoma_rates import _build_model_specs, _outcome_columns
+from surgeon_rates.utils.data_loader import COLUMN_DTYPES
+
+class ModelGridOutcomesTest(unittest.TestCase):
+    def setUp(self):
+        self.data = generate_melanoma_data(n_patients=200, seed=1)
+
+    def test_every_outcome_is_in_the_simulated_data(self):
+        missing = [col for col in _outcome_columns() if col not in self.data.columns]
+        self.assertEqual(missing, [])
+
+    def test_every_model_uses_known_columns(self):
+        specs = _build_model_specs(['ALLLENGTH.DATE20180101'])
+        for spec in specs:
+            self.assertIn(spec['outcome'], self.data.columns, spec['model_id'])
+            self.assertIn(spec['outcome'], COLUMN_DTYPES, spec['model_id'])
+            if spec['subset_var'] is not None:
+                self.assertIn(spec['subset_var'], self.data.columns, spec['model_id'])
+
+    def test_clnd_models_use_clnd_after_positive_slnd(self):
+        clnd = [spec for spec in _build_model_specs(['ALLLENGTH.DATE20180101']) if spec['model_id'].startswith('CLND')]
+        self.assertTrue(clnd)
+        for spec in clnd:
+            self.assertEqual(spec['outcome'], 'posSlndClnd')
+            self.assertEqual(spec['subset_var'], 'posSlnd')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from surgeon_rates.utils.pooling import ImputationPooler, pool_results
+from surgeon_rates.utils.rate_generator import RateGenerator
+
+def imputation_results(events, cases, scales=None, n_imputations: int = 5) -> pd.DataFrame:
+    """Per-imputation Wilson intervals of one model, optionally scaled per imputation"""
+    events, cases = np.asarray(events, dtype=float), np.asarray(cases, dtype=float)
+    lower, upper = RateGenerator._wilson_interval(events, cases, 0.95)
+    frames = []
+    for imputation in range(n_imputations):
+        scale = 1.0 if scales is None else scales[imputation]
+        frame = pd.DataFrame({
+            'surgeon_id': [f'S{i}' for i in range(len(events))],
+            'rate': events / cases * scale,
+            'lowerCI': lower * scale,
+            'upperCI': upper * scale,
+            'raw_rate': events / cases,
+            'cases': cases.astype(int),
+            'method': 'logistic_regression',
+            'model_id': 'MODEL',
+            'imputation': imputation
+        })
+        if scales is not None:
+            frame['oe_ratio'] = scale
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+class PoolIntervalsTest(unittest.TestCase):
+    def test_identical_imputations_keep_their_intervals(self):
+        events, cases = [1, 0, 7], [14, 12, 9]
+        pooled = pool_results(imputation_results(events, cases), 5)
+        lower, upper = RateGenerator._wilson_interval(np.array(events, dtype=float), np.array(cases, dtype=float), 0.95)
+
+        np.testing.assert_allclose(pooled['lowerCI'], np.maximum(lower, 0), atol=1e-12)
+        np.testing.assert_allclose(pooled['upperCI'], upper, rtol=1e-10)
+        self.assertEqual(pooled['lowerCI'][1], 0.0)
+        self.assertTrue(np.isinf(pooled['df']).all())
+
+    def test_pooled_intervals_stay_asymmetric_and_widen(self):
+        scales = [0.9, 1.0, 1.1, 0.95, 1.05]
+        pooled = pool_results(imputation_results([1, 3], [14, 20], scales), 5)
+        per_imputation = imputation_results([1, 3], [14, 20])
+
+        self.assertTrue((pooled['lowerCI'] > 0).all())
+        self.assertTrue((pooled['lowerCI'] < per_imputation['lowerCI'][:2].to_numpy()).all())
+        self.assertTrue((pooled['upperCI'] > per_imputation['upperCI'][:2].to_numpy()).all())
+        self.assertTrue(((pooled['upperCI'] - pooled['rate']) > (pooled['rate'] - pooled['lowerCI'])).all())
+        self.assertTrue(np.isfinite(pooled['df']).all())
+
+    def test_indirect_rates_above_one_are_not_clipped(self):
+        pooled = pool_results(imputation_results([9], [10], [1.5] * 5), 5)
+        self.assertGreater(pooled['upperCI'][0], 1)
+        self.assertAlmostEqual(pooled['rate'][0], 1.35)
+
+class ImputationPoolerTest(unittest.TestCase):
+    def test_batches_pool_like_one_pass(self):
+        rng = np.random.default_rng(0)
+        models = []
+        for _ in range(10):
+            cases = rng.integers(5, 40, 4)
+            results = imputation_results(rng.binomial(cases, 0.2), cases, rng.uniform(0.9, 1.1, 5))
+            models.append([frame.drop(columns=['model_id', 'imputation']) for _, frame in results.groupby('imputation')])
+        models[2][1] = None
+        models[5] = [None] * 5
+
+        batched, single = ImputationPooler(batch_size=3), ImputationPooler(batch_size=100)
+        for i, results_list in enumerate(models):
+            batched.add(f'MODEL{i}', results_list)
+            single.add(f'MODEL{i}', results_list)
+        pooled = batched.pool()
+
+        pd.testing.assert_frame_equal(pooled, single.pool())
+        self.assertEqual(list(pooled['model_id'].unique()), [f'MODEL{i}' for i in range(10) if i != 5])
+
+if __name__ == '__main__':
+    unittest.main()
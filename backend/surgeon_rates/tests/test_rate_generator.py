@@ -0,0 +1,173 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+
+from surgeon_rates.utils.rate_generator import RateGenerator
+
+COVARIATES = ['age', 'female', 'bmi', 'thickness', 'ulceration']
+RESULT_COLUMNS = ['surgeon_id', 'rate', 'raw_rate', 'cases', 'method']
+
+def make_procedures(n_rows: int = 400, seed: int = 0) -> pd.DataFrame:
+    """
+    Procedures with the awkward cases of per-surgeon aggregation
+
+    Surgeons appear interleaved and two of them have identical case and
+    event counts (ties). One surgeon has no events and one has only a
+    single case. Some covariates are missing, so rows drop out of the
+    complete-case analysis.
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'userId': rng.choice(['ARIYAN', 'BRADY', 'COIT', 'JONES', 'WONG'], n_rows),
+        'yos': rng.integers(2010, 2020, n_rows),
+        'age': rng.normal(60, 12, n_rows),
+        'female': rng.integers(0, 2, n_rows).astype(float),
+        'bmi': rng.normal(27, 4, n_rows),
+        'thickness': rng.exponential(1.5, n_rows),
+        'ulceration': rng.integers(0, 2, n_rows).astype(float),
+        'anyComp2': (rng.random(n_rows) < 0.15).astype(float)
+    })
+    df.loc[df['userId'] == 'WONG', 'anyComp2'] = 0.0
+    df.loc[rng.random(n_rows) < 0.1, 'bmi'] = np.nan
+    df.loc[rng.random(n_rows) < 0.05, 'thickness'] = np.nan
+
+    # Two surgeons with the same cases and events
+    tied = pd.DataFrame({
+        'userId': ['PATEL', 'SMITH'] * 10,
+        'yos': 2015,
+        'age': 55.0,
+        'female': [0.0, 1.0] * 10,
+        'bmi': 26.0,
+        'thickness': 1.0,
+        'ulceration': 0.0,
+        'anyComp2': [1.0, 1.0, 0.0, 0.0] * 5
+    })
+    single = pd.DataFrame([{
+        'userId': 'LONE', 'yos': 2019, 'age': 70.0, 'female': 1.0, 'bmi': 30.0,
+        'thickness': 2.0, 'ulceration': 1.0, 'anyComp2': 1.0
+    }])
+    return pd.concat([df, tied, single], ignore_index=True)
+
+def per_surgeon_loop_rates(
+    df: pd.DataFrame,
+    outcome: str,
+    covariates: list,
+    avg_covariates: dict = None
+) -> pd.DataFrame:
+    """The per-surgeon loop that _calculate_logistic_rates used to run"""
+    X = df[covariates].astype(float)
+    y = df[outcome].astype(float)
+    weights = df['model_weight'].astype(float)
+
+    model = LogisticRegression(**RateGenerator.SKLEARN_SETTINGS)
+    model.fit(X, y, sample_weight=weights)
+
+    results = []
+    for surgeon_id in df['userId'].unique():
+        surgeon_data = df[df['userId'] == surgeon_id]
+        raw_rate = surgeon_data[outcome].astype(float).mean()
+        if avg_covariates is not None:
+            adj_rate = model.predict_proba(pd.DataFrame([avg_covariates]))[0][1]
+        else:
+            adj_rate = raw_rate
+        results.append({
+            'surgeon_id': surgeon_id,
+            'rate': adj_rate,
+            'raw_rate': raw_rate,
+            'cases': len(surgeon_data),
+            'method': 'logistic_regression'
+        })
+    return pd.DataFrame(results)
+
+class SurgeonAggregationTest(unittest.TestCase):
+    def setUp(self):
+        self.rate_generator = RateGenerator()
+        self.df = self.rate_generator.prepare_model_data(make_procedures(), 'anyComp2')
+        self.analysis_df = self.df.dropna(subset=['anyComp2'] + COVARIATES)
+
+    def assert_matches_loop(self, avg_covariates=None):
+        expected = per_surgeon_loop_rates(self.analysis_df, 'anyComp2', COVARIATES, avg_covariates)
+        results = self.rate_generator._calculate_logistic_rates(self.analysis_df, 'anyComp2', avg_covariates)
+        pd.testing.assert_frame_equal(
+            results[RESULT_COLUMNS],
+            expected,
+            check_exact=True,
+            check_dtype=False
+        )
+
+    def test_raw_rates_match_per_surgeon_loop(self):
+        self.assert_matches_loop()
+
+    def test_adjusted_rates_match_per_surgeon_loop(self):
+        means = self.analysis_df[COVARIATES].mean().to_dict()
+        self.assert_matches_loop(means)
+
+    def test_edge_cases_are_kept(self):
+        results = self.rate_generator._calculate_logistic_rates(self.analysis_df, 'anyComp2', None)
+        by_surgeon = results.set_index('surgeon_id')
+        self.assertEqual(by_surgeon.loc['WONG', 'raw_rate'], 0.0)
+        self.assertEqual(by_surgeon.loc['LONE', 'cases'], 1)
+        self.assertEqual(by_surgeon.loc['PATEL', 'raw_rate'], by_surgeon.loc['SMITH', 'raw_rate'])
+        # Rows with missing covariates are left out of every surgeon's cases
+        self.assertEqual(results['cases'].sum(), len(self.analysis_df))
+        self.assertLess(len(self.analysis_df), len(self.df))
+
+    def test_generate_rate_matches_per_surgeon_loop(self):
+        results = self.rate_generator.generate_rate(make_procedures(), 'anyComp2', model_id='TEST')
+        expected = per_surgeon_loop_rates(self.analysis_df, 'anyComp2', COVARIATES)
+        pd.testing.assert_frame_equal(results[RESULT_COLUMNS], expected, check_exact=True, check_dtype=False)
+
+    def test_generate_rate_pools_imputed_values(self):
+        procedures = make_procedures()
+        filled = procedures[COVARIATES].fillna(procedures[COVARIATES].mean())
+        results = self.rate_generator.generate_rate(
+            procedures, 'anyComp2', model_id='TEST', imputed_values=[filled] * 3
+        ).set_index('surgeon_id')
+        single = self.rate_generator.generate_imputation_rate(self.df, filled, 'anyComp2').set_index('surgeon_id')
+
+        # Identical imputations pool to the rates of any one of them
+        np.testing.assert_allclose(results['rate'], single.loc[results.index, 'rate'], rtol=1e-12)
+        self.assertEqual(results['cases'].sum(), len(procedures))
+        self.assertTrue((results['model_id'] == 'TEST').all())
+
+class IndirectIntervalTest(unittest.TestCase):
+    def setUp(self):
+        self.df = RateGenerator().prepare_model_data(make_procedures(), 'anyComp2')
+        self.analysis_df = self.df.dropna(subset=['anyComp2'] + COVARIATES)
+
+    def test_log_expected_se_matches_finite_differences(self):
+        X = self.analysis_df[COVARIATES].to_numpy(dtype=float)
+        y = self.analysis_df['anyComp2']
+        codes, surgeon_ids = pd.factorize(self.analysis_df['userId'])
+        coefs = np.array([-1.0, 0.01, 0.2, -0.02, 0.3, 0.4])
+
+        def log_expected(coefs):
+            risks = RateGenerator._expected_risks(coefs[0] + X @ coefs[1:], y)
+            return np.log(np.bincount(codes, weights=risks, minlength=len(surgeon_ids))), risks
+
+        _, risks = log_expected(coefs)
+        step = 1e-6
+        jacobian = np.column_stack([
+            (log_expected(coefs + step * unit)[0] - log_expected(coefs - step * unit)[0]) / (2 * step)
+            for unit in np.eye(len(coefs))
+        ])
+        # With an identity covariance the variance is the squared gradient norm
+        se = RateGenerator._log_expected_se(codes, len(surgeon_ids), X, risks, np.eye(len(coefs)))
+        np.testing.assert_allclose(se, np.linalg.norm(jacobian, axis=1), rtol=1e-5)
+
+    def test_irls_intervals_add_model_uncertainty(self):
+        rate_generator = RateGenerator(solver='irls', adjustment='indirect')
+        results = rate_generator._calculate_logistic_rates(self.analysis_df, 'anyComp2', None)
+        scale = results['rate'] / results['raw_rate']
+        lower, upper = RateGenerator._wilson_interval(results['raw_rate'] * results['cases'], results['cases'], 0.95)
+
+        with_events = results['raw_rate'] > 0
+        self.assertTrue((results['lowerCI'] <= results['rate']).all())
+        self.assertTrue((results['upperCI'] >= results['rate']).all())
+        self.assertTrue((results['lowerCI'][with_events] < (lower * scale)[with_events]).all())
+        self.assertTrue((results['upperCI'][with_events] > (upper * scale)[with_events]).all())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,186 @@
+import warnings
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from surgeon_rates.utils.logistic import BatchedLogisticRegression
+
+class BootstrapEngine:
+    WEIGHT_SCHEMES = ('poisson', 'multinomial')
+
+    def __init__(
+        self,
+        n_replicates: int = 500,
+        weights: str = 'poisson',
+        level: float = 0.95,
+        chunk_size: int = 100,
+        n_jobs: int = 1,
+        random_state: int = 0
+    ):
+        """
+        Percentile bootstrap intervals for per-surgeon rates
+
+        Replicates are expressed as case weights instead of resampled
+        copies of the data: each chunk of replicates is one weight matrix
+        of shape (chunk_size, n_cases), drawn as Poisson(1) counts or as
+        multinomial counts that keep the total number of cases fixed.
+        Per-surgeon raw rates for the whole chunk are a few weighted sums,
+        and the adjusted rates refit every replicate of the chunk at once
+        with the batched logistic solver, seeded from the full-sample fit.
+
+        Chunks draw from independent streams spawned from random_state,
+        so the intervals depend on chunk_size but not on n_jobs.
+
+        Args:
+            n_replicates: Number of bootstrap replicates
+            weights: Replicate weight scheme, 'poisson' or 'multinomial'
+            level: Confidence level of the percentile intervals
+            chunk_size: Number of replicates drawn and fitted together
+            n_jobs: Number of threads processing chunks in parallel
+            random_state: Seed of the replicate weights
+        """
+        if weights not in self.WEIGHT_SCHEMES:
+            raise ValueError(f"Unknown bootstrap weights: {weights}. Must be one of {self.WEIGHT_SCHEMES}")
+        if n_replicates < 1:
+            raise ValueError("n_replicates must be at least 1")
+
+        self.n_replicates = n_replicates
+        self.weights = weights
+        self.level = level
+        self.chunk_size = chunk_size
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+
+    def settings(self) -> Tuple:
+        """Settings that change the intervals, for cache keys and fingerprints"""
+        return ('bootstrap', self.n_replicates, self.weights, self.level, self.chunk_size, self.random_state)
+
+    def rate_intervals(
+        self,
+        user_ids: np.ndarray,
+        y: np.ndarray,
+        X: Optional[np.ndarray] = None,
+        sample_weight: Optional[np.ndarray] = None,
+        adj_X: Optional[np.ndarray] = None,
+        coef_init: Optional[np.ndarray] = None,
+        expected: Optional[np.ndarray] = None,
+        seed_key: Tuple[int, ...] = ()
+    ) -> Dict[str, np.ndarray]:
+        """
+        Bootstrap intervals for per-surgeon raw and adjusted rates
+
+        Args:
+            user_ids: Surgeon ID of each case
+            y: Binary outcome of each case
+            X: Covariates of each case, needed for adjusted rates
+            sample_weight: Model weight of each case
+            adj_X: Covariates of shape (1, n_features) at which adjusted
+                rates are predicted, None to skip adjusted rates
+            coef_init: Full-sample coefficients, intercept first, used to
+                seed the replicate fits
+            expected: Predicted risk of each case, to bound indirectly
+                standardized rates. The risks are held fixed, so replicates
+                reweight observed and expected events without refitting.
+            seed_key: Integers identifying the fit, mixed into the seed so
+                different fits draw different replicates
+
+        Returns:
+            Dictionary with surgeon_id (order of first appearance),
+            raw_lower and raw_upper per surgeon, adj_lower and adj_upper
+            (scalars) if adj_X was given, and indirect_lower and
+            indirect_upper per surgeon if expected was given
+        """
+        codes, surgeon_ids = pd.factorize(np.asarray(user_ids))
+        y = np.asarray(y, dtype=np.float64)
+        if expected is not None:
+            expected = np.asarray(expected, dtype=np.float64)
+
+        # Sort cases by surgeon so per-surgeon sums are contiguous reductions
+        order = np.argsort(codes, kind='stable')
+        starts = np.searchsorted(codes[order], np.arange(len(surgeon_ids)))
+
+        seeds = np.random.SeedSequence(self.random_state, spawn_key=seed_key).spawn(
+            -(-self.n_replicates // self.chunk_size)
+        )
+        sizes = [
+            min(self.chunk_size, self.n_replicates - i * self.chunk_size)
+            for i in range(len(seeds))
+        ]
+
+        def run_chunk(task: Tuple[np.random.SeedSequence, int]) -> Tuple[np.ndarray, ...]:
+            seed, size = task
+            W = self._replicate_weights(np.random.default_rng(seed), size, len(y))
+
+            # Per-surgeon rates for every replicate at once
+            cases = np.add.reduceat(W[:, order], starts, axis=1)
+            events = np.add.reduceat(W[:, order] * y[order], starts, axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                raw_rates = np.where(cases > 0, events / cases, np.nan)
+
+            adj_rates = None
+            if adj_X is not None:
+                model = BatchedLogisticRegression().fit(
+                    X,
+                    np.repeat(y[:, None], size, axis=1),
+                    sample_weight=sample_weight,
+                    coef_init=None if coef_init is None else np.tile(coef_init, (size, 1)),
+                    frequency_weight=W.T
+                )
+                adj_rates = np.where(model.fitted_, model.predict_proba(adj_X)[0], np.nan)
+
+            indirect_rates = None
+            if expected is not None:
+                expected_events = np.add.reduceat(W[:, order] * expected[order], starts, axis=1)
+                overall = (W @ y) / W.sum(axis=1)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    indirect_rates = np.where(
+                        cases > 0, events / expected_events * overall[:, None], np.nan
+                    )
+            return raw_rates, adj_rates, indirect_rates
+
+        tasks = list(zip(seeds, sizes))
+        if self.n_jobs > 1 and len(tasks) > 1:
+            with ThreadPoolExecutor(max_workers=self.n_jobs) as executor:
+                chunks = list(executor.map(run_chunk, tasks))
+        else:
+            chunks = [run_chunk(task) for task in tasks]
+
+        tail = 100 * (1 - self.level) / 2
+        with warnings.catch_warnings():
+            # Surgeons absent from every replicate get NaN bounds
+            warnings.simplefilter('ignore', RuntimeWarning)
+            raw_lower, raw_upper = np.nanpercentile(
+                np.concatenate([chunk[0] for chunk in chunks]), [tail, 100 - tail], axis=0
+            )
+            if expected is not None:
+                intervals_indirect = np.nanpercentile(
+                    np.concatenate([chunk[2] for chunk in chunks]), [tail, 100 - tail], axis=0
+                )
+        intervals = {
+            'surgeon_id': surgeon_ids,
+            'raw_lower': raw_lower,
+            'raw_upper': raw_upper
+        }
+        if expected is not None:
+            intervals['indirect_lower'], intervals['indirect_upper'] = intervals_indirect
+
+        if adj_X is not None:
+            adj_rates = np.concatenate([chunk[1] for chunk in chunks])
+            intervals['adj_lower'], intervals['adj_upper'] = _nanpercentile(adj_rates, [tail, 100 - tail])
+
+        return intervals
+
+    def _replicate_weights(self, rng: np.random.Generator, size: int, n_cases: int) -> np.ndarray:
+        """Draw a (size, n_cases) matrix of replicate case counts"""
+        if self.weights == 'poisson':
+            return rng.poisson(1.0, size=(size, n_cases)).astype(np.float64)
+        return rng.multinomial(n_cases, np.full(n_cases, 1.0 / n_cases), size=size).astype(np.float64)
+
+def _nanpercentile(values: np.ndarray, q: List[float]) -> Tuple[float, float]:
+    """Percentiles ignoring failed replicates, NaN if every replicate failed"""
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return np.nan, np.nan
+    lower, upper = np.percentile(values, q)
+    return lower, upper
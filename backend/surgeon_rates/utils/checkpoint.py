@@ -0,0 +1,98 @@
+import os
+import pickle
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+class CheckpointStore:
+    def __init__(self, checkpoint_dir: str, batch_size: int = 100):
+        """
+        Append-only store of finished models, so an interrupted run can resume
+
+        Finished models are buffered and written in batches, each batch to
+        a new file that is never modified afterwards. A batch holds the
+        per-imputation results of its models together with the model
+        fingerprints. Every file is written atomically, so a crash loses
+        at most the unwritten batch and never leaves a partial file.
+
+        Args:
+            checkpoint_dir: Directory holding the batch files
+            batch_size: Number of finished models written per batch
+        """
+        self.checkpoint_dir = Path(checkpoint_dir)
+        self.batch_size = batch_size
+        self._pending: Dict[str, Dict] = {}
+        batch_paths = self._batch_paths()
+        self._next_batch = int(batch_paths[-1].stem.split('-')[1]) + 1 if batch_paths else 0
+
+    def load(self, fingerprints: Dict[str, str]) -> Dict[str, List[Optional[pd.DataFrame]]]:
+        """
+        Read back the models finished by earlier attempts of the run
+
+        Models whose fingerprint no longer matches (changed data or
+        settings) are left out, so they are fitted again. Unreadable batch
+        files are skipped.
+
+        Args:
+            fingerprints: Current fingerprint of every model_id
+
+        Returns:
+            Per-imputation results of every finished model, None for
+            imputations that could not be fitted
+        """
+        completed = {}
+        for path in self._batch_paths():
+            try:
+                with open(path, 'rb') as f:
+                    batch = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                print(f"Ignoring unreadable checkpoint {path.name}")
+                continue
+            for model_id, model in batch.items():
+                if fingerprints.get(model_id) == model['fingerprint']:
+                    completed[model_id] = model['results']
+        return completed
+
+    def add(self, model_id: str, fingerprint: str, results_list: List[Optional[pd.DataFrame]]) -> None:
+        """
+        Record a finished model, writing a batch once enough are pending
+
+        Args:
+            model_id: Identifier for the model
+            fingerprint: Fingerprint of the model's inputs
+            results_list: Results of each imputation, None for failed imputations
+        """
+        self._pending[model_id] = {'fingerprint': fingerprint, 'results': results_list}
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the pending models as a new batch file"""
+        if not self._pending:
+            return
+
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.checkpoint_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(self._pending, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.checkpoint_dir / f"batch-{self._next_batch:06d}.pkl")
+        self._next_batch += 1
+        self._pending = {}
+
+    def has_batches(self) -> bool:
+        """Whether any finished models are on disk"""
+        return bool(self._batch_paths())
+
+    def clear(self) -> None:
+        """Remove every checkpoint, before a fresh run or once the results are saved"""
+        self._pending = {}
+        self._next_batch = 0
+        shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
+
+    def _batch_paths(self) -> List[Path]:
+        if not self.checkpoint_dir.is_dir():
+            return []
+        return sorted(self.checkpoint_dir.glob('batch-*.pkl'))
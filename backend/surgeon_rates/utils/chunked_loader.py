@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from typing import List
+
+from surgeon_rates.utils.data_loader import iter_chunks
+
+# Low-cardinality text columns stored as categoricals while loading chunks
+CATEGORICAL_COLUMNS = ['userId']
+
+class ChunkSummary:
+    def __init__(
+        self,
+        outcomes: List[str],
+        covariates: List[str],
+        date_col: str = 'surgDate',
+        weight_var: str = 'yos'
+    ):
+        """
+        Descriptive summary of the input data, updated one chunk at a time
+
+        Keeps the row count, the distinct surgery dates (from which the
+        analysis windows are built), covariate moments, and the cases,
+        events and surgeons of every outcome, which are printed in place
+        of a data sample. The models are still fitted on the loaded rows,
+        not on these totals. Case counts only include rows with a model
+        weight, matching the rows the models are fitted on.
+
+        Args:
+            outcomes: Outcome columns to count
+            covariates: Covariate columns to summarize
+            date_col: Surgery date column
+            weight_var: Column the model weights are derived from
+        """
+        self.outcomes = outcomes
+        self.covariates = covariates
+        self.date_col = date_col
+        self.weight_var = weight_var
+        self.n_rows = 0
+        self._dates = set()
+        self._moments = np.zeros((3, len(covariates)))
+        self._totals = np.zeros((2, len(outcomes)))
+        self._surgeons = [set() for _ in outcomes]
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """Add the statistics of one chunk"""
+        self.n_rows += len(chunk)
+
+        if self.date_col in chunk.columns:
+            self._dates.update(chunk[self.date_col].dropna().unique())
+
+        covariates = chunk[[col for col in self.covariates if col in chunk.columns]]
+        values = covariates.reindex(columns=self.covariates).to_numpy(dtype=np.float64)
+        observed = ~np.isnan(values)
+        values = np.where(observed, values, 0.0)
+        self._moments += [observed.sum(axis=0), values.sum(axis=0), (values ** 2).sum(axis=0)]
+
+        weighted = chunk[chunk[self.weight_var].notna()] if self.weight_var in chunk.columns else chunk
+        for i, outcome in enumerate(self.outcomes):
+            if outcome not in weighted.columns:
+                continue
+            observed = weighted[outcome].notna()
+            self._totals[:, i] += [observed.sum(), weighted[outcome].sum()]
+            if 'userId' in weighted.columns:
+                self._surgeons[i].update(weighted['userId'][observed].unique())
+
+    def dates(self) -> pd.DatetimeIndex:
+        """Distinct surgery dates in ascending order"""
+        return pd.DatetimeIndex(sorted(self._dates))
+
+    def covariate_moments(self) -> pd.DataFrame:
+        """Count, mean and standard deviation of every covariate"""
+        count, total, squares = self._moments
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = total / count
+            variance = (squares - count * mean ** 2) / (count - 1)
+        return pd.DataFrame(
+            {'count': count.astype(int), 'mean': mean, 'std': np.sqrt(np.maximum(variance, 0))},
+            index=self.covariates
+        )
+
+    def summary(self) -> pd.DataFrame:
+        """Total cases, events and surgeons of every outcome with cases"""
+        cases, events = self._totals
+        summary = pd.DataFrame({
+            'cases': cases.astype(int),
+            'events': events,
+            'surgeons': [len(surgeons) for surgeons in self._surgeons]
+        }, index=self.outcomes)
+        return summary[summary['cases'] > 0]
+
+def load_chunked(
+    path: str,
+    columns: List[str],
+    summary: ChunkSummary,
+    chunk_size: int = 100_000
+) -> pd.DataFrame:
+    """
+    Load the input data chunk by chunk, collecting a summary of it
+
+    Each chunk updates the summary and is then compacted before it is
+    kept: surgeon IDs become categoricals, so the retained frame is
+    smaller than the parsed text. Every row is still kept, since the
+    imputer and the models use the full data, so memory grows with the
+    number of rows. Values, row order and the RangeIndex are the same as
+    with load_data.
+
+    Args:
+        path: Path to the input data file
+        columns: Columns to read
+        summary: Summary updated with every chunk
+        chunk_size: Maximum number of rows parsed at a time
+
+    Returns:
+        DataFrame with the requested columns
+    """
+    kept = []
+    for chunk in iter_chunks(path, columns=columns, chunk_size=chunk_size):
+        summary.update(chunk)
+        for col in CATEGORICAL_COLUMNS:
+            if col in chunk.columns:
+                chunk[col] = chunk[col].astype('category')
+        kept.append(chunk)
+
+    if not kept:
+        return pd.DataFrame(columns=columns)
+
+    # Categories differ between chunks, so merge them column by column
+    index = pd.RangeIndex(sum(len(chunk) for chunk in kept))
+    data = {}
+    for col in kept[0].columns:
+        if isinstance(kept[0][col].dtype, pd.CategoricalDtype):
+            data[col] = pd.Series(
+                union_categoricals([chunk[col] for chunk in kept]),
+                index=index
+            )
+        else:
+            data[col] = pd.concat([chunk[col] for chunk in kept])
+        for chunk in kept:
+            del chunk[col]
+
+    return pd.DataFrame(data)
@@ -0,0 +1,222 @@
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+# Column types of the melanoma input data
+COLUMN_DTYPES: Dict[str, type] = {
+    'eventId': str,
+    'userId': str,
+    'surgDate': str,
+    'yos': float,
+    'age': float,
+    'female': float,
+    'bmi': float,
+    'thickness': float,
+    'ulceration': float,
+    'mitoticIndex': float,
+    'site': str,
+    'slnd': float,
+    'posSlnd': float,
+    'posSlndClnd': float,
+    'anyComp2': float,
+    'anyComp3': float,
+    'woundInf2': float,
+    'woundInf3': float,
+    'cellulitis2': float,
+    'cellulitis3': float,
+    'seroma2': float,
+    'seroma3': float,
+    'graftComp2': float,
+    'graftComp3': float
+}
+
+PARQUET_EXTENSIONS = {'.parquet', '.pq'}
+ARROW_EXTENSIONS = {'.arrow', '.feather', '.ipc', '.arrows'}
+
+def detect_format(path: str) -> str:
+    """
+    Detect the format of an input data file
+
+    Parquet and Arrow IPC files are recognised by their magic bytes, Arrow
+    IPC streams (which have none) by their extension.
+
+    Args:
+        path: Path to the input data file
+
+    Returns:
+        One of 'csv', 'parquet', 'arrow' or 'arrow_stream'
+    """
+    with open(path, 'rb') as f:
+        magic = f.read(6)
+
+    if magic[:4] == b'PAR1':
+        return 'parquet'
+    if magic == b'ARROW1':
+        return 'arrow'
+
+    suffix = Path(path).suffix.lower()
+    if suffix in PARQUET_EXTENSIONS:
+        return 'parquet'
+    if suffix in ARROW_EXTENSIONS:
+        return 'arrow_stream'
+    return 'csv'
+
+def load_data(
+    path: str,
+    columns: Optional[List[str]] = None,
+    date_col: str = 'surgDate'
+) -> pd.DataFrame:
+    """
+    Load melanoma input data from CSV, Parquet or Arrow IPC
+
+    Args:
+        path: Path to the input data file
+        columns: Columns to read, all columns if None. Requested columns
+            missing from the file are skipped.
+        date_col: Date column converted to datetime while reading
+
+    Returns:
+        DataFrame with the requested columns
+    """
+    file_format = detect_format(path)
+
+    if file_format == 'csv':
+        wanted = set(columns) if columns is not None else None
+        df = pd.read_csv(
+            path,
+            usecols=(lambda col: col in wanted) if wanted is not None else None,
+            dtype={col: dtype for col, dtype in COLUMN_DTYPES.items() if col != date_col},
+            parse_dates=[date_col]
+        )
+    else:
+        df = _arrow_to_frame(_read_arrow_table(path, file_format, columns), date_col)
+
+    return _order_columns(df, columns)
+
+def iter_chunks(
+    path: str,
+    columns: Optional[List[str]] = None,
+    chunk_size: int = 100_000,
+    date_col: str = 'surgDate'
+) -> Iterator[pd.DataFrame]:
+    """
+    Read melanoma input data in chunks of at most chunk_size rows
+
+    Chunks have the same columns and types as load_data, and a
+    RangeIndex that continues across chunks, so concatenating them gives
+    the same frame as load_data.
+
+    Args:
+        path: Path to the input data file
+        columns: Columns to read, all columns if None
+        chunk_size: Maximum number of rows per chunk
+        date_col: Date column converted to datetime while reading
+
+    Returns:
+        Iterator over DataFrame chunks
+    """
+    file_format = detect_format(path)
+
+    if file_format == 'csv':
+        wanted = set(columns) if columns is not None else None
+        chunks = pd.read_csv(
+            path,
+            usecols=(lambda col: col in wanted) if wanted is not None else None,
+            dtype={col: dtype for col, dtype in COLUMN_DTYPES.items() if col != date_col},
+            parse_dates=[date_col],
+            chunksize=chunk_size
+        )
+    else:
+        chunks = (
+            _arrow_to_frame(batch, date_col)
+            for batch in _iter_arrow_batches(path, file_format, columns, chunk_size)
+        )
+
+    start = 0
+    for chunk in chunks:
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        yield _order_columns(chunk, columns)
+
+def _arrow_to_frame(data, date_col: str) -> pd.DataFrame:
+    """Convert an Arrow table or record batch to the loader's column types"""
+    # Rows are addressed by position downstream, so drop any stored index
+    df = data.to_pandas().reset_index(drop=True)
+    df = df.astype({
+        col: dtype for col, dtype in COLUMN_DTYPES.items()
+        if col in df.columns and col != date_col
+    })
+    if date_col in df.columns:
+        df[date_col] = pd.to_datetime(df[date_col])
+    return df
+
+def _order_columns(df: pd.DataFrame, columns: Optional[List[str]]) -> pd.DataFrame:
+    """Keep the requested column order regardless of the file layout"""
+    if columns is None:
+        return df
+    return df[[col for col in columns if col in df.columns]]
+
+def _import_pyarrow():
+    """Import pyarrow, which is only needed for Parquet and Arrow files"""
+    try:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError(
+            "pyarrow is required to read Parquet and Arrow files. "
+            "Install it with: pip install pyarrow"
+        )
+    return pa, feather, pq
+
+def _read_arrow_table(path: str, file_format: str, columns: Optional[List[str]]):
+    """Read the requested columns of a Parquet or Arrow IPC file"""
+    pa, feather, pq = _import_pyarrow()
+
+    if file_format == 'parquet':
+        available = pq.read_schema(path).names
+        return pq.read_table(path, columns=_present(columns, available))
+
+    if file_format == 'arrow':
+        available = pa.ipc.open_file(pa.memory_map(path, 'r')).schema.names
+        return feather.read_table(path, columns=_present(columns, available), memory_map=True)
+
+    # IPC streams have no footer, so project each record batch as it is read
+    reader = pa.ipc.open_stream(pa.memory_map(path, 'r'))
+    selected = _present(columns, reader.schema.names)
+    schema = pa.schema([reader.schema.field(col) for col in selected])
+    return pa.Table.from_batches([batch.select(selected) for batch in reader], schema=schema)
+
+def _iter_arrow_batches(
+    path: str,
+    file_format: str,
+    columns: Optional[List[str]],
+    chunk_size: int
+):
+    """Yield record batches of at most chunk_size rows from a Parquet or Arrow IPC file"""
+    pa, _, pq = _import_pyarrow()
+
+    if file_format == 'parquet':
+        parquet_file = pq.ParquetFile(path)
+        selected = _present(columns, parquet_file.schema_arrow.names)
+        yield from parquet_file.iter_batches(batch_size=chunk_size, columns=selected)
+        return
+
+    if file_format == 'arrow':
+        reader = pa.ipc.open_file(pa.memory_map(path, 'r'))
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    else:
+        reader = pa.ipc.open_stream(pa.memory_map(path, 'r'))
+        batches = iter(reader)
+
+    selected = _present(columns, reader.schema.names)
+    for batch in batches:
+        batch = batch.select(selected)
+        for offset in range(0, batch.num_rows, chunk_size):
+            yield batch.slice(offset, chunk_size)
+
+def _present(columns: Optional[List[str]], available: List[str]) -> List[str]:
+    """Return the requested columns that exist in the file"""
+    if columns is None:
+        return list(available)
+    return [col for col in columns if col in available]
@@ -0,0 +1,145 @@
+import io
+from typing import Dict, Type
+
+import numpy as np
+import pandas as pd
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from dashboard.models import Surgeon as DashboardSurgeon
+from dashboard.models import SurgeonRate as DashboardSurgeonRate
+from surgeon_rates.models import Surgeon, SurgeonRate
+
+LOAD_BATCH_SIZE = 10_000
+REQUIRED_COLUMNS = ['surgeon_id', 'model_id', 'rate', 'cases', 'method', 'date', 'total_cases', 'num_users', 'min_events']
+
+def load_rates(
+    results: pd.DataFrame,
+    batch_size: int = LOAD_BATCH_SIZE
+) -> Dict[str, int]:
+    """
+    Replace the rates in the SurgeonRate tables with a new result set
+
+    Every rate goes to surgeon_rates' SurgeonRate. Rates with lowerCI and
+    upperCI (from the irls solver or the bootstrap) also go to the
+    dashboard's SurgeonRate. Surgeons missing from either app are created,
+    named by their surgeon ID, with zero years of service since the
+    results do not record it.
+
+    On PostgreSQL each table is loaded with COPY into a temporary staging
+    table, batch_size rows per COPY, and the old rates are then replaced
+    from the staging table with one DELETE and one INSERT ... SELECT.
+    Elsewhere the rows are inserted with batched bulk_create. Both tables
+    are replaced in a single transaction, so readers see either the old
+    or the new rates and a failed load leaves the old rates in place.
+
+    Args:
+        results: Results of generate_melanoma_rates
+        batch_size: Number of rows sent per COPY or bulk_create batch
+
+    Returns:
+        Number of rows loaded into each table, by table name
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    missing = [col for col in REQUIRED_COLUMNS if col not in results.columns]
+    if missing:
+        raise ValueError(f"Results are missing columns: {missing}")
+
+    # Rates that could not be estimated have no row in the tables
+    rates = results[np.isfinite(results['rate'].to_numpy(dtype=float))]
+    if len(rates) < len(results):
+        print(f"Skipping {len(results) - len(rates)} rows without a finite rate")
+    surgeon_ids = rates['surgeon_id'].astype(str)
+
+    loaded = {}
+    with transaction.atomic():
+        pks = _surgeon_pks(surgeon_ids.unique(), batch_size)
+        rows = pd.DataFrame({
+            'surgeon_id': surgeon_ids.map(pks),
+            'model_id': rates['model_id'],
+            'rate': rates['rate'],
+            'cases': rates['cases'].astype(int),
+            'method': rates['method'],
+            'date': pd.to_datetime(rates['date']).dt.date,
+            'covariates': '',
+            'heterotest': rates['heterotest'] if 'heterotest' in rates.columns else np.nan,
+            'routine_unadjusted': False,
+            'result_text': '',
+            'total_cases': rates['total_cases'].astype(int),
+            'num_users': rates['num_users'].astype(int),
+            'min_events': rates['min_events'].astype(int),
+            'avg_cov': ''
+        })
+        loaded[SurgeonRate._meta.db_table] = _replace_rates(SurgeonRate, rows, batch_size)
+
+        if {'lowerCI', 'upperCI'} <= set(rates.columns):
+            with_ci = rates[rates[['lowerCI', 'upperCI']].notna().all(axis=1)]
+            pks = _dashboard_surgeon_pks(with_ci['surgeon_id'].astype(str).unique(), batch_size)
+            rows = pd.DataFrame({
+                'surgeon_id': with_ci['surgeon_id'].astype(str).map(pks),
+                'model_id': with_ci['model_id'],
+                'rate': with_ci['rate'],
+                'lower_ci': with_ci['lowerCI'],
+                'upper_ci': with_ci['upperCI'],
+                'n_cases': with_ci['cases'].astype(int),
+                'date_generated': timezone.now()
+            })
+            loaded[DashboardSurgeonRate._meta.db_table] = _replace_rates(DashboardSurgeonRate, rows, batch_size)
+        else:
+            print("Skipping the dashboard SurgeonRate table: results have no lowerCI/upperCI")
+
+    return loaded
+
+def _surgeon_pks(user_ids: np.ndarray, batch_size: int) -> Dict[str, int]:
+    """Primary keys of surgeon_rates' surgeons by user ID, creating missing ones"""
+    Surgeon.objects.bulk_create(
+        [Surgeon(user_id=user_id, name=user_id, years_of_service=0.0) for user_id in user_ids],
+        batch_size=batch_size,
+        ignore_conflicts=True
+    )
+    return dict(Surgeon.objects.filter(user_id__in=user_ids).values_list('user_id', 'pk'))
+
+def _dashboard_surgeon_pks(names: np.ndarray, batch_size: int) -> Dict[str, int]:
+    """Primary keys of the dashboard's surgeons by name, creating missing ones"""
+    pks = dict(DashboardSurgeon.objects.filter(name__in=names).values_list('name', 'pk'))
+    DashboardSurgeon.objects.bulk_create(
+        [DashboardSurgeon(name=name) for name in names if name not in pks],
+        batch_size=batch_size
+    )
+    return dict(DashboardSurgeon.objects.filter(name__in=names).values_list('name', 'pk'))
+
+def _replace_rates(model: Type[models.Model], rows: pd.DataFrame, batch_size: int) -> int:
+    """Replace every row of a model's table, within the caller's transaction"""
+    if connection.vendor == 'postgresql':
+        _copy_replace(model._meta.db_table, rows, batch_size)
+    else:
+        model.objects.all().delete()
+        # Object dtype turns NumPy scalars into Python values and NaN into None
+        records = rows.astype(object).where(rows.notna(), None).to_dict('records')
+        for start in range(0, len(records), batch_size):
+            model.objects.bulk_create([model(**record) for record in records[start:start + batch_size]])
+    return len(rows)
+
+def _copy_replace(table: str, rows: pd.DataFrame, batch_size: int) -> None:
+    """Load rows into a staging table with COPY, then swap them into table"""
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(col) for col in rows.columns)
+    staging = quote(f"{table}_staging")
+    with connection.cursor() as cursor:
+        cursor.execute(f"CREATE TEMPORARY TABLE {staging} ON COMMIT DROP AS SELECT {columns} FROM {quote(table)} WITH NO DATA")
+        for start in range(0, len(rows), batch_size):
+            buffer = io.StringIO()
+            rows.iloc[start:start + batch_size].to_csv(buffer, index=False, header=False, na_rep='\\N')
+            _copy_from(cursor.cursor, f"COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+        cursor.execute(f"DELETE FROM {quote(table)}")
+        cursor.execute(f"INSERT INTO {quote(table)} ({columns}) SELECT {columns} FROM {staging}")
+
+def _copy_from(cursor, sql: str, buffer: io.StringIO) -> None:
+    """Run COPY ... FROM STDIN with psycopg2 or psycopg 3"""
+    if hasattr(cursor, 'copy_expert'):
+        buffer.seek(0)
+        cursor.copy_expert(sql, buffer)
+    else:
+        with cursor.copy(sql) as copy:
+            copy.write(buffer.getvalue())
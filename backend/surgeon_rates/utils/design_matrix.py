@@ -0,0 +1,86 @@
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import List, Optional
+
+class SharedDesignMatrices:
+    def __init__(self, paths: List[str], directory: Optional[str] = None):
+        """
+        Imputed covariate matrices stored as memory-mapped .npy files
+
+        Each matrix is a C-contiguous float64 array with one row per row of
+        the input data (by position) and one column per covariate. Worker
+        processes open the files read-only, so the operating system shares
+        the pages between them instead of every worker holding a copy.
+
+        Args:
+            paths: Paths of the .npy files, one per imputation
+            directory: Temporary directory owning the files, removed by cleanup()
+        """
+        self.paths = paths
+        self.directory = directory
+
+    @classmethod
+    def from_imputations(
+        cls,
+        df: pd.DataFrame,
+        imputed_values: List[pd.DataFrame],
+        covariates: List[str],
+        directory: Optional[str] = None
+    ) -> 'SharedDesignMatrices':
+        """
+        Build one design matrix per imputation and write it to disk
+
+        Args:
+            df: Input data, used for covariates that were not imputed
+            imputed_values: DataFrames with imputed values, aligned to df by position
+            covariates: Covariate columns, in matrix column order
+            directory: Directory for the files, a new temporary directory if None
+
+        Returns:
+            SharedDesignMatrices referencing the written files
+        """
+        owned_directory = None
+        if directory is None:
+            directory = owned_directory = tempfile.mkdtemp(prefix='climetrics_design_')
+
+        paths = []
+        for i, imp_df in enumerate(imputed_values):
+            path = str(Path(directory) / f"imputation_{i}.npy")
+            matrix = np.lib.format.open_memmap(
+                path, mode='w+', dtype=np.float64, shape=(len(df), len(covariates))
+            )
+            for j, col in enumerate(covariates):
+                source = imp_df[col] if col in imp_df.columns else df[col]
+                matrix[:, j] = pd.to_numeric(source, errors='coerce').to_numpy(dtype=np.float64)
+            matrix.flush()
+            del matrix
+            paths.append(path)
+
+        return cls(paths, owned_directory)
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __enter__(self) -> 'SharedDesignMatrices':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.cleanup()
+
+    @staticmethod
+    def open(path: str) -> np.ndarray:
+        """Open a design matrix read-only without loading it into memory"""
+        return np.load(path, mmap_mode='r')
+
+    def open_all(self) -> List[np.ndarray]:
+        """Open every design matrix read-only"""
+        return [self.open(path) for path in self.paths]
+
+    def cleanup(self) -> None:
+        """Remove the files if they live in a temporary directory we created"""
+        if self.directory is not None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory = None
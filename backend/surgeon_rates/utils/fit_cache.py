@@ -0,0 +1,98 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+import pandas as pd
+
+class FitCache:
+    def __init__(self, max_entries: int = 1024, cache_dir: Optional[str] = None):
+        """
+        Initialize the fit cache
+
+        Args:
+            max_entries: Maximum number of fits kept in memory (LRU eviction)
+            cache_dir: Optional directory used to persist fits between runs
+        """
+        self.max_entries = max_entries
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def make_key(df: pd.DataFrame, *params: Any) -> str:
+        """
+        Build a content hash for a model fit
+
+        Args:
+            df: Data the model is fitted on
+            params: Additional fit settings (outcome, imputation index, ...)
+
+        Returns:
+            Hex digest identifying the fit
+        """
+        digest = hashlib.sha256()
+        digest.update(repr(list(df.columns)).encode())
+        digest.update(repr(params).encode())
+        digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """Return a copy of the cached results for key, or None on a miss"""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key].copy()
+
+        results = self._load(key)
+        if results is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._remember(key, results)
+        return results.copy()
+
+    def put(self, key: str, results: pd.DataFrame) -> None:
+        """Store results for key in memory and, if configured, on disk"""
+        results = results.copy()
+        self._remember(key, results)
+
+        if self.cache_dir is not None:
+            # Write atomically so concurrent workers never read partial files
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(results, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+
+    def _remember(self, key: str, results: pd.DataFrame) -> None:
+        """Add an entry to the in-memory LRU"""
+        self._entries[key] = results
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, key: str) -> Optional[pd.DataFrame]:
+        """Load an entry from disk, if persistence is enabled"""
+        if self.cache_dir is None:
+            return None
+
+        path = self._path(key)
+        if not path.exists():
+            return None
+
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pkl"
@@ -0,0 +1,134 @@
+import numpy as np
+from scipy import sparse
+from scipy.stats import chi2
+from typing import Dict, Optional
+
+from surgeon_rates.utils.logistic import BatchedLogisticRegression, _expit
+
+def heterogeneity_tests(
+    surgeon_codes: np.ndarray,
+    n_surgeons: int,
+    y: np.ndarray,
+    X: np.ndarray,
+    coefs: np.ndarray,
+    sample_weight: Optional[np.ndarray] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Score test for between-surgeon heterogeneity of fitted risk models
+
+    Tests adding a fixed effect per surgeon to each model without fitting
+    them. Nothing is refitted: the test is evaluated at the given
+    coefficients, with the balanced class weights, sample weights and
+    penalty of the fit.
+
+    The score of the surgeon effects is the weighted residual sum of each
+    surgeon's cases, U_k = sum_i r_i with r_i = s_i (y_i - p_i) and s_i
+    the class times sample weight. With the projection M = I_gb (I_bb +
+    P)^-1 of the surgeon effects on the fitted coefficients (from the
+    weighted information and the penalty P), the test uses the efficient
+    score U - M g, where g = sum_i r_i x_i - P b is the penalized score of
+    the coefficients b. g is zero at the optimum, and the correction
+    cancels the first-order effect of stopping short of it on the scores.
+    The variance of the scores is estimated robustly, since the weighted
+    fit is not maximum likelihood:
+
+        V = sum_i r_i^2 (z_i - M x_i) (z_i - M x_i)'
+          = D - C M' - M C' + M Q M'
+
+    where D holds each surgeon's sum of r_i^2, C = sum r_i^2 z_i x_i' and
+    Q = sum r_i^2 x_i x_i'. The unpenalized intercept makes the scores
+    and V sum to zero over surgeons, so one reference surgeon is dropped
+    and the statistic is U' V^-1 U over the others. V is diagonal plus
+    a low-rank term, so it is inverted with the Woodbury identity at the
+    cost of per-surgeon sums and a small solve per model. Under no
+    heterogeneity it is chi-square with one degree of freedom fewer than
+    the number of surgeons.
+
+    Args:
+        surgeon_codes: Surgeon code of every row, from 0 to n_surgeons - 1
+        n_surgeons: Number of surgeon codes
+        y: Outcomes of shape (n_rows, n_models), or (n_rows,) for one
+            model. NaN marks rows excluded from that model.
+        X: Covariates of shape (n_rows, n_covariates), without intercept
+        coefs: Fitted coefficients of shape (n_models, n_covariates + 1),
+            intercept first
+        sample_weight: Sample weights of the fits, of shape (n_rows,)
+
+    Returns:
+        Dictionary of per-model arrays: the statistic chisq, the degrees
+        of freedom df, the p-value, the number of surgeons num_users,
+        total_cases and min_events (the smaller of the event and
+        non-event counts)
+    """
+    y = np.asarray(y, dtype=float).reshape(len(surgeon_codes), -1)
+    X = np.asarray(X, dtype=float)
+    observed = ~np.isnan(y)
+    n_models = y.shape[1]
+
+    coefs = np.asarray(coefs, dtype=float).reshape(n_models, -1)
+
+    model = BatchedLogisticRegression()
+    S, _, fitted = model._outcome_weights(y, sample_weight)
+    design = np.hstack([np.ones((len(X), 1)), X])
+    risks = _expit(design @ coefs.T)
+    y = np.nan_to_num(y)
+    residuals = S * (y - risks)
+    info = S * risks * (1 - risks)
+
+    penalty = np.full(design.shape[1], 1.0 / model.C)
+    penalty[0] = 0.0
+    # Penalized score of the coefficients, zero at the optimum
+    gradients = residuals.T @ design - penalty * coefs
+
+    # Per-surgeon sums of every model in one sparse product
+    n_rows = len(surgeon_codes)
+    Z = sparse.csr_matrix(
+        (np.ones(n_rows), (surgeon_codes, np.arange(n_rows))),
+        shape=(n_surgeons, n_rows)
+    )
+    scores = Z @ residuals
+    squared = residuals ** 2
+    surgeon_variance = Z @ squared
+    surgeon_cases = Z @ observed.astype(float)
+
+    statistic = np.full(n_models, np.nan)
+    for j in np.flatnonzero(fitted & np.isfinite(coefs).all(axis=1)):
+        active = np.flatnonzero(surgeon_variance[:, j] > 0)
+        if len(active) < 2:
+            continue
+
+        hessian = design.T @ (info[:, j, None] * design) + np.diag(penalty)
+        projection = np.linalg.solve(hessian, (Z @ (info[:, j, None] * design))[active].T).T
+        cross = (Z @ (squared[:, j, None] * design))[active]
+        outer = design.T @ (squared[:, j, None] * design)
+
+        # Drop the surgeon with the largest variance as the reference
+        keep = np.ones(len(active), dtype=bool)
+        keep[np.argmax(surgeon_variance[active, j])] = False
+        U = (scores[active, j] - projection @ gradients[j])[keep]
+        D = surgeon_variance[active[keep], j]
+        B = np.hstack([cross[keep], projection[keep]])
+
+        # V = D + B G B' with G = [[0, -I], [-I, Q]], G^-1 = [[-Q, -I], [-I, 0]]
+        p = design.shape[1]
+        G_inv = np.block([[-outer, -np.eye(p)], [-np.eye(p), np.zeros((p, p))]])
+        a = B.T @ (U / D)
+        inner = G_inv + B.T @ (B / D[:, None])
+        statistic[j] = (U ** 2 / D).sum() - a @ np.linalg.lstsq(inner, a, rcond=None)[0]
+
+    total_cases = observed.sum(axis=0)
+    events = np.where(observed, y, 0.0).sum(axis=0)
+    num_users = (surgeon_cases > 0).sum(axis=0)
+    df = num_users - 1
+    valid = (df > 0) & ~np.isnan(statistic)
+    statistic = np.maximum(statistic, 0.0)
+    p_value = np.where(valid, chi2.sf(statistic, np.maximum(df, 1)), np.nan)
+
+    return {
+        'chisq': np.where(valid, statistic, np.nan),
+        'df': df,
+        'p_value': p_value,
+        'num_users': num_users,
+        'total_cases': total_cases,
+        'min_events': np.minimum(events, total_cases - events).astype(int)
+    }
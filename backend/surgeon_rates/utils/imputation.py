@@ -1,20 +1,56 @@
+import os
 import pandas as pd
 import numpy as np
+import sklearn
+from concurrent.futures import ProcessPoolExecutor
 from sklearn.experimental import enable_iterative_imputer
 from sklearn.impute import IterativeImputer
+from threadpoolctl import threadpool_limits
 from typing import List, Optional
 
+from surgeon_rates.utils.fit_cache import FitCache
+from surgeon_rates.utils.imputation_cache import ImputationCache
+
+# Settings of every IterativeImputer fit
+IMPUTER_SETTINGS = {'max_iter': 10, 'sample_posterior': True}
+
 class MultipleImputer:
-    def __init__(self, n_imputations: int = 5, random_state: Optional[int] = None):
+    METHODS = ('sklearn', 'fast')
+    
+    def __init__(
+        self,
+        n_imputations: int = 5,
+        random_state: Optional[int] = None,
+        n_jobs: int = 1,
+        cache: Optional[ImputationCache] = None,
+        method: str = 'sklearn'
+    ):
         """
         Initialize the multiple imputation handler
         
         Args:
             n_imputations: Number of imputations to generate
-            random_state: Random seed for reproducibility
+            random_state: Random seed for reproducibility. Each imputation
+                gets its own seed spawned from it, so results do not depend
+                on n_jobs.
+            n_jobs: Number of processes fitting imputations in parallel,
+                -1 for one per CPU
+            cache: Optional on-disk cache of completed imputations. Only
+                used with a fixed random_state, since imputations without
+                a seed are meant to differ between runs.
+            method: 'sklearn' for IterativeImputer with posterior sampling,
+                or 'fast' for chained equations with closed-form Bayesian
+                linear regressions that draw all imputations together in
+                NumPy (n_jobs is not used)
         """
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown imputation method: {method}. Must be one of {self.METHODS}")
+            
         self.n_imputations = n_imputations
         self.random_state = random_state
+        self.n_jobs = n_jobs
+        self.cache = cache
+        self.method = method
         
     def generate_multiple_imputations(
         self,
@@ -40,19 +76,27 @@ class MultipleImputer:
         # Create subset with variables to impute
         imputation_df = df[vars_to_impute + [patient_id]].copy()
         
-        # Initialize imputer
-        imputer = IterativeImputer(
-            max_iter=10,
-            random_state=self.random_state,
-            sample_posterior=True
-        )
-        
-        # Generate multiple imputations
-        imputed_dfs = []
-        for i in range(self.n_imputations):
-            # Perform imputation
-            imputed_values = imputer.fit_transform(imputation_df[vars_to_impute])
+        # Reuse the imputations of an identical earlier run if cached
+        cache_key = None
+        all_imputed = None
+        if self.cache is not None and self.random_state is not None:
+            cache_key = FitCache.make_key(
+                imputation_df[vars_to_impute],
+                self.n_imputations,
+                self.random_state,
+                sorted(IMPUTER_SETTINGS.items()),
+                sklearn.__version__,
+                *(('fast',) if self.method == 'fast' else ())
+            )
+            all_imputed = self.cache.get(cache_key)
+            
+        if all_imputed is None:
+            all_imputed = self._impute_all(imputation_df[vars_to_impute].to_numpy(dtype=np.float64))
+            if cache_key is not None:
+                self.cache.put(cache_key, np.stack(all_imputed))
             
+        imputed_dfs = []
+        for imputed_values in all_imputed:
             # Create DataFrame with imputed values
             imputed_df = pd.DataFrame(
                 imputed_values,
@@ -64,6 +108,29 @@ class MultipleImputer:
             
         return imputed_dfs
         
+    def _impute_all(self, values: np.ndarray) -> List[np.ndarray]:
+        """Fit every imputation, in parallel if n_jobs > 1"""
+        if self.method == 'fast':
+            return _chained_equations(
+                values,
+                self.n_imputations,
+                np.random.SeedSequence(self.random_state),
+                IMPUTER_SETTINGS['max_iter']
+            )
+            
+        # Independent seeds per imputation, reproducible for a given random_state
+        seeds = [
+            int(child.generate_state(1)[0])
+            for child in np.random.SeedSequence(self.random_state).spawn(self.n_imputations)
+        ]
+        
+        n_jobs = os.cpu_count() if self.n_jobs < 0 else self.n_jobs
+        n_jobs = min(n_jobs, self.n_imputations)
+        if n_jobs > 1:
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                return list(executor.map(_impute, [values] * len(seeds), seeds))
+        return [_impute(values, seed) for seed in seeds]
+        
     @staticmethod
     def validate_imputations(
         original_df: pd.DataFrame,
@@ -101,4 +168,151 @@ class MultipleImputer:
                 if abs(original_stats['mean'] - imp_stats['mean']) > 2 * original_stats['std']:
                     raise ValueError(f"Imputed values for {var} may be unreasonable")
                     
-        return True 
\ No newline at end of file
+        return True
+        
+    @staticmethod
+    def validation_report(
+        original_df: pd.DataFrame,
+        imputed_dfs: List[pd.DataFrame],
+        vars_to_impute: List[str],
+        reference_dfs: Optional[List[pd.DataFrame]] = None
+    ) -> pd.DataFrame:
+        """
+        Validate imputations and summarize the imputed values
+        
+        Both sets of imputations are checked with validate_imputations.
+        The report then describes, per variable, the values filled in for
+        missing entries: their mean, the within-imputation standard
+        deviation and the between-imputation standard deviation of the
+        mean. If reference imputations are given (for example from the
+        sklearn method), the same statistics are reported for them,
+        together with the difference of the means in units of the
+        observed standard deviation.
+        
+        Args:
+            original_df: Original DataFrame
+            imputed_dfs: Imputed DataFrames to validate
+            vars_to_impute: Variables that were imputed
+            reference_dfs: Optional imputed DataFrames to compare against
+            
+        Returns:
+            DataFrame with one row per variable
+        """
+        MultipleImputer.validate_imputations(original_df, imputed_dfs, vars_to_impute)
+        if reference_dfs is not None:
+            MultipleImputer.validate_imputations(original_df, reference_dfs, vars_to_impute)
+            
+        rows = {}
+        for var in vars_to_impute:
+            missing = original_df[var].isna().to_numpy()
+            observed = original_df[var][~missing]
+            row = {
+                'missing': int(missing.sum()),
+                'observed_mean': observed.mean(),
+                'observed_std': observed.std()
+            }
+            sets = [('imputed', imputed_dfs)]
+            if reference_dfs is not None:
+                sets.append(('reference', reference_dfs))
+            for name, dfs in sets:
+                filled = np.stack([imp_df[var].to_numpy(dtype=np.float64)[missing] for imp_df in dfs])
+                row[f'{name}_mean'] = filled.mean() if missing.any() else np.nan
+                row[f'{name}_std'] = filled.std(axis=1, ddof=1).mean() if missing.sum() > 1 else np.nan
+                row[f'{name}_between_std'] = filled.mean(axis=1).std(ddof=1) if len(dfs) > 1 and missing.any() else np.nan
+            if reference_dfs is not None:
+                row['std_mean_difference'] = (row['imputed_mean'] - row['reference_mean']) / row['observed_std']
+            rows[var] = row
+            
+        return pd.DataFrame.from_dict(rows, orient='index')
+
+def _impute(values: np.ndarray, seed: int) -> np.ndarray:
+    """Fit an iterative imputer with its own seed and return the completed values"""
+    imputer = IterativeImputer(random_state=seed, **IMPUTER_SETTINGS)
+    # The regressions are a few columns wide, so threaded BLAS gains little;
+    # one thread avoids oversubscribing parallel workers and keeps results
+    # identical for any n_jobs
+    with threadpool_limits(limits=1):
+        return imputer.fit_transform(values)
+
+def _chained_equations(
+    values: np.ndarray,
+    n_imputations: int,
+    seed: np.random.SeedSequence,
+    max_iter: int = 10,
+    ridge: float = 1e-6
+) -> List[np.ndarray]:
+    """
+    Multiple imputation by chained equations with Bayesian linear regression
+    
+    Starts from mean imputation, then for max_iter rounds regresses each
+    incomplete variable (fewest missing first, as IterativeImputer does)
+    on all others and redraws its missing entries. Every imputation is
+    updated in the same batched operations. The regression for a
+    variable comes from one Gram matrix of [1, data] over its observed
+    rows, which also gives the residual sum of squares. Draws follow
+    the Bayesian normal linear model: sigma^2 from a scaled inverse
+    chi-square, coefficients from their normal posterior, then the
+    imputed values with residual noise.
+    
+    Args:
+        values: Data of shape (n_rows, n_vars) with NaN for missing entries
+        n_imputations: Number of imputations drawn
+        seed: Seed sequence of the draws
+        max_iter: Number of rounds over the incomplete variables
+        ridge: Small ridge added to the Gram matrix for stability
+        
+    Returns:
+        List of completed arrays of shape (n_rows, n_vars)
+    """
+    rng = np.random.default_rng(seed)
+    n_rows, n_vars = values.shape
+    missing = np.isnan(values)
+    
+    # Start every imputation from mean imputation
+    means = np.nanmean(values, axis=0)
+    data = np.repeat(np.where(missing, means, values)[None], n_imputations, axis=0)
+    
+    order = [
+        j for j in np.argsort(missing.sum(axis=0), kind='stable')
+        if missing[:, j].any() and not missing[:, j].all()
+    ]
+    n_coefs = n_vars
+    for _ in range(max_iter):
+        for j in order:
+            observed = ~missing[:, j]
+            others = [1 + k for k in range(n_vars) if k != j]
+            predictors = [0] + others
+            
+            # Sufficient statistics of [1, data] over the observed rows, for all imputations
+            observed_data = data[:, observed]
+            sums = observed_data.sum(axis=1)
+            gram = np.empty((n_imputations, n_vars + 1, n_vars + 1))
+            gram[:, 0, 0] = observed.sum()
+            gram[:, 0, 1:] = sums
+            gram[:, 1:, 0] = sums
+            gram[:, 1:, 1:] = np.matmul(observed_data.transpose(0, 2, 1), observed_data)
+            del observed_data
+            
+            xtx = gram[:, predictors][:, :, predictors] + ridge * np.eye(n_coefs)
+            xty = gram[:, predictors, 1 + j]
+            yty = gram[:, 1 + j, 1 + j]
+            
+            precision_inv = np.linalg.inv(xtx)
+            beta = np.matmul(precision_inv, xty[..., None])[..., 0]
+            rss = np.maximum(yty - (beta * xty).sum(axis=1), 1e-12)
+            
+            # Posterior draws of the noise scale and coefficients
+            dof = max(observed.sum() - n_coefs, 1)
+            sigma = np.sqrt(rss / rng.chisquare(dof, size=n_imputations))
+            chol = np.linalg.cholesky(precision_inv)
+            noise = rng.standard_normal((n_imputations, n_coefs, 1))
+            beta_draw = beta + sigma[:, None] * np.matmul(chol, noise)[..., 0]
+            
+            # Redraw the missing entries from the posterior predictive
+            rows = missing[:, j]
+            predicted = np.matmul(
+                data[:, rows][:, :, [k - 1 for k in others]], beta_draw[:, 1:, None]
+            )[..., 0] + beta_draw[:, :1]
+            data[:, rows, j] = predicted + sigma[:, None] * rng.standard_normal((n_imputations, rows.sum()))
+            
+    return list(data)
@@ -0,0 +1,72 @@
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+class ImputationCache:
+    def __init__(self, cache_dir: str, max_bytes: int = 1 << 30):
+        """
+        Initialize the on-disk imputation cache
+
+        Each entry holds every completed imputation of one dataset as a
+        single float64 .npy array of shape (n_imputations, n_rows, n_vars),
+        which loads with one read. Entries are evicted least recently used
+        first once the files exceed max_bytes.
+
+        Args:
+            cache_dir: Directory holding the cached imputations
+            max_bytes: Maximum total size of the cached files
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Return the cached imputations for key, or None on a miss"""
+        path = self._path(key)
+        try:
+            imputations = np.load(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        # Mark the entry as recently used for eviction
+        os.utime(path)
+        self.hits += 1
+        return imputations
+
+    def put(self, key: str, imputations: np.ndarray) -> None:
+        """Store imputations for key, then evict old entries if over the size limit"""
+        # Write atomically so concurrent runs never read partial files
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, np.ascontiguousarray(imputations, dtype=np.float64))
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        for path in self.cache_dir.glob('*.npy'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.npy"
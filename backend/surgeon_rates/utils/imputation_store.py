@@ -0,0 +1,91 @@
+import os
+import tempfile
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+class ImputationStore:
+    def __init__(self, path: str, settings: Tuple = ()):
+        """
+        Initialize the store of every row's imputations from the last run
+
+        The imputer is fitted on every row, so new rows change the imputed
+        values of old rows. The store freezes them instead: each row is
+        keyed by a hash of its id and raw imputer inputs, and a later run
+        takes the stored values of every row whose key is unchanged and
+        only uses fresh imputations for new or edited rows. A model's
+        imputed covariates then only change when rows of its own window
+        change. The store is a single .npz file of the sorted keys and a
+        float64 array of shape (n_imputations, n_keys, n_vars).
+
+        Args:
+            path: Path of the .npz file
+            settings: Imputation settings; stored values are only reused
+                by a run with the same settings
+        """
+        self.path = Path(path)
+        self.settings = repr(settings)
+
+    @staticmethod
+    def row_keys(df: pd.DataFrame, columns: List[str]) -> np.ndarray:
+        """Hash each row's id and raw imputer inputs into its key"""
+        return pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+
+    def freeze(self, keys: np.ndarray, imputations: Optional[np.ndarray] = None) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        """
+        Replace the imputations of stored rows with their stored values
+
+        Args:
+            keys: Key of every row, from row_keys
+            imputations: Fresh imputations of shape (n_imputations, n_rows,
+                n_vars), or None to only look the rows up
+
+        Returns:
+            The imputations with stored rows replaced (None if imputations
+            is None and some rows are not stored, otherwise the stored
+            values of every row), and a mask of the rows that were stored
+        """
+        stored = self._load()
+        if stored is None or len(stored[0]) == 0:
+            return imputations, np.zeros(len(keys), dtype=bool)
+
+        stored_keys, stored_values = stored
+        positions = np.minimum(np.searchsorted(stored_keys, keys), len(stored_keys) - 1)
+        found = stored_keys[positions] == keys
+        if imputations is None:
+            if not found.all():
+                return None, found
+            return stored_values[:, positions], found
+
+        if stored_values.shape[0] != imputations.shape[0]:
+            return imputations, np.zeros(len(keys), dtype=bool)
+        imputations = imputations.copy()
+        imputations[:, found] = stored_values[:, positions[found]]
+        return imputations, found
+
+    def save(self, keys: np.ndarray, imputations: np.ndarray) -> None:
+        """Store the imputations of every row, replacing the stored ones"""
+        # Identical rows share a key and their first imputations
+        keys, first = np.unique(keys, return_index=True)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(
+                f,
+                keys=keys,
+                imputations=np.ascontiguousarray(imputations[:, first], dtype=np.float64),
+                settings=np.array(self.settings)
+            )
+        os.replace(tmp_path, self.path)
+
+    def _load(self) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Load the stored keys and imputations, or None if missing or made with other settings"""
+        try:
+            with np.load(self.path) as stored:
+                if str(stored['settings']) != self.settings:
+                    return None
+                return stored['keys'], stored['imputations']
+        except (OSError, ValueError, KeyError):
+            return None
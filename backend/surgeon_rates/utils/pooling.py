@@ -0,0 +1,245 @@
+import warnings
+import numpy as np
+import pandas as pd
+from scipy.stats import chi2, f, norm, t
+from typing import Dict, List, Optional
+
+from surgeon_rates.utils.result_accumulator import ResultAccumulator
+
+# Columns averaged across imputations besides the pooled rate
+MEAN_COLUMNS = ['raw_rate', 'expected', 'oe_ratio']
+# Columns taken from the first successful imputation
+FIRST_COLUMNS = ['cases', 'method']
+# Model totals of the heterogeneity test, the same in every imputation
+COUNT_COLUMNS = ['num_users', 'total_cases', 'min_events']
+# Interval bounds are kept this far from 0 (and 1) before transforming
+BOUND_EPSILON = 1e-12
+# Number of models ImputationPooler pools at a time
+POOL_BATCH = 1000
+
+def rubins_rules(estimates: np.ndarray, variances: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Pool per-imputation estimates with Rubin's rules
+
+    Works on any number of leading dimensions at once; the last axis
+    holds the imputations. Missing imputations (failed fits) are NaN and
+    are left out of every statistic.
+
+    Args:
+        estimates: Per-imputation estimates of shape (..., n_imputations)
+        variances: Within-imputation variances of the same shape
+
+    Returns:
+        Dictionary with the pooled estimate, the within, between and total
+        variances, the number of imputations used and the degrees of freedom
+        (infinite when the imputations agree)
+    """
+    with warnings.catch_warnings():
+        # Cells without any successful imputation pool to NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        m = np.sum(~np.isnan(estimates), axis=-1)
+        estimate = np.nanmean(estimates, axis=-1)
+        within = np.nanmean(variances, axis=-1)
+        between = np.nanvar(estimates, axis=-1, ddof=1)
+
+    # Identical estimates (such as raw rates) only differ by round-off
+    between = np.where((m > 1) & (between > (1e-12 * estimate) ** 2), between, 0.0)
+    total = within + (1 + 1 / np.maximum(m, 1)) * between
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Relative increase in variance due to missing data
+        r = (1 + 1 / m) * between / within
+        df = np.where(between > 0, (m - 1) * (1 + 1 / r) ** 2, np.inf)
+
+    return {
+        'estimate': estimate,
+        'within': within,
+        'between': between,
+        'total': total,
+        'm': m,
+        'df': df
+    }
+
+def pool_chi_square(statistics: np.ndarray, df: np.ndarray) -> np.ndarray:
+    """
+    Pool per-imputation chi-square statistics into one p-value (the D2 rule)
+
+    Follows Li, Meng, Raghunathan and Rubin (1991): the average statistic
+    is discounted by the between-imputation variance of its square root
+    and referred to an F distribution. Works on any number of leading
+    dimensions; the last axis holds the imputations, NaN where missing.
+    A single imputation gives the plain chi-square p-value.
+
+    Args:
+        statistics: Chi-square statistics of shape (..., n_imputations)
+        df: Degrees of freedom, broadcastable to statistics.shape[:-1]
+
+    Returns:
+        Pooled p-values, NaN where df is not positive or no imputation
+        has a statistic
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        m = np.sum(~np.isnan(statistics), axis=-1)
+        mean = np.nanmean(statistics, axis=-1)
+        r = np.where(m > 1, (1 + 1 / np.maximum(m, 1)) * np.nanvar(np.sqrt(statistics), axis=-1, ddof=1), 0.0)
+
+    k = np.maximum(np.asarray(df, dtype=float), 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d2 = np.maximum((mean / k - (m + 1) / (m - 1) * r) / (1 + r), 0)
+        denominator_df = k ** (-3 / m) * (m - 1) * (1 + 1 / r) ** 2
+        p_value = np.where(
+            r > 0,
+            f.sf(d2, k, np.where(r > 0, denominator_df, 1)),
+            chi2.sf(np.where(m > 1, d2 * k, mean), k)
+        )
+    return np.where((np.asarray(df) > 0) & (m > 0), p_value, np.nan)
+
+def pool_results(results: pd.DataFrame, n_imputations: int, ci_level: float = 0.95) -> pd.DataFrame:
+    """
+    Pool per-imputation rates of any number of models in one pass
+
+    Every (model, surgeon) pair is a row of a dense array with one column
+    per imputation, so the whole grid is pooled with a few vectorized
+    reductions instead of a groupby per model. Rates are averaged as
+    before, and heterogeneity statistics are pooled with the D2 rule.
+
+    If the results carry lowerCI and upperCI, the intervals are pooled on
+    the logit scale (the log scale for indirectly standardized rates,
+    which can exceed 1), where the Wilson, delta-method and bootstrap
+    intervals are close to symmetric. Each imputation's interval gives a
+    center and a within variance from its transformed bounds. The centers
+    are pooled with Rubin's rules, and the t interval is mapped back, so
+    the pooled interval keeps its asymmetry and equals the per-imputation
+    interval when the imputations agree. The total variance on that scale
+    and the degrees of freedom are added.
+
+    Args:
+        results: Per-imputation results with model_id and imputation
+            columns, surgeons in each model's result order
+        n_imputations: Number of imputations
+        ci_level: Confidence level of the per-imputation and pooled intervals
+
+    Returns:
+        One row per model and surgeon, surgeons sorted within each model,
+        models in order of first appearance
+    """
+    if len(results) == 0:
+        return pd.DataFrame()
+
+    # Cells are (model, surgeon) pairs, in model order then surgeon order
+    model_codes, model_ids = pd.factorize(results['model_id'])
+    keys = pd.DataFrame({'model': model_codes, 'surgeon_id': results['surgeon_id'].to_numpy()})
+    cells = keys.drop_duplicates().sort_values(['model', 'surgeon_id'], kind='stable')
+    cell_codes = pd.MultiIndex.from_frame(cells).get_indexer(pd.MultiIndex.from_frame(keys))
+    imputations = results['imputation'].to_numpy()
+
+    def dense(column: str) -> np.ndarray:
+        values = np.full((len(cells), n_imputations), np.nan)
+        values[cell_codes, imputations] = results[column].to_numpy(dtype=np.float64)
+        return values
+
+    # First successful imputation of every cell
+    first = np.full(len(cells), len(results))
+    np.minimum.at(first, cell_codes, np.arange(len(results)))
+
+    pooled = {'surgeon_id': cells['surgeon_id'].to_numpy()}
+    rates = dense('rate')
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        pooled['rate'] = np.nanmean(rates, axis=1)
+    if 'lowerCI' in results.columns:
+        transform, inverse = (_log, np.exp) if 'oe_ratio' in results.columns else (_logit, _expit)
+        lower, upper = transform(dense('lowerCI')), transform(dense('upperCI'))
+        z = norm.ppf(0.5 + ci_level / 2)
+        rubin = rubins_rules((lower + upper) / 2, ((upper - lower) / (2 * z)) ** 2)
+        half_width = t.ppf(0.5 + ci_level / 2, rubin['df']) * np.sqrt(rubin['total'])
+        lower = inverse(rubin['estimate'] - half_width)
+        upper = inverse(rubin['estimate'] + half_width)
+        # Bounds at the clipping limits stand for bounds of 0 (or 1)
+        pooled['lowerCI'] = np.where(lower > 2 * BOUND_EPSILON, lower, 0.0)
+        pooled['upperCI'] = upper if inverse is np.exp else np.where(upper < 1 - 2 * BOUND_EPSILON, upper, 1.0)
+        pooled['variance'] = rubin['total']
+        pooled['df'] = rubin['df']
+
+    for column in MEAN_COLUMNS:
+        if column in results.columns:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)
+                pooled[column] = np.nanmean(dense(column), axis=1)
+    for column in FIRST_COLUMNS:
+        pooled[column] = results[column].to_numpy()[first]
+    if 'hetero_chisq' in results.columns:
+        df = results['num_users'].to_numpy(dtype=np.float64)[first] - 1
+        pooled['heterotest'] = pool_chi_square(dense('hetero_chisq'), df)
+    for column in COUNT_COLUMNS:
+        if column in results.columns:
+            pooled[column] = results[column].to_numpy()[first]
+    pooled['model_id'] = np.asarray(model_ids)[cells['model'].to_numpy()]
+
+    return pd.DataFrame(pooled)
+
+def _logit(p: np.ndarray) -> np.ndarray:
+    """Logit of interval bounds, with bounds of 0 and 1 kept finite"""
+    p = np.clip(p, BOUND_EPSILON, 1 - BOUND_EPSILON)
+    return np.log(p) - np.log1p(-p)
+
+def _expit(x: np.ndarray) -> np.ndarray:
+    """Inverse of _logit"""
+    return np.exp(-np.logaddexp(0.0, -x))
+
+def _log(x: np.ndarray) -> np.ndarray:
+    """Log of interval bounds, with bounds of 0 kept finite"""
+    return np.log(np.maximum(x, BOUND_EPSILON))
+
+class ImputationPooler:
+    def __init__(self, ci_level: float = 0.95, batch_size: int = POOL_BATCH):
+        """
+        Collect per-imputation results of a model grid and pool them as they arrive
+
+        Rows are appended to a columnar ResultAccumulator, tagged with their
+        model_id and imputation. Once batch_size models are waiting, they
+        are pooled together by pool_results and only the pooled rows are
+        kept, so at most one batch of per-imputation rows is held at a time.
+
+        Args:
+            ci_level: Confidence level of the per-imputation and pooled intervals
+            batch_size: Number of models pooled at a time
+        """
+        self.ci_level = ci_level
+        self.batch_size = batch_size
+        self.n_imputations = 0
+        self._pending = ResultAccumulator()
+        self._pending_models = 0
+        self._pooled = ResultAccumulator()
+
+    def add(self, model_id: str, results_list: List[Optional[pd.DataFrame]]) -> None:
+        """
+        Add the per-imputation results of one model
+
+        Args:
+            model_id: Identifier for the model
+            results_list: Results of each imputation, None for failed imputations
+        """
+        self.n_imputations = max(self.n_imputations, len(results_list))
+        if all(results is None for results in results_list):
+            return
+
+        for imputation, results in enumerate(results_list):
+            if results is not None:
+                self._pending.append(results, {'model_id': model_id, 'imputation': imputation})
+        self._pending_models += 1
+        if self._pending_models >= self.batch_size:
+            self._pool_pending()
+
+    def pool(self) -> pd.DataFrame:
+        """Pooled results of every model added so far, in order of first appearance"""
+        self._pool_pending()
+        return self._pooled.to_frame().reset_index(drop=True)
+
+    def _pool_pending(self) -> None:
+        """Pool the waiting models and keep only their pooled rows"""
+        if len(self._pending) > 0:
+            self._pooled.append(pool_results(self._pending.to_frame(), self.n_imputations, self.ci_level))
+        self._pending = ResultAccumulator()
+        self._pending_models = 0
@@ -0,0 +1,179 @@
+import json
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+class RunProfiler:
+    def __init__(self, enabled: bool = True):
+        """
+        Per-stage and per-model timings of a rates run
+
+        Each stage records wall time, CPU time (this process plus worker
+        processes that finished during the stage) and peak resident
+        memory. On Linux the peak is reset at the start of every stage,
+        so it is the stage's own peak; elsewhere it is the process peak so
+        far. Model fits report their wall and CPU time separately, split
+        into row selection and fitting, and are summarized per outcome
+        family and per model.
+
+        A disabled profiler records nothing, so the pipeline can always
+        wrap its stages.
+
+        Args:
+            enabled: Whether to record anything
+        """
+        self.enabled = enabled
+        self.stages: List[Dict] = []
+        self.models: Dict[str, Dict] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Record the resources used by the enclosed block as one stage"""
+        if not self.enabled:
+            yield
+            return
+
+        _reset_peak_rss()
+        wall = time.perf_counter()
+        cpu = _cpu_seconds()
+        try:
+            yield
+        finally:
+            self.stages.append({
+                'stage': name,
+                'wall_seconds': time.perf_counter() - wall,
+                'cpu_seconds': _cpu_seconds() - cpu,
+                'peak_rss_mb': _peak_rss_mb()
+            })
+
+    def record_model(
+        self,
+        spec: Dict,
+        select_seconds: float,
+        fit_seconds: float,
+        cpu_seconds: float
+    ) -> None:
+        """
+        Add the time spent on one imputation of a model
+
+        Args:
+            spec: Model spec with model_id and label
+            select_seconds: Wall time selecting and preparing the model's rows
+            fit_seconds: Wall time fitting the model
+            cpu_seconds: CPU time of the worker for both
+        """
+        if not self.enabled:
+            return
+
+        model = self.models.setdefault(spec['model_id'], {
+            'model_id': spec['model_id'],
+            'family': spec['label'],
+            'tasks': 0,
+            'select_seconds': 0.0,
+            'fit_seconds': 0.0,
+            'cpu_seconds': 0.0
+        })
+        model['tasks'] += 1
+        model['select_seconds'] += select_seconds
+        model['fit_seconds'] += fit_seconds
+        model['cpu_seconds'] += cpu_seconds
+
+    def report(self, top_n: int = 10) -> Dict:
+        """
+        Build the profile report
+
+        Args:
+            top_n: Number of slowest models listed
+
+        Returns:
+            Dictionary with the stages, per-family totals, per-model
+            times and the top_n slowest models
+        """
+        families: Dict[str, Dict] = {}
+        for model in self.models.values():
+            family = families.setdefault(model['family'], {
+                'family': model['family'],
+                'models': 0,
+                'select_seconds': 0.0,
+                'fit_seconds': 0.0,
+                'cpu_seconds': 0.0
+            })
+            family['models'] += 1
+            for key in ['select_seconds', 'fit_seconds', 'cpu_seconds']:
+                family[key] += model[key]
+
+        models = sorted(
+            self.models.values(),
+            key=lambda model: model['select_seconds'] + model['fit_seconds'],
+            reverse=True
+        )
+        return {
+            'stages': self.stages,
+            'total_wall_seconds': sum(stage['wall_seconds'] for stage in self.stages),
+            'families': sorted(families.values(), key=lambda family: family['fit_seconds'], reverse=True),
+            'slowest_models': models[:top_n],
+            'models': list(self.models.values())
+        }
+
+    def save(self, path: str, top_n: int = 10) -> None:
+        """Write the report as JSON"""
+        with open(Path(path), 'w') as f:
+            json.dump(self.report(top_n), f, indent=2)
+
+    def summary(self, top_n: int = 10) -> str:
+        """Human-readable table of the stages and the top_n slowest models"""
+        report = self.report(top_n)
+        lines = [f"{'Stage':<10} {'Wall (s)':>10} {'CPU (s)':>10} {'Peak (MB)':>10}"]
+        for stage in report['stages']:
+            peak = stage['peak_rss_mb']
+            lines.append(
+                f"{stage['stage']:<10} {stage['wall_seconds']:>10.2f} {stage['cpu_seconds']:>10.2f} "
+                f"{peak if peak is not None else float('nan'):>10.1f}"
+            )
+        if report['slowest_models']:
+            lines.append(f"\nSlowest {len(report['slowest_models'])} models (select + fit seconds):")
+            for model in report['slowest_models']:
+                lines.append(
+                    f"  {model['model_id']}: {model['select_seconds'] + model['fit_seconds']:.3f}"
+                )
+        return '\n'.join(lines)
+
+def _cpu_seconds() -> float:
+    """User and system CPU time of this process and its finished children"""
+    if resource is None:
+        return time.process_time()
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+def _reset_peak_rss() -> None:
+    """Reset the peak resident memory of this process where Linux allows it"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+def _peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of this process in MB, None if unknown"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
@@ -1,13 +1,81 @@
+import zlib
 import pandas as pd
 import numpy as np
+from scipy.stats import norm
 from sklearn.linear_model import LogisticRegression
 from sklearn.impute import SimpleImputer
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple, Any
+from typing import List, Dict, Optional, Tuple, Any, Union
+
+from surgeon_rates.utils.bootstrap import BootstrapEngine
+from surgeon_rates.utils.fit_cache import FitCache
+from surgeon_rates.utils.heterogeneity import heterogeneity_tests
+from surgeon_rates.utils.logistic import BatchedLogisticRegression
+from surgeon_rates.utils.pooling import ImputationPooler
 
 class RateGenerator:
-    def __init__(self):
+    SOLVERS = ('sklearn', 'irls')
+    ADJUSTMENTS = ('average', 'indirect')
+    
+    # Settings of the 'sklearn' solver's LogisticRegression. Newton steps to
+    # a tight tolerance agree with 'irls' to well within the reported digits
+    SKLEARN_SETTINGS = {'class_weight': 'balanced', 'solver': 'newton-cholesky', 'tol': 1e-8}
+    
+    # Version of the result columns. Bumped when they or the way they are
+    # computed change, so cached fits and earlier runs' results are refitted
+    RESULTS_VERSION = 4
+    
+    def __init__(
+        self,
+        fit_cache: Optional[FitCache] = None,
+        warm_start: bool = False,
+        solver: str = 'sklearn',
+        ci_level: float = 0.95,
+        bootstrap: Optional[BootstrapEngine] = None,
+        adjustment: str = 'average'
+    ):
+        """
+        Initialize the rate generator
+        
+        Args:
+            fit_cache: Optional cache used to reuse results of identical fits
+            warm_start: Seed each logistic fit with the coefficients of the
+                previous fit for the same outcome and imputation
+            solver: 'sklearn' for scikit-learn's LogisticRegression, or 'irls'
+                for the in-house weighted IRLS solver, which also adds
+                lowerCI and upperCI columns to the results
+            ci_level: Confidence level of the intervals from the irls solver
+            bootstrap: Optional bootstrap engine. If given, lowerCI and
+                upperCI are percentile bootstrap intervals, with either solver
+            adjustment: 'average' to predict the adjusted rate at the
+                average covariates, or 'indirect' for indirect
+                standardization: each surgeon's observed events over the
+                sum of their patients' predicted risks (the O/E ratio),
+                times the overall rate of the model's cases
+        """
+        if solver not in self.SOLVERS:
+            raise ValueError(f"Unknown solver: {solver}. Must be one of {self.SOLVERS}")
+        if adjustment not in self.ADJUSTMENTS:
+            raise ValueError(f"Unknown adjustment: {adjustment}. Must be one of {self.ADJUSTMENTS}")
+            
         self.covariates = ['age', 'female', 'bmi', 'thickness', 'ulceration']
+        self.fit_cache = fit_cache
+        self.warm_start = warm_start
+        self.solver = solver
+        self.ci_level = ci_level
+        self.bootstrap = bootstrap
+        self.adjustment = adjustment
+        self.fit_stats = {
+            'cold_fits': 0,
+            'cold_iterations': 0,
+            'warm_fits': 0,
+            'warm_iterations': 0
+        }
+        self._warm_coefs: Dict[Tuple[str, Optional[int]], Tuple[np.ndarray, np.ndarray]] = {}
+        
+    def reset_warm_start(self) -> None:
+        """Forget the coefficients used to seed warm-started fits"""
+        self._warm_coefs.clear()
         
     def generate_rate(
         self,
@@ -46,15 +114,55 @@ class RateGenerator:
         Returns:
             DataFrame containing the calculated rates
         """
+        df = self.prepare_model_data(df, outcome, model_type, weight_var)
+        model_type = model_type.upper()
+        
+        # Handle imputed values if provided
+        if imputed_values is not None:
+            results = self._process_imputed_data(
+                df, imputed_values, outcome, model_type, avg_covariates
+            )
+        else:
+            results = self._process_single_dataset(
+                df, outcome, model_type, avg_covariates
+            )
+            
+        return self._add_metadata(results, model_id, date)
+        
+    def prepare_model_data(
+        self,
+        df: pd.DataFrame,
+        outcome: Union[str, List[str]],
+        model_type: str = "LOGISTIC",
+        weight_var: str = "yos"
+    ) -> pd.DataFrame:
+        """
+        Validate the input data and prepare it for model fitting
+        
+        Args:
+            df: Input DataFrame containing the procedure data
+            outcome: Name of the outcome column, or a list of outcome columns
+                for models fitted together
+            model_type: Type of model (LOGISTIC, LINEAR, SURVIVAL)
+            weight_var: Name of the weight column
+            
+        Returns:
+            Copy of the modelled columns with numeric covariates and model weights
+        """
+        outcomes = [outcome] if isinstance(outcome, str) else list(outcome)
+        
+        # Only copy the columns used for fitting
+        used_cols = {'userId', weight_var, *outcomes, *self.covariates}
+        df = df[[col for col in df.columns if col in used_cols]].copy()
+        
         # Convert data types for required columns
-        df = df.copy()
-        for col in self.covariates + [outcome]:
+        for col in self.covariates + outcomes:
             if col in df.columns:
                 df[col] = pd.to_numeric(df[col], errors='coerce')
         
         # Input validation
-        if not all(col in df.columns for col in [outcome] + self.covariates):
-            missing_cols = [col for col in [outcome] + self.covariates if col not in df.columns]
+        if not all(col in df.columns for col in outcomes + self.covariates):
+            missing_cols = [col for col in outcomes + self.covariates if col not in df.columns]
             raise ValueError(f"Missing required columns in the dataset: {missing_cols}")
             
         model_type = model_type.upper()
@@ -62,19 +170,241 @@ class RateGenerator:
             raise ValueError("Invalid model type")
             
         # Prepare the data
-        df = self._prepare_data(df, outcome, weight_var)
+        return self._prepare_data(df, outcomes[0], weight_var)
         
-        # Handle imputed values if provided
-        if imputed_values is not None:
-            results = self._process_imputed_data(
-                df, imputed_values, outcome, model_type, avg_covariates
+    def generate_imputation_rate(
+        self,
+        df: pd.DataFrame,
+        imp_df: Union[pd.DataFrame, np.ndarray],
+        outcome: str,
+        model_type: str = "LOGISTIC",
+        avg_covariates: Optional[Dict] = None,
+        imputation: Optional[int] = None
+    ) -> pd.DataFrame:
+        """
+        Calculate rates for a single imputed dataset
+        
+        Args:
+            df: Data returned by prepare_model_data
+            imp_df: DataFrame with imputed covariate values aligned to df by
+                index, or a design matrix with one column per covariate (in
+                self.covariates order) whose rows are addressed by df's index
+            outcome: Name of the outcome column
+            model_type: Type of model (LOGISTIC, LINEAR, SURVIVAL)
+            avg_covariates: Pre-calculated average covariates
+            imputation: Index of the imputation, used in the fit cache key
+            
+        Returns:
+            DataFrame containing the rates for this imputation
+        """
+        analysis_df = self._imputed_analysis_data(df, imp_df, [outcome])
+        
+        return self._process_single_dataset(
+            analysis_df,
+            outcome,
+            model_type.upper(),
+            avg_covariates,
+            imputation
+        )
+        
+    def generate_imputation_rates(
+        self,
+        df: pd.DataFrame,
+        imp_df: Union[pd.DataFrame, np.ndarray],
+        outcomes: List[str],
+        model_type: str = "LOGISTIC",
+        avg_covariates: Optional[Dict] = None,
+        imputation: Optional[int] = None
+    ) -> List[Optional[pd.DataFrame]]:
+        """
+        Calculate rates for several outcomes on one imputed dataset
+        
+        All outcomes share the rows and covariates of df, so they are fitted
+        together by the batched logistic engine instead of one sklearn fit
+        per outcome. Rows missing an outcome are left out of that outcome's
+        fit, as in generate_imputation_rate.
+        
+        Args:
+            df: Data returned by prepare_model_data for all outcomes
+            imp_df: Imputed covariates, as for generate_imputation_rate
+            outcomes: Names of the outcome columns
+            model_type: Type of model, only LOGISTIC is supported
+            avg_covariates: Pre-calculated average covariates
+            imputation: Index of the imputation, used in the fit cache key
+            
+        Returns:
+            DataFrame of rates for each outcome, None where the fit failed
+        """
+        if model_type.upper() != "LOGISTIC":
+            raise ValueError("Batched rates are only available for LOGISTIC models")
+            
+        analysis_df = self._imputed_analysis_data(df, imp_df, outcomes)
+        analysis_df = analysis_df[analysis_df[self.covariates].notna().all(axis=1)]
+        
+        # Look up cached fits and find the outcomes that still need fitting
+        results: List[Optional[pd.DataFrame]] = [None] * len(outcomes)
+        cache_keys: List[Optional[str]] = [None] * len(outcomes)
+        to_fit = []
+        for i, outcome in enumerate(outcomes):
+            outcome_df = analysis_df[analysis_df[outcome].notna()]
+            if len(outcome_df) == 0:
+                print("Error processing imputed dataset: No complete cases available for analysis")
+                continue
+                
+            if self.fit_cache is not None:
+                cache_keys[i] = FitCache.make_key(
+                    outcome_df[['userId', outcome] + self.covariates + ['model_weight']],
+                    outcome,
+                    "LOGISTIC",
+                    avg_covariates,
+                    imputation,
+                    'batched',
+                    *self._settings_key()
+                )
+                results[i] = self.fit_cache.get(cache_keys[i])
+            if results[i] is None:
+                to_fit.append(i)
+                
+        if not to_fit:
+            return results
+            
+        # Fit every remaining outcome in one pass, seeded by earlier fits if warm-starting
+        fit_outcomes = [outcomes[i] for i in to_fit]
+        previous = [
+            self._warm_coefs.get((outcome, imputation)) if self.warm_start else None
+            for outcome in fit_outcomes
+        ]
+        coef_init = np.zeros((len(fit_outcomes), len(self.covariates) + 1))
+        for k, start in enumerate(previous):
+            if start is not None:
+                coef_init[k] = np.r_[start[1], start[0].ravel()]
+                
+        model = BatchedLogisticRegression().fit(
+            analysis_df[self.covariates].to_numpy(dtype=float),
+            analysis_df[fit_outcomes].to_numpy(dtype=float),
+            sample_weight=analysis_df['model_weight'].to_numpy(dtype=float),
+            coef_init=coef_init
+        )
+        
+        X = analysis_df[self.covariates].to_numpy(dtype=float)
+        observed = analysis_df[fit_outcomes].notna().to_numpy()
+        outcome_values = analysis_df[fit_outcomes].to_numpy(dtype=float)
+        indirect = self.adjustment == 'indirect'
+        
+        # Calibrated risks of every outcome's cases for indirect
+        # standardization, from one linear predictor call for all outcomes
+        if indirect:
+            linear_predictor = model.decision_function(X)
+            case_risks = np.zeros(observed.shape)
+            for k in range(len(fit_outcomes)):
+                case_risks[observed[:, k], k] = self._expected_risks(
+                    linear_predictor[observed[:, k], k], outcome_values[observed[:, k], k]
+                )
+                
+        # Heterogeneity tests of all outcomes at once
+        surgeon_codes, surgeon_ids = pd.factorize(analysis_df['userId'])
+        heterogeneity = heterogeneity_tests(
+            surgeon_codes,
+            len(surgeon_ids),
+            outcome_values,
+            X,
+            np.column_stack([model.intercept_, model.coef_]),
+            analysis_df['model_weight'].to_numpy(dtype=float)
+        )
+        
+        if not indirect and avg_covariates is not None:
+            adj_X = np.array([[avg_covariates[col] for col in self.covariates]])
+            adj_rates, adj_lower, adj_upper = (
+                values[0] for values in model.predict_interval(adj_X, self.ci_level)
             )
-        else:
-            results = self._process_single_dataset(
-                df, outcome, model_type, avg_covariates
+            
+        for k, i in enumerate(to_fit):
+            outcome = outcomes[i]
+            if not model.fitted_[k]:
+                print(f"Error processing imputed dataset: {outcome} needs samples of at least 2 classes")
+                continue
+                
+            if self.warm_start:
+                self._warm_coefs[(outcome, imputation)] = (
+                    model.coef_[k:k + 1].copy(), model.intercept_[k:k + 1].copy()
+                )
+            kind = 'warm' if previous[k] is not None else 'cold'
+            self.fit_stats[f'{kind}_fits'] += 1
+            self.fit_stats[f'{kind}_iterations'] += int(model.n_iter_[k])
+            
+            rows = observed[:, k]
+            user_ids = analysis_df['userId'][rows]
+            y = analysis_df[outcome][rows].astype(float)
+            averaged = avg_covariates is not None and not indirect
+            expected = case_risks[rows, k] if indirect else None
+            intervals = (adj_lower[k], adj_upper[k]) if averaged else None
+            expected_se = None
+            if indirect and self.solver == 'irls':
+                codes, surgeon_ids = pd.factorize(user_ids)
+                expected_se = self._log_expected_se(codes, len(surgeon_ids), X[rows], expected, model.covariance_[k])
+            if self.bootstrap is not None:
+                intervals = self._bootstrap_intervals(
+                    user_ids,
+                    y,
+                    X[rows],
+                    analysis_df['model_weight'][rows].to_numpy(dtype=float),
+                    adj_X if averaged else None,
+                    np.r_[model.intercept_[k], model.coef_[k]],
+                    outcome,
+                    imputation,
+                    expected
+                )
+            results[i] = self._surgeon_rate_results(
+                user_ids,
+                y,
+                adj_rates[k] if averaged else None,
+                intervals,
+                expected,
+                {key: values[k] for key, values in heterogeneity.items()},
+                expected_se
+            )
+            if cache_keys[i] is not None:
+                self.fit_cache.put(cache_keys[i], results[i])
+                
+        return results
+        
+    def _imputed_analysis_data(
+        self,
+        df: pd.DataFrame,
+        imp_df: Union[pd.DataFrame, np.ndarray],
+        outcomes: List[str]
+    ) -> pd.DataFrame:
+        """Combine prepared data with one set of imputed covariates"""
+        if isinstance(imp_df, np.ndarray):
+            # Gather the model's rows straight from the (possibly memory-mapped) matrix
+            design = np.asarray(imp_df[df.index.to_numpy()], dtype=np.float64)
+            return pd.DataFrame(
+                {
+                    'userId': df['userId'].to_numpy(),
+                    **{outcome: df[outcome].to_numpy() for outcome in outcomes},
+                    'model_weight': df['model_weight'].to_numpy(),
+                    **{col: design[:, j] for j, col in enumerate(self.covariates)}
+                },
+                index=df.index
             )
             
-        # Add metadata to results
+        # Create a copy of the original dataframe
+        analysis_df = df.copy()
+        
+        # Update the covariates with imputed values
+        for col in self.covariates:
+            if col in imp_df.columns:
+                analysis_df[col] = imp_df[col]
+                
+        return analysis_df
+        
+    def _add_metadata(
+        self,
+        results: pd.DataFrame,
+        model_id: str,
+        date: Optional[datetime]
+    ) -> pd.DataFrame:
+        """Add model metadata to results"""
         results['model_id'] = model_id
         results['date'] = date or datetime.now()
         
@@ -104,7 +434,8 @@ class RateGenerator:
         df: pd.DataFrame,
         outcome: str,
         model_type: str,
-        avg_covariates: Optional[Dict]
+        avg_covariates: Optional[Dict],
+        imputation: Optional[int] = None
     ) -> pd.DataFrame:
         """Process a single dataset without imputation"""
         # Get complete cases
@@ -113,31 +444,53 @@ class RateGenerator:
         if len(analysis_df) == 0:
             raise ValueError("No complete cases available for analysis")
             
+        # Reuse the results of an identical fit if one is cached
+        cache_key = None
+        if self.fit_cache is not None:
+            cache_key = FitCache.make_key(
+                analysis_df[['userId', outcome] + self.covariates + ['model_weight']],
+                outcome,
+                model_type,
+                avg_covariates,
+                imputation,
+                *self._settings_key()
+            )
+            cached = self.fit_cache.get(cache_key)
+            if cached is not None:
+                return cached
+            
         # Calculate rates
         if model_type == "LOGISTIC":
-            return self._calculate_logistic_rates(
+            results = self._calculate_logistic_rates(
                 analysis_df,
                 outcome,
-                avg_covariates
+                avg_covariates,
+                imputation
             )
         elif model_type == "LINEAR":
-            return self._calculate_linear_rates(
+            results = self._calculate_linear_rates(
                 analysis_df,
                 outcome,
                 avg_covariates
             )
         else:  # SURVIVAL
-            return self._calculate_survival_rates(
+            results = self._calculate_survival_rates(
                 analysis_df,
                 outcome,
                 avg_covariates
             )
             
+        if cache_key is not None:
+            self.fit_cache.put(cache_key, results)
+            
+        return results
+            
     def _calculate_logistic_rates(
         self,
         df: pd.DataFrame,
         outcome: str,
-        avg_covariates: Optional[Dict]
+        avg_covariates: Optional[Dict],
+        imputation: Optional[int] = None
     ) -> pd.DataFrame:
         """Calculate rates using logistic regression"""
         # Prepare X and y
@@ -145,34 +498,334 @@ class RateGenerator:
         y = df[outcome].astype(float)
         weights = df['model_weight'].astype(float)
         
-        # Fit the model
-        model = LogisticRegression(class_weight='balanced')
-        model.fit(X, y, sample_weight=weights)
+        # Fit the model, seeded with the previous fit if warm-starting
+        warm_key = (outcome, imputation)
+        previous = self._warm_coefs.get(warm_key) if self.warm_start else None
+        if self.solver == 'irls':
+            model = BatchedLogisticRegression()
+            coef_init = np.r_[previous[1], previous[0].ravel()][None, :] if previous is not None else None
+            model.fit(X.to_numpy(), y.to_numpy(), sample_weight=weights.to_numpy(), coef_init=coef_init)
+            if not model.fitted_[0]:
+                raise ValueError(f"{outcome} needs samples of at least 2 classes")
+        else:
+            model = LogisticRegression(**self.SKLEARN_SETTINGS, warm_start=self.warm_start)
+            if previous is not None:
+                model.coef_, model.intercept_ = previous[0].copy(), previous[1].copy()
+            model.fit(X, y, sample_weight=weights)
+        
+        if self.warm_start:
+            self._warm_coefs[warm_key] = (model.coef_.copy(), model.intercept_.copy())
+        kind = 'warm' if previous is not None else 'cold'
+        self.fit_stats[f'{kind}_fits'] += 1
+        self.fit_stats[f'{kind}_iterations'] += int(model.n_iter_.max())
         
-        # Calculate rates for each surgeon
-        results = []
-        for surgeon_id in df['userId'].unique():
-            surgeon_data = df[df['userId'] == surgeon_id]
+        surgeon_codes, surgeon_ids = pd.factorize(df['userId'])
+        heterogeneity = heterogeneity_tests(
+            surgeon_codes,
+            len(surgeon_ids),
+            y.to_numpy(),
+            X.to_numpy(),
+            np.r_[model.intercept_.ravel(), model.coef_.ravel()][None, :],
+            weights.to_numpy()
+        )
+        
+        # Calculate adjusted rate using average covariates, or use the
+        # expected risks for indirect standardization
+        adj_rate = None
+        adj_X = None
+        intervals = None
+        expected = None
+        expected_se = None
+        if self.adjustment == 'indirect':
+            # Every case's calibrated risk is its expected risk
+            linear_predictor = model.decision_function(X.to_numpy() if self.solver == 'irls' else X)
+            expected = self._expected_risks(np.ravel(linear_predictor), y)
+            if self.solver == 'irls':
+                expected_se = self._log_expected_se(surgeon_codes, len(surgeon_ids), X.to_numpy(), expected, model.covariance_[0])
+        elif avg_covariates is not None:
+            adj_X = np.array([[avg_covariates[col] for col in self.covariates]])
+            if self.solver == 'irls':
+                adj_rate, lower, upper = (
+                    values[0, 0] for values in model.predict_interval(adj_X, self.ci_level)
+                )
+                intervals = (lower, upper)
+            else:
+                adj_rate = model.predict_proba(pd.DataFrame([avg_covariates]))[0][1]
+                
+        if self.bootstrap is not None:
+            intervals = self._bootstrap_intervals(
+                df['userId'],
+                y,
+                X.to_numpy(),
+                weights.to_numpy(),
+                adj_X,
+                np.r_[model.intercept_.ravel(), model.coef_.ravel()],
+                outcome,
+                imputation,
+                expected
+            )
             
-            # Calculate raw rate
-            raw_rate = surgeon_data[outcome].astype(float).mean()
+        return self._surgeon_rate_results(
+            df['userId'],
+            y,
+            adj_rate,
+            intervals,
+            expected,
+            {key: values[0] for key, values in heterogeneity.items()},
+            expected_se
+        )
+        
+    def _bootstrap_intervals(
+        self,
+        user_ids: pd.Series,
+        y: pd.Series,
+        X: np.ndarray,
+        weights: np.ndarray,
+        adj_X: Optional[np.ndarray],
+        coefs: np.ndarray,
+        outcome: str,
+        imputation: Optional[int],
+        expected: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Bootstrap bounds of the reported rate: indirectly standardized if
+        expected risks are given, adjusted if adj_X is given, else raw
+        """
+        intervals = self.bootstrap.rate_intervals(
+            user_ids.to_numpy(),
+            y.to_numpy(),
+            X=X,
+            sample_weight=weights,
+            adj_X=adj_X,
+            coef_init=coefs,
+            expected=expected,
+            seed_key=(imputation or 0, zlib.crc32(outcome.encode()))
+        )
+        if expected is not None:
+            return intervals['indirect_lower'], intervals['indirect_upper']
+        if adj_X is not None:
+            return intervals['adj_lower'], intervals['adj_upper']
+        return intervals['raw_lower'], intervals['raw_upper']
+        
+    def _surgeon_rate_results(
+        self,
+        user_ids: pd.Series,
+        y: pd.Series,
+        adj_rate: Optional[float],
+        intervals: Optional[Tuple[Any, Any]] = None,
+        expected: Optional[np.ndarray] = None,
+        heterogeneity: Optional[Dict[str, Any]] = None,
+        expected_se: Optional[np.ndarray] = None
+    ) -> pd.DataFrame:
+        """
+        Build per-surgeon raw and adjusted rates in one grouped pass
+        
+        If expected holds every case's predicted risk, the rate is
+        indirectly standardized and expected and oe_ratio columns are
+        added. The model's heterogeneity test, if given, is added to every
+        surgeon's row: heterotest (p-value), hetero_chisq, num_users,
+        total_cases and min_events. With the irls solver or a bootstrap
+        engine, lowerCI and upperCI are added. intervals holds the bounds
+        of the reported rate, as scalars or per surgeon; without them the
+        Wilson score interval of each surgeon's raw rate is used, scaled
+        like the rate for indirect standardization. If expected_se holds
+        the standard error of each surgeon's log expected events, the
+        scaled bounds are widened on the log scale to add that variance in
+        quadrature.
+        """
+        if expected is not None:
+            surgeon_ids, cases, events, expected_events = self._surgeon_totals(user_ids, y, expected)
+        else:
+            surgeon_ids, cases, events = self._surgeon_totals(user_ids, y)
+        raw_rates = events / cases
+        
+        # Multiplier taking a surgeon's raw rate to their adjusted rate
+        scale = None
+        if expected is not None:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                oe_ratios = events / expected_events
+                scale = cases / expected_events * (events.sum() / cases.sum())
+            adj_rates = raw_rates * scale
+        elif adj_rate is not None:
+            adj_rates = np.full(len(surgeon_ids), adj_rate)
+        else:
+            adj_rates = raw_rates
             
-            # Calculate adjusted rate using average covariates
-            if avg_covariates is not None:
-                adj_X = pd.DataFrame([avg_covariates])
-                adj_rate = model.predict_proba(adj_X)[0][1]
+        results = pd.DataFrame({
+            'surgeon_id': surgeon_ids,
+            'rate': adj_rates,
+            'raw_rate': raw_rates,
+            'cases': cases,
+            'method': 'logistic_regression'
+        })
+        if expected is not None:
+            results.insert(3, 'expected', expected_events)
+            results.insert(4, 'oe_ratio', oe_ratios)
+        
+        if self.solver == 'irls' or self.bootstrap is not None:
+            if intervals is not None:
+                lower = np.broadcast_to(np.asarray(intervals[0], dtype=float), len(surgeon_ids))
+                upper = np.broadcast_to(np.asarray(intervals[1], dtype=float), len(surgeon_ids))
             else:
-                adj_rate = raw_rate
-                
-            results.append({
-                'surgeon_id': surgeon_id,
-                'rate': adj_rate,
-                'raw_rate': raw_rate,
-                'cases': len(surgeon_data),
-                'method': 'logistic_regression'
-            })
+                lower, upper = self._wilson_interval(events, cases, self.ci_level)
+                if scale is not None:
+                    lower, upper = lower * scale, upper * scale
+                    if expected_se is not None:
+                        lower, upper = self._widen_log_interval(adj_rates, lower, upper, expected_se, self.ci_level)
+            results.insert(2, 'lowerCI', lower)
+            results.insert(3, 'upperCI', upper)
+            
+        if heterogeneity is not None:
+            results['heterotest'] = heterogeneity['p_value']
+            results['hetero_chisq'] = heterogeneity['chisq']
+            for column in ['num_users', 'total_cases', 'min_events']:
+                results[column] = int(heterogeneity[column])
+            
+        return results
+        
+    @staticmethod
+    def _expected_risks(
+        linear_predictor: np.ndarray,
+        y: pd.Series,
+        max_iter: int = 50
+    ) -> np.ndarray:
+        """
+        Expected risk of every case, calibrated to the observed events
+        
+        The models are fitted with balanced class weights, which shifts
+        their intercept away from the outcome's prevalence. The intercept
+        is re-estimated with the slopes held fixed (a few Newton steps on
+        one offset) so that expected events sum to the observed events.
+        """
+        observed_events = float(np.sum(y))
+        n_cases = len(linear_predictor)
+        if observed_events <= 0 or observed_events >= n_cases:
+            return np.full(n_cases, observed_events / n_cases)
+            
+        offset = 0.0
+        for _ in range(max_iter):
+            risks = 1 / (1 + np.exp(-(linear_predictor + offset)))
+            gap = risks.sum() - observed_events
+            slope = (risks * (1 - risks)).sum()
+            if abs(gap) < 1e-10 * n_cases or slope == 0:
+                break
+            # Cap each step so far-off starts cannot overshoot
+            offset -= np.clip(gap / slope, -1.0, 1.0)
+        return risks
+        
+    @staticmethod
+    def _log_expected_se(
+        surgeon_codes: np.ndarray,
+        n_surgeons: int,
+        X: np.ndarray,
+        risks: np.ndarray,
+        covariance: np.ndarray
+    ) -> np.ndarray:
+        """
+        Delta-method standard error of each surgeon's log expected events
+        
+        The expected events of surgeon j are E_j = sum of their cases'
+        calibrated risks p_i. The recalibrated intercept keeps the total
+        of E fixed, so it moves with the slopes; its effect is removed by
+        centering each surgeon's gradient g_j = sum p_i (1 - p_i) x_i on
+        their share of the total, which also cancels the intercept. The
+        variance of log E_j is then g_j' Cov g_j / E_j^2.
+        
+        Args:
+            surgeon_codes: Surgeon index of each case, from pd.factorize
+            n_surgeons: Number of surgeons
+            X: Covariates of each case
+            risks: Calibrated risk of each case
+            covariance: Covariance of the fitted coefficients, intercept first
             
-        return pd.DataFrame(results)
+        Returns:
+            Standard error of log E for each surgeon
+        """
+        design = np.hstack([np.ones((len(X), 1)), X])
+        slope_weights = risks * (1 - risks)
+        gradients = np.stack([
+            np.bincount(surgeon_codes, weights=slope_weights * column, minlength=n_surgeons)
+            for column in design.T
+        ], axis=1)
+        expected = np.bincount(surgeon_codes, weights=risks, minlength=n_surgeons)
+        total_gradient = gradients.sum(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            share = gradients[:, 0] / total_gradient[0]
+            gradients = (gradients - share[:, None] * total_gradient) / expected[:, None]
+        variance = np.einsum('si,ij,sj->s', gradients, covariance, gradients)
+        return np.sqrt(np.maximum(variance, 0.0))
+        
+    @staticmethod
+    def _widen_log_interval(
+        rates: np.ndarray,
+        lower: np.ndarray,
+        upper: np.ndarray,
+        log_se: np.ndarray,
+        level: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Widen interval bounds around rates by an extra log-scale error
+        
+        Each log-scale half-width h becomes sqrt(h^2 + (z * log_se)^2).
+        Infinite half-widths (a bound of zero, or a zero rate) are kept.
+        """
+        extra = (norm.ppf(0.5 + level / 2) * log_se) ** 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            lower_width = np.log(rates / lower)
+            upper_width = np.log(upper / rates)
+            # sqrt(h^2 + e) - h, written so that h = inf gives 0
+            lower = lower * np.exp(-np.nan_to_num(extra / (np.sqrt(lower_width ** 2 + extra) + lower_width)))
+            upper = upper * np.exp(np.nan_to_num(extra / (np.sqrt(upper_width ** 2 + extra) + upper_width)))
+        return lower, upper
+        
+    @staticmethod
+    def _wilson_interval(
+        events: np.ndarray,
+        cases: np.ndarray,
+        level: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Wilson score interval for binomial proportions"""
+        z = norm.ppf(0.5 + level / 2)
+        p = events / cases
+        denominator = 1 + z ** 2 / cases
+        center = (p + z ** 2 / (2 * cases)) / denominator
+        half_width = z * np.sqrt(p * (1 - p) / cases + z ** 2 / (4 * cases ** 2)) / denominator
+        return center - half_width, center + half_width
+        
+    def _settings_key(self) -> Tuple:
+        """Non-default settings that change the results, for fit cache keys"""
+        key = (('results', self.RESULTS_VERSION),)
+        if self.solver == 'irls':
+            key += ('irls', self.ci_level)
+        if self.adjustment != 'average':
+            key += (self.adjustment,)
+        if self.bootstrap is not None:
+            key += self.bootstrap.settings()
+        return key
+        
+    @staticmethod
+    def _surgeon_totals(
+        user_ids: pd.Series,
+        *values: Union[pd.Series, np.ndarray]
+    ) -> Tuple[np.ndarray, ...]:
+        """
+        Sum values per surgeon using factorized surgeon codes
+        
+        Args:
+            user_ids: Surgeon ID for each row
+            values: One or more sets of values to sum for each row
+            
+        Returns:
+            Surgeon IDs in order of first appearance, case counts and the
+            sums of each set of values
+        """
+        codes, surgeon_ids = pd.factorize(user_ids)
+        cases = np.bincount(codes, minlength=len(surgeon_ids))
+        sums = [
+            np.bincount(codes, weights=np.asarray(column, dtype=float), minlength=len(surgeon_ids))
+            for column in values
+        ]
+        return (np.asarray(surgeon_ids), cases, *sums)
         
     def _process_imputed_data(
         self,
@@ -185,22 +838,15 @@ class RateGenerator:
         """Process multiple imputed datasets and combine results"""
         # Calculate rates for each imputed dataset
         all_results = []
-        for imp_df in imputed_values:
-            # Create a copy of the original dataframe
-            analysis_df = df.copy()
-            
-            # Update the covariates with imputed values
-            for col in self.covariates:
-                if col in imp_df.columns:
-                    analysis_df[col] = imp_df[col]
-            
-            # Process the dataset
+        for i, imp_df in enumerate(imputed_values):
             try:
-                results = self._process_single_dataset(
-                    analysis_df,
+                results = self.generate_imputation_rate(
+                    df,
+                    imp_df,
                     outcome,
                     model_type,
-                    avg_covariates
+                    avg_covariates,
+                    imputation=i
                 )
                 all_results.append(results)
             except Exception as e:
@@ -219,12 +865,7 @@ class RateGenerator:
         results_list: List[pd.DataFrame]
     ) -> pd.DataFrame:
         """Combine results from multiple imputations using Rubin's rules"""
-        # Calculate mean estimates across imputations
-        combined = pd.concat(results_list).groupby('surgeon_id').agg({
-            'rate': 'mean',
-            'raw_rate': 'mean',
-            'cases': 'first',
-            'method': 'first'
-        }).reset_index()
-        
-        return combined 
\ No newline at end of file
+        # Pool as one model under a placeholder id; metadata adds the real one
+        pooler = ImputationPooler(self.ci_level)
+        pooler.add('', results_list)
+        return pooler.pool().drop(columns='model_id')
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+class ResultAccumulator:
+    def __init__(self, initial_capacity: int = 1024, flush_size: int = 512):
+        """
+        Initialize a columnar accumulator for per-model results
+
+        Rows are appended into typed NumPy buffers that grow geometrically,
+        so collecting results is linear in the total number of rows and the
+        final DataFrame is only built once. Small frames are held back and
+        copied into the buffers flush_size at a time, since reading the
+        columns of a DataFrame costs far more than its few rows.
+
+        Args:
+            initial_capacity: Number of rows allocated on the first append
+            flush_size: Number of appended frames copied into the buffers at once
+        """
+        self.initial_capacity = initial_capacity
+        self.flush_size = flush_size
+        self._columns: Optional[List[str]] = None
+        self._buffers: Dict[str, np.ndarray] = {}
+        self._index: Optional[np.ndarray] = None
+        self._size = 0
+        self._pending: List[pd.DataFrame] = []
+        self._pending_constants: List[Dict[str, object]] = []
+        self._pending_rows = 0
+
+    def __len__(self) -> int:
+        return self._size + self._pending_rows
+
+    def append(self, results: pd.DataFrame, constants: Optional[Dict[str, object]] = None) -> None:
+        """
+        Append the rows of a results DataFrame
+
+        Args:
+            results: Results for one model, with the same columns as earlier results
+            constants: Values of extra columns that are the same for every
+                appended row, such as the model_id
+        """
+        constants = constants or {}
+        columns = [col for col in results.columns if col not in constants] + list(constants)
+        if self._columns is None:
+            self._columns = columns
+        elif columns != self._columns:
+            raise ValueError(
+                f"Result columns {columns} do not match {self._columns}"
+            )
+
+        if len(results) == 0:
+            return
+
+        self._pending.append(results)
+        self._pending_constants.append(constants)
+        self._pending_rows += len(results)
+        if len(self._pending) >= self.flush_size:
+            self._flush()
+
+    def to_frame(self) -> pd.DataFrame:
+        """Build a DataFrame from all appended rows"""
+        if self._columns is None:
+            return pd.DataFrame()
+
+        self._flush()
+        return pd.DataFrame(
+            {col: self._buffers[col][:self._size] for col in self._columns},
+            index=self._index[:self._size]
+        )
+
+    def _flush(self) -> None:
+        """Copy the held-back frames into the buffers"""
+        if not self._pending:
+            return
+
+        lengths = [len(results) for results in self._pending]
+        results = pd.concat(self._pending)
+        arrays = {
+            col: results[col].to_numpy()
+            for col in self._columns if col not in self._pending_constants[0]
+        }
+        for col in self._pending_constants[0]:
+            values = [constants[col] for constants in self._pending_constants]
+            dtype = object if any(isinstance(value, str) for value in values) else None
+            arrays[col] = np.repeat(np.array(values, dtype=dtype), lengths)
+        index = results.index.to_numpy()
+
+        n_rows = len(results)
+        self._reserve(self._size + n_rows, arrays, index)
+        end = self._size + n_rows
+        for col, values in arrays.items():
+            self._buffers[col][self._size:end] = values
+        self._index[self._size:end] = index
+        self._size = end
+
+        self._pending = []
+        self._pending_constants = []
+        self._pending_rows = 0
+
+    def _reserve(
+        self,
+        n_rows: int,
+        arrays: Dict[str, np.ndarray],
+        index: np.ndarray
+    ) -> None:
+        """Make sure every buffer can hold n_rows and the incoming dtypes"""
+        capacity = len(self._index) if self._index is not None else 0
+        if n_rows > capacity:
+            capacity = max(n_rows, 2 * capacity, self.initial_capacity)
+
+        for col, values in arrays.items():
+            self._buffers[col] = self._fit_buffer(self._buffers.get(col), values.dtype, capacity)
+        self._index = self._fit_buffer(self._index, index.dtype, capacity)
+
+    def _fit_buffer(
+        self,
+        buffer: Optional[np.ndarray],
+        dtype: np.dtype,
+        capacity: int
+    ) -> np.ndarray:
+        """Return a buffer with the requested capacity and a compatible dtype"""
+        if buffer is None:
+            return np.empty(capacity, dtype=dtype)
+
+        if buffer.dtype != dtype:
+            dtype = np.result_type(buffer.dtype, dtype)
+        if len(buffer) == capacity and buffer.dtype == dtype:
+            return buffer
+
+        grown = np.empty(capacity, dtype=dtype)
+        grown[:self._size] = buffer[:self._size]
+        return grown
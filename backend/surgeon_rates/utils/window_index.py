@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Tuple
+
+# Thickness categories of the model grid and the bins separating them
+THICKNESS_CATEGORIES = ['ALLLENGTH', 'LESSTHANPT8MM', 'PT8MMTO1MM', 'GRTHAN1MM']
+# < 0.8mm, 0.8mm to 1mm inclusive, > 1mm
+THICKNESS_BINS = [0.8, np.nextafter(1.0, np.inf)]
+
+class WindowIndex:
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        date_col: str = 'surgDate',
+        thickness_col: str = 'thickness'
+    ):
+        """
+        Row index of every (thickness category, cut-off date) window
+
+        Built once per run: rows are sorted by surgery date, assigned a
+        thickness category with a single digitize pass, and the offset of
+        every distinct date is precomputed per category. A window, the
+        rows of a category operated on or before its cut-off date, is then
+        a prefix of that category's date-sorted rows and is returned as a
+        slice without scanning the data.
+
+        Rows without a surgery date are in no window. Rows without a
+        recorded thickness are only in ALLLENGTH windows, since imputed
+        thickness differs between imputations.
+
+        Args:
+            df: Input data, rows addressed by position
+            date_col: Surgery date column
+            thickness_col: Tumour thickness column, in millimetres
+        """
+        self.n_rows = len(df)
+        dates = pd.to_datetime(df[date_col]).to_numpy(dtype='datetime64[ns]')
+        dated = np.flatnonzero(~np.isnat(dates))
+        order = dated[np.argsort(dates[dated], kind='stable')]
+        sorted_dates = dates[order]
+
+        thickness = pd.to_numeric(df[thickness_col], errors='coerce').to_numpy(dtype=np.float64)[order]
+        codes = np.digitize(thickness, THICKNESS_BINS)
+        codes[np.isnan(thickness)] = -1
+
+        self._rows: Dict[str, np.ndarray] = {THICKNESS_CATEGORIES[0]: order}
+        self._dates: Dict[str, np.ndarray] = {THICKNESS_CATEGORIES[0]: sorted_dates}
+        for code, category in enumerate(THICKNESS_CATEGORIES[1:]):
+            in_category = codes == code
+            self._rows[category] = order[in_category]
+            self._dates[category] = sorted_dates[in_category]
+
+        # Prefix length of every category at every distinct date
+        cutoffs = np.unique(sorted_dates)
+        self._cutoff_ids = {
+            date_str: i for i, date_str in enumerate(pd.DatetimeIndex(cutoffs).strftime('%Y%m%d'))
+        }
+        self._offsets = {
+            category: np.searchsorted(self._dates[category], cutoffs + np.timedelta64(1, 'D') - np.timedelta64(1, 'ns'), side='right')
+            for category in THICKNESS_CATEGORIES
+        }
+
+    def window(self, date_id: str) -> Tuple[str, int]:
+        """
+        Category and prefix length of a window
+
+        Args:
+            date_id: Window ID such as 'GRTHAN1MM.DATE20200131'
+
+        Returns:
+            The thickness category and the number of its date-sorted rows
+            in the window
+        """
+        category, date_str = date_id.split('.DATE')
+        if category not in self._rows:
+            raise ValueError(f"Unknown thickness category: {category}")
+
+        cutoff = self._cutoff_ids.get(date_str)
+        if cutoff is not None:
+            return category, int(self._offsets[category][cutoff])
+
+        # Dates that do not occur in the data need a binary search
+        end_of_day = np.datetime64(pd.Timestamp(date_str) + pd.Timedelta(days=1), 'ns') - np.timedelta64(1, 'ns')
+        return category, int(np.searchsorted(self._dates[category], end_of_day, side='right'))
+
+    def rows(self, date_id: str) -> np.ndarray:
+        """Row positions of a window, in surgery date order (a view, not a copy)"""
+        category, end = self.window(date_id)
+        return self._rows[category][:end]
+
+    def mask(self, date_id: str) -> np.ndarray:
+        """Boolean row mask of a window"""
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[self.rows(date_id)] = True
+        return mask
+
+    def cumulative(self, values: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Prefix sums of per-row values along every category's date order
+
+        The sum over a window is then cumulative[category][end] for the
+        category and end returned by window(). Integer sums wrap around,
+        which keeps them usable for combining row hashes.
+
+        Args:
+            values: One value per row, by position
+
+        Returns:
+            Prefix sums per category, starting with 0
+        """
+        values = np.asarray(values)
+        return {
+            category: np.concatenate([np.zeros(1, dtype=values.dtype), np.cumsum(values[rows], dtype=values.dtype)])
+            for category, rows in self._rows.items()
+        }